@@ -0,0 +1 @@
+"""Benchmarks for `rpgmaker_mv_decoder`."""
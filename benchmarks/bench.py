@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""`bench.py` Throughput benchmarks for decoding, encoding and key finding
+
+Builds a synthetic project in a temporary directory and times each operation in a fresh
+process so memory use can be measured per benchmark. The project is built in a process of
+its own too, so the memory it used isn't counted against the benchmarks. Results can be saved
+and compared against a baseline file.
+
+Run from the repository root::
+
+    python -m benchmarks.bench --files 2000 --save baseline.json
+    python -m benchmarks.bench --files 2000 --baseline baseline.json
+"""
+
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path, PurePath
+from typing import Any, Callable, Dict, List, Tuple
+
+import click
+
+from benchmarks.synthetic import make_project
+from rpgmaker_mv_decoder.callbacks import Callbacks
+from rpgmaker_mv_decoder.copymode import CopyMode
+from rpgmaker_mv_decoder.projectdecoder import ProjectDecoder
+from rpgmaker_mv_decoder.projectencoder import ProjectEncoder
+from rpgmaker_mv_decoder.projectkeyfinder import ProjectKeyFinder
+from rpgmaker_mv_decoder.projectpaths import ProjectPaths
+from rpgmaker_mv_decoder.utils import int_xor
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+BENCHMARK_KEY = "acbd18db4cc2f85cedef654fccc4a4d8"
+INT_XOR_CALLS = 100000
+
+
+def _quiet_callbacks() -> Callbacks:
+    return Callbacks(message_callback=lambda *_: None)
+
+
+def _peak_rss_kb() -> int:
+    """`_peak_rss_kb` Peak resident memory of this process
+
+    On Linux the peak is carried over from the parent across fork and exec, so it is never lower
+    than what the parent used when the process started.
+
+    Returns:
+    - `int`: Peak resident memory in KB, `None` if it can't be measured
+    """
+    if resource is None:
+        return None
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _bench_project_paths(config: Dict[str, Any]) -> Tuple[int, int]:
+    files: List[Path] = ProjectPaths(config["encoded"]).encoded_files
+    return (len(files), 0)
+
+
+def _bench_find_key(config: Dict[str, Any]) -> Tuple[int, int]:
+    finder = ProjectKeyFinder(config["encoded"], _quiet_callbacks())
+    if finder.find_key() != BENCHMARK_KEY:
+        raise RuntimeError("find_key returned the wrong key")
+    return (finder.samples, 0)
+
+
+def _bench_decode(config: Dict[str, Any], copy_mode: CopyMode = CopyMode.AUTO) -> Tuple[int, int]:
+    decoder = ProjectDecoder(config["encoded"], config["output"], BENCHMARK_KEY, _quiet_callbacks())
+    decoder.overwrite = True
+    decoder.copy_mode = copy_mode
+    decoder.workers = config["jobs"]
+    decoder.decode(False)
+    return (config["files"], config["bytes"])
+
+
+def _bench_encode(config: Dict[str, Any]) -> Tuple[int, int]:
+    encoder = ProjectEncoder(config["decoded"], config["output"], BENCHMARK_KEY, _quiet_callbacks())
+    encoder.overwrite = True
+    encoder.encode()
+    return (config["files"], config["bytes"])
+
+
+def _bench_int_xor(_: Dict[str, Any]) -> Tuple[int, int]:
+    key: bytes = bytes.fromhex(BENCHMARK_KEY)
+    header: bytes = bytes(range(16))
+    for _ in range(INT_XOR_CALLS):
+        header = int_xor(header, key)
+    return (INT_XOR_CALLS, INT_XOR_CALLS * 16)
+
+
+BENCHMARKS: Dict[str, Callable[[Dict[str, Any]], Tuple[int, int]]] = {
+    "project_paths": _bench_project_paths,
+    "find_key": _bench_find_key,
+    "decode": _bench_decode,
+    # Each copy mode on its own, to check the sizes `CopyMode.AUTO` switches at
+    "decode_buffer": functools.partial(_bench_decode, copy_mode=CopyMode.BUFFERED),
+    "decode_kernel": functools.partial(_bench_decode, copy_mode=CopyMode.KERNEL),
+    "decode_mmap": functools.partial(_bench_decode, copy_mode=CopyMode.MMAP),
+    "encode": _bench_encode,
+    "int_xor": _bench_int_xor,
+}
+
+
+def _run_benchmark(name: str, config: Dict[str, Any], results: multiprocessing.Queue) -> None:
+    """`_run_benchmark` Runs one benchmark, called in a fresh process
+
+    Args:
+    - `name` (`str`): Benchmark to run
+    - `config` (`Dict[str, Any]`): Project locations and options
+    - `results` (`multiprocessing.Queue`): Where the measurements are sent
+    """
+    start_rss: int = _peak_rss_kb()
+    with open(os.devnull, "w", encoding="UTF-8") as devnull:
+        sys.stdout = devnull
+        start: float = time.perf_counter()
+        (files, size) = BENCHMARKS[name](config)
+        seconds: float = time.perf_counter() - start
+    peak_rss: int = _peak_rss_kb()
+    results.put(
+        {
+            "seconds": seconds,
+            "files": files,
+            "bytes": size,
+            "files_per_s": files / seconds if seconds else None,
+            "mb_per_s": size / seconds / 1e6 if seconds and size else None,
+            "peak_rss_kb": peak_rss,
+            # What the benchmark added, the start includes the interpreter and imports
+            "rss_growth_kb": None if peak_rss is None else peak_rss - start_rss,
+        }
+    )
+
+
+def run_benchmark(name: str, config: Dict[str, Any], repeat: int = 1) -> Dict[str, Any]:
+    """`run_benchmark` Runs a benchmark `repeat` times and keeps the fastest run
+
+    Args:
+    - `name` (`str`): Benchmark to run, one of `BENCHMARKS`
+    - `config` (`Dict[str, Any]`): Project locations and options
+    - `repeat` (`int`, optional): Number of runs. Defaults to `1`.
+
+    Returns:
+    - `Dict[str, Any]`: Measurements for the fastest run
+    """
+    context = multiprocessing.get_context("spawn")
+    runs: List[Dict[str, Any]] = []
+    for _ in range(max(repeat, 1)):
+        results: multiprocessing.Queue = context.Queue()
+        process = context.Process(target=_run_benchmark, args=(name, config, results))
+        process.start()
+        runs.append(results.get())
+        process.join()
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def _format(value: Any, width: int, digits: int = 1) -> str:
+    if value is None:
+        return "-".rjust(width)
+    if isinstance(value, float):
+        return f"{value:{width}.{digits}f}"
+    return f"{value:{width}}"
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float
+) -> bool:
+    """`compare` Prints how the results compare to a baseline
+
+    Args:
+    - `results` (`Dict[str, Dict[str, Any]]`): Measurements from this run
+    - `baseline` (`Dict[str, Dict[str, Any]]`): Measurements to compare against
+    - `tolerance` (`float`): Allowed slow down before a benchmark counts as a regression
+
+    Returns:
+    - `bool`: `True` if any benchmark is slower than the baseline by more than `tolerance`
+    """
+    regressed: bool = False
+    click.echo(f"\n{'benchmark':<14} {'baseline s':>11} {'now s':>11} {'change':>8}")
+    for (name, result) in results.items():
+        if name not in baseline:
+            continue
+        ratio: float = result["seconds"] / baseline[name]["seconds"]
+        flag: str = ""
+        if ratio > 1.0 + tolerance:
+            regressed = True
+            flag = "  REGRESSION"
+        click.echo(
+            f"{name:<14} {_format(baseline[name]['seconds'], 11, 4)} "
+            f"{_format(result['seconds'], 11, 4)} {(ratio - 1.0) * 100:+7.1f}%{flag}"
+        )
+    return regressed
+
+
+@click.command()
+@click.option("--files", default=1000, show_default=True, help="Files in the synthetic project.")
+@click.option("--min-size", default=1024, show_default=True, help="Smallest file in bytes.")
+@click.option("--max-size", default=1024 * 1024, show_default=True, help="Largest file in bytes.")
+@click.option("--audio-ratio", default=0.2, show_default=True, help="Fraction of audio files.")
+@click.option("--jobs", default=1, show_default=True, help="Workers used for decoding.")
+@click.option("--repeat", default=3, show_default=True, help="Runs per benchmark, fastest wins.")
+@click.option("--seed", default=0, show_default=True, help="Seed for the synthetic project.")
+@click.option(
+    "--only", multiple=True, type=click.Choice(list(BENCHMARKS)), help="Benchmarks to run."
+)
+@click.option("--save", type=click.Path(dir_okay=False), help="Write the results to this file.")
+@click.option(
+    "--baseline", type=click.Path(exists=True, dir_okay=False), help="Results to compare with."
+)
+@click.option("--tolerance", default=0.1, show_default=True, help="Allowed slow down.")
+# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+def main(
+    files: int,
+    min_size: int,
+    max_size: int,
+    audio_ratio: float,
+    jobs: int,
+    repeat: int,
+    seed: int,
+    only: Tuple[str],
+    save: str,
+    baseline: str,
+    tolerance: float,
+) -> int:
+    """Benchmarks decoding, encoding and key finding on a synthetic project."""
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as root:
+        # Built in another process, so this one stays small for the benchmarks it starts
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            (encoded, decoded, total) = pool.apply(
+                make_project,
+                (PurePath(root), BENCHMARK_KEY, files, min_size, max_size, audio_ratio, seed),
+            )
+        config: Dict[str, Any] = {
+            "encoded": str(encoded),
+            "decoded": str(decoded),
+            "output": str(PurePath(root).joinpath("output")),
+            "files": files,
+            "bytes": total,
+            "jobs": jobs,
+        }
+        click.echo(f"Synthetic project: {files} files, {total / 1e6:.1f} MB")
+        click.echo(
+            f"{'benchmark':<14} {'seconds':>9} {'files/s':>10} {'MB/s':>9} {'peak RSS KB':>12} "
+            f"{'RSS growth KB':>14}"
+        )
+        for name in only if only else BENCHMARKS:
+            result: Dict[str, Any] = run_benchmark(name, config, repeat)
+            results[name] = result
+            click.echo(
+                f"{name:<14} {_format(result['seconds'], 9, 4)} "
+                f"{_format(result['files_per_s'], 10)} {_format(result['mb_per_s'], 9)} "
+                f"{_format(result['peak_rss_kb'], 12)} {_format(result['rss_growth_kb'], 14)}"
+            )
+    if save:
+        with open(save, "w", encoding="UTF-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if baseline:
+        with open(baseline, encoding="UTF-8") as file:
+            if compare(results, json.load(file), tolerance):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(standalone_mode=False))  # pylint: disable=no-value-for-parameter
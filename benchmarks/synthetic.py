@@ -0,0 +1,115 @@
+"""`synthetic.py` Builds synthetic RPGMaker projects for benchmarking"""
+
+import math
+import os
+import random
+import struct
+from binascii import crc32
+from pathlib import Path, PurePath
+from typing import List, Tuple
+
+from rpgmaker_mv_decoder.constants import (
+    IHDR_SECTION,
+    OGG_FIRST_PAGE_HEADER,
+    PNG_MAGIC,
+    RPG_MAKER_MV_MAGIC,
+)
+from rpgmaker_mv_decoder.utils import int_xor
+
+IMAGE_DIRECTORIES: List[str] = ["characters", "enemies", "faces", "pictures", "system", "tilesets"]
+AUDIO_DIRECTORIES: List[str] = ["bgm", "bgs", "me", "se"]
+
+
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.getrandbits(size * 8).to_bytes(size, "little") if size > 0 else b""
+
+
+def _write_file(filename: Path, data: bytes) -> None:
+    os.makedirs(filename.parent, exist_ok=True)
+    filename.write_bytes(data)
+
+
+def _png_data(rng: random.Random, size: int) -> bytes:
+    ihdr: bytes = struct.pack("!IIBBBBB", rng.randint(1, 4096), rng.randint(1, 4096), 8, 6, 0, 0, 0)
+    chunk: bytes = (
+        struct.pack("!I", len(ihdr))
+        + IHDR_SECTION
+        + ihdr
+        + crc32(IHDR_SECTION + ihdr).to_bytes(4, "big")
+    )
+    header: bytes = PNG_MAGIC + chunk
+    return header + _random_bytes(rng, size - len(header))
+
+
+def _ogg_data(rng: random.Random, size: int) -> bytes:
+    header: bytes = OGG_FIRST_PAGE_HEADER + _random_bytes(rng, 4) + bytes(4)
+    return header + _random_bytes(rng, size - len(header))
+
+
+def file_size(rng: random.Random, min_size: int, max_size: int) -> int:
+    """`file_size` Picks a file size, log-uniform between `min_size` and `max_size`
+
+    Real projects have many small images and a few large audio tracks, a log-uniform
+    distribution gives a similar spread.
+
+    Args:
+    - `rng` (`random.Random`): Random number generator
+    - `min_size` (`int`): Smallest file size in bytes
+    - `max_size` (`int`): Largest file size in bytes
+
+    Returns:
+    - `int`: File size in bytes
+    """
+    size: int = int(round(2 ** rng.uniform(math.log2(min_size), math.log2(max_size))))
+    # Rounding can step just outside the range
+    return min(max(size, min_size), max_size)
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+def make_project(
+    root: PurePath,
+    key: str,
+    files: int,
+    min_size: int = 1024,
+    max_size: int = 1024 * 1024,
+    audio_ratio: float = 0.2,
+    seed: int = 0,
+) -> Tuple[PurePath, PurePath, int]:
+    """`make_project` Writes an encoded project and the matching decoded project
+
+    Args:
+    - `root` (`PurePath`): Directory to create the projects in
+    - `key` (`str`): Key to encode the files with
+    - `files` (`int`): Number of files in each project
+    - `min_size` (`int`, optional): Smallest file size in bytes. Defaults to 1 KB.
+    - `max_size` (`int`, optional): Largest file size in bytes. Defaults to 1 MB.
+    - `audio_ratio` (`float`, optional): Fraction of the files that are audio. Defaults to\
+      `0.2`.
+    - `seed` (`int`, optional): Seed for the file contents. Defaults to `0`.
+
+    Returns:
+    - `Tuple[PurePath, PurePath, int]`: Encoded project, decoded project and the total size of\
+      the files in bytes
+    """
+    rng: random.Random = random.Random(seed)
+    key_bytes: bytes = bytes.fromhex(key)
+    encoded: Path = Path(root).joinpath("encoded")
+    decoded: Path = Path(root).joinpath("decoded")
+    total: int = 0
+    for index in range(files):
+        size: int = file_size(rng, min_size, max_size)
+        if rng.random() < audio_ratio:
+            name: PurePath = PurePath("www", "audio", rng.choice(AUDIO_DIRECTORIES), f"{index}")
+            data: bytes = _ogg_data(rng, size)
+            encoded_suffix, decoded_suffix = (".rpgmvo", ".ogg")
+        else:
+            name = PurePath("www", "img", rng.choice(IMAGE_DIRECTORIES), f"{index}")
+            data = _png_data(rng, size)
+            encoded_suffix, decoded_suffix = (".rpgmvp", ".png")
+        _write_file(
+            encoded.joinpath(name).with_suffix(encoded_suffix),
+            RPG_MAKER_MV_MAGIC + int_xor(data[:16], key_bytes) + data[16:],
+        )
+        _write_file(decoded.joinpath(name).with_suffix(decoded_suffix), data)
+        total += len(data)
+    return (PurePath(encoded), PurePath(decoded), total)
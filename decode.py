@@ -4,22 +4,40 @@ import sys
 
 import click
 
-from rpgmaker_mv_decoder.callbacks import show_version
+from rpgmaker_mv_decoder.callbacks import (
+    check_archive_source,
+    default_message_callback,
+    show_version,
+)
 from rpgmaker_mv_decoder.cli_help import DecodeHelp
+from rpgmaker_mv_decoder.conflictpolicy import ConflictPolicy
 from rpgmaker_mv_decoder.constants import (
+    CLI_INCREMENTAL_HELP,
+    CLI_JOBS_HELP,
+    CLI_ON_CONFLICT_HELP,
+    CLI_OUTPUT_FORMAT_HELP,
     CLI_OVERWRITE_HELP,
     CLI_VERSION_HELP,
+    CLICK_ARCHIVE_SRC_PATH,
     CLICK_DST_PATH,
-    CLICK_SRC_PATH,
     CMD_HELP_DECODE,
     TYPE_HELP,
 )
+from rpgmaker_mv_decoder.exceptions import InvalidKeyError, OutputFormatError
+from rpgmaker_mv_decoder.messagetypes import MessageType
 from rpgmaker_mv_decoder.projectdecoder import ProjectDecoder
 from rpgmaker_mv_decoder.projectkeyfinder import ProjectKeyFinder
+from rpgmaker_mv_decoder.sinks import available_output_formats
 
 
 @click.command(cls=DecodeHelp, help=CMD_HELP_DECODE)
-@click.argument("source", required=True, metavar="<Source>", type=CLICK_SRC_PATH)
+@click.argument(
+    "source",
+    required=True,
+    metavar="<Source>",
+    type=CLICK_ARCHIVE_SRC_PATH,
+    callback=check_archive_source,
+)
 @click.argument("destination", required=True, metavar="<Destination>", type=CLICK_DST_PATH)
 @click.argument("key", type=str, required=False, metavar="[<Key>]")
 @click.option("--detect_type", is_flag=True, help=TYPE_HELP)
@@ -32,27 +50,68 @@ from rpgmaker_mv_decoder.projectkeyfinder import ProjectKeyFinder
     help=CLI_VERSION_HELP,
 )
 @click.option("--overwrite", is_flag=True, help=CLI_OVERWRITE_HELP)
+@click.option(
+    "--on-conflict",
+    type=click.Choice(ConflictPolicy.names()),
+    default=ConflictPolicy.PROMPT.value,
+    metavar="POLICY",
+    help=CLI_ON_CONFLICT_HELP,
+)
+@click.option("--jobs", type=click.IntRange(min=1), default=1, metavar="N", help=CLI_JOBS_HELP)
+@click.option("--incremental", is_flag=True, help=CLI_INCREMENTAL_HELP)
+@click.option(
+    "--output-format",
+    type=click.Choice(available_output_formats()),
+    default="directory",
+    metavar="FORMAT",
+    help=CLI_OUTPUT_FORMAT_HELP,
+)
+# pylint: disable=too-many-arguments,too-many-positional-arguments
 def decode(
     source: click.Path = None,
     destination: click.Path = None,
     key: str = None,
     detect_type: bool = False,
     overwrite: bool = False,
+    on_conflict: str = ConflictPolicy.PROMPT.value,
+    jobs: int = 1,
+    incremental: bool = False,
+    output_format: str = "directory",
 ) -> None:
     """`decode` The main function
 
     Args:
-    - `source` (`click.Path`): Source directory
+    - `source` (`click.Path`): Source directory or archive
     - `destination` (`click.Path`): Destination directory
     - `key` (`str`, optional): Hex key to use. Defaults to None
     - `detect_type` (`bool`): If file should have extensions based on file contents
+    - `overwrite` (`bool`): if files should be overwritten without prompting
+    - `on_conflict` (`str`): What to do with files that already exist, see `ConflictPolicy`
+    - `jobs` (`int`): Number of files to decode at the same time
+    - `incremental` (`bool`): if files that haven't changed since the last run should be skipped
+    - `output_format` (`str`): Write to a directory or an archive, see `sinks.OUTPUT_FORMATS`
     """
-    if key is None:
-        key = ProjectKeyFinder(source).find_key()
     decoder = ProjectDecoder(source, destination, key)
-    if overwrite:
-        decoder.overwrite = True
-    decoder.decode(detect_type)
+    if key is not None:
+        try:
+            decoder.validate_key()
+        except InvalidKeyError as error:
+            default_message_callback(
+                MessageType.WARNING, f"{error.message}, looking for the right key instead"
+            )
+            key = None
+    if key is None:
+        # Find the key from the same paths, the project isn't listed twice and headers aren't
+        # reread
+        decoder.key = ProjectKeyFinder(decoder.project_paths).find_key()
+    decoder.conflict_policy = ConflictPolicy.OVERWRITE if overwrite else on_conflict
+    decoder.workers = jobs
+    decoder.incremental = incremental
+    decoder.output_format = output_format
+    try:
+        decoder.decode(detect_type)
+    except OutputFormatError as error:
+        raise click.UsageError(error.message) from error
     return 0
 
 
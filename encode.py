@@ -6,7 +6,9 @@ import click
 
 from rpgmaker_mv_decoder.callbacks import show_version
 from rpgmaker_mv_decoder.cli_help import EncodeHelp
+from rpgmaker_mv_decoder.conflictpolicy import ConflictPolicy
 from rpgmaker_mv_decoder.constants import (
+    CLI_ON_CONFLICT_HELP,
     CLI_OVERWRITE_HELP,
     CLI_VERSION_HELP,
     CLICK_DST_PATH,
@@ -29,11 +31,19 @@ from rpgmaker_mv_decoder.projectencoder import ProjectEncoder
     help=CLI_VERSION_HELP,
 )
 @click.option("--overwrite", is_flag=True, help=CLI_OVERWRITE_HELP)
+@click.option(
+    "--on-conflict",
+    type=click.Choice(ConflictPolicy.names()),
+    default=ConflictPolicy.PROMPT.value,
+    metavar="POLICY",
+    help=CLI_ON_CONFLICT_HELP,
+)
 def encode(
     source: click.Path = None,
     destination: click.Path = None,
     key: str = None,
     overwrite: bool = False,
+    on_conflict: str = ConflictPolicy.PROMPT.value,
 ) -> None:
     """`encode` The main function
     Args:
@@ -41,12 +51,12 @@ def encode(
     - `destination` (`click.Path`): Destination directory
     - `key` (`str`): Hex key to use
     - `overwrite` (`bool`): if files should be overwritten without prompting
+    - `on_conflict` (`str`): What to do with files that already exist, see `ConflictPolicy`
     """
     if key is None:
         return 1
     encoder: ProjectEncoder = ProjectEncoder(source, destination, key)
-    if overwrite:
-        encoder.overwrite = True
+    encoder.conflict_policy = ConflictPolicy.OVERWRITE if overwrite else on_conflict
     encoder.encode()
     return 0
 
@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 """Main entry point for GUI"""
+import functools
 import pathlib
+import queue
 import threading
 import tkinter as tk
 import webbrowser
-from time import sleep
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import messagebox, ttk
-from typing import Dict
+from typing import Any, Callable, Dict, Tuple
 
 from click._termui_impl import ProgressBar
 from pygubu.widgets.dialog import Dialog
@@ -17,13 +19,18 @@ from icon_data import ABOUT_ICON, TITLE_BAR_ICON
 from rpgmaker_mv_decoder.callbacks import Callbacks
 from rpgmaker_mv_decoder.exceptions import NoValidFilesFound
 from rpgmaker_mv_decoder.messagetypes import MessageType
+from rpgmaker_mv_decoder.progressreporter import WeightedProgressBar
 from rpgmaker_mv_decoder.projectdecoder import ProjectDecoder
 from rpgmaker_mv_decoder.projectencoder import ProjectEncoder
 from rpgmaker_mv_decoder.projectkeyfinder import ProjectKeyFinder
+from rpgmaker_mv_decoder.projectpaths import ProjectPaths
 from rpgmaker_mv_decoder.promptresponse import PromptResponse
+from rpgmaker_mv_decoder.utils import format_size
 
 PROJECT_PATH = pathlib.Path(__file__).parent
 PROJECT_UI = PROJECT_PATH / "gui.ui"
+# How often the Tk thread picks up progress and requests from the background thread
+EVENT_INTERVAL_MS = 50
 
 
 def _format_eta(click_pb: ProgressBar) -> str:
@@ -45,6 +52,18 @@ def _format_eta(click_pb: ProgressBar) -> str:
     return ""
 
 
+def _format_count(click_pb: ProgressBar) -> str:
+    if not isinstance(click_pb, WeightedProgressBar) or click_pb.bytes_total is None:
+        return f"{click_pb.pos}/{click_pb.length}"
+    text: str = (
+        f"{click_pb.files}/{click_pb.files_total} files, "
+        f"{format_size(click_pb.pos)}/{format_size(click_pb.length)}"
+    )
+    if click_pb.rate:
+        text += f", {format_size(click_pb.rate)}/s"
+    return text
+
+
 def _set_window_icon(window):
     img_icon = tk.PhotoImage(data=TITLE_BAR_ICON["data"], format=TITLE_BAR_ICON["format"])
     window.iconphoto(True, img_icon)
@@ -63,6 +82,8 @@ class _ProgressUI(Dialog):
         self.pos: int = -1
         self.pct: float = -1.0
         self.eta: str = ""
+        self.count: str = ""
+        self._changed: bool = False
         _set_window_icon(self.toplevel)
 
         def disable_event():
@@ -122,7 +143,7 @@ class _ProgressUI(Dialog):
 
     def _show_progress(self):
         if self.pb_valid:
-            self.label_cnt["text"] = f"{self.pos}/{self.max}"
+            self.label_cnt["text"] = self.count
             self.label_pct["text"] = f"{self.pct:0.01f}%"
             self.label_eta["text"] = self.eta
             self.progress_bar["maximum"] = self.max
@@ -139,15 +160,26 @@ class _ProgressUI(Dialog):
         self.pos: int = -1
         self.pct: float = -1.0
         self.eta: str = ""
+        self.count: str = ""
         self.pb_valid = False
         self.is_canceled = False
+        self._changed = False
         self._show_progress()
 
+    def refresh(self):
+        """`refresh` Shows the progress passed to `set_progress` since the last refresh, called on
+        the Tk thread"""
+        if self._changed:
+            self._changed = False
+            self._show_progress()
+
     def set_progress(self, click_pb: ProgressBar = None) -> bool:
         """`set_progress` updates the progress bar and labels for the progress dialog
 
-        Used as a callback function, takes the click `ProgressBar` and updates the
-        UI as appropriate
+        Used as a callback function from the background thread, takes the click `ProgressBar`
+        and keeps what to show. The widgets are only touched by `refresh` on the Tk thread.
+        Decoding and encoding measure progress in bytes, the number of files and the speed are
+        shown next to it.
 
         Args:
         - `click_pb` (`ProgressBar`, optional): Current progress data, `None` if finished.
@@ -167,7 +199,8 @@ class _ProgressUI(Dialog):
             self.max = click_pb.length
             self.pct = click_pb.pct * 100
             self.eta = _format_eta(click_pb)
-        self._show_progress()
+            self.count = _format_count(click_pb)
+        self._changed = True
         return self.is_canceled
 
 
@@ -236,16 +269,12 @@ Released under the MIT license. See GitHub for more details.
         webbrowser.open(self.url_pypi, new=0, autoraise=True)
 
 
-def _prompt_cb(message_type: MessageType, message: str, responses: PromptResponse) -> bool:
+def _show_prompt(message_type: MessageType, message: str, responses: PromptResponse) -> bool:
     options: Dict[str, str] = {}
-    # needed to prevent UI deadlock with TK
-    sleep(0.01)
     options["icon"] = message_type.get_icon()
     options["type"] = responses.get_messagebox_response()
     options["title"] = ""
-    options[
-        "message"
-    ] = f"""{message}
+    options["message"] = f"""{message}
 
 Do you want to do this?"""
     ret = messagebox.Message(**options).show()
@@ -280,7 +309,16 @@ class _GuiApp:
         self.src_path = ""
         self.dst_path = ""
         self.gui_key = ""
-        self.callbacks = Callbacks(self.progress.set_progress, prompt_callback=_prompt_cb)
+        # Work runs on one background thread, which hands anything for the UI to the Tk thread
+        # through `_events`
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+        self._events: queue.Queue = queue.Queue()
+        # Requests queued through `_call_in_ui` that haven't run yet, answered with `None` once
+        # the window is closed so the background thread doesn't wait for them forever
+        self._events_lock: threading.Lock = threading.Lock()
+        self._pending: set = set()
+        self._closed: bool = False
+        self.callbacks = Callbacks(self.progress.set_progress, prompt_callback=self._prompt)
 
     def _build_frame_act(self):
         self.frame_action = ttk.Frame(self.window)
@@ -355,12 +393,107 @@ class _GuiApp:
         self.frame_src.configure(height="200", padding="5", text="Source Directory:", width="0")
         self.frame_src.pack(expand="true", fill="x", side="top")
 
+    def _call_in_ui(self, function: Callable[..., Any], *args: Any) -> Future:
+        """`_call_in_ui` Queues `function` to run on the Tk thread, safe to call from any thread
+
+        Args:
+        - `function` (`Callable[..., Any]`): Function to run
+        - `args` (`Any`): Arguments for `function`
+
+        Returns:
+        - `Future`: Holds the result once `function` has run, wait on it instead of polling
+        """
+        future: Future = Future()
+
+        def _run():
+            with self._events_lock:
+                self._pending.discard(future)
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(function(*args))
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                future.set_exception(error)
+
+        with self._events_lock:
+            if self._closed:
+                future.set_result(None)
+                return future
+            self._pending.add(future)
+            self._events.put(_run)
+        return future
+
+    def _pump_events(self):
+        """`_pump_events` Runs everything the background thread queued and shows the latest\
+        progress, then checks again after `EVENT_INTERVAL_MS`"""
+        try:
+            while True:
+                try:
+                    event: Callable[[], None] = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                event()
+            self.progress.refresh()
+        finally:
+            # An event that raised is reported by Tk, the rest still run on the next check
+            self.window.after(EVENT_INTERVAL_MS, self._pump_events)
+
+    def _close_events(self):
+        """`_close_events` Answers every request still queued for the Tk thread with `None`, and\
+        any made later, once the window is closed"""
+        with self._events_lock:
+            self._closed = True
+            for future in self._pending:
+                future.set_result(None)
+            self._pending.clear()
+            while True:
+                try:
+                    self._events.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _run_in_background(
+        self, work: Callable[[], Any], done: Callable[[Any], None] = None
+    ) -> None:
+        """`_run_in_background` Runs `work` on the background thread
+
+        Once it has finished, the dialog is hidden, the buttons are updated and `done` is called\
+        with the result, on the Tk thread. Errors are raised again on the Tk thread so Tk reports\
+        them.
+
+        Args:
+        - `work` (`Callable[[], Any]`): What to run
+        - `done` (`Callable[[Any], None]`, optional): Called with the result of `work`.\
+          Defaults to `None`.
+        """
+        self._executor.submit(work).add_done_callback(
+            lambda finished: self._events.put(functools.partial(self._finished, finished, done))
+        )
+
+    def _finished(self, work: Future, done: Callable[[Any], None]):
+        self._hide_dialog()
+        try:
+            result = work.result()
+            if done is not None:
+                done(result)
+        finally:
+            self._set_button_state()
+
+    def _prompt(self, message_type: MessageType, message: str, responses: PromptResponse) -> bool:
+        """`_prompt` Prompt callback, asks on the Tk thread and waits for the answer"""
+        return self._call_in_ui(_show_prompt, message_type, message, responses).result()
+
     def run(self):
         """`run` Runs the UI"""
         self.src_path = ""
         self.dst_path = ""
         self.gui_key = ""
+        self.window.after(EVENT_INTERVAL_MS, self._pump_events)
         self.main_window.mainloop()
+        # Stops the background work at its next progress update
+        self.progress.is_canceled = True
+        self._close_events()
+        self._executor.shutdown(wait=False)
 
     def _about(self):
         self._show_about()
@@ -429,69 +562,92 @@ class _GuiApp:
         except ValueError:
             return False
 
-    def _detect(self, decode: bool = False):
-        def _detect_key():
-            self._disable_buttons()
+    def _find_key(self) -> Tuple[str, ProjectPaths]:
+        """`_find_key` Finds the key, runs on the background thread
 
-            def _show_dialog():
-                self._show_dialog("Key Detection", "Searching for key")
+        Returns:
+        - `Tuple[str, ProjectPaths]`: The key, `None` if it wasn't found, and the paths read\
+          while finding it
+        """
+        finder = ProjectKeyFinder(self.src_path, self.callbacks)
+        finder.show_progress = False
+        try:
+            return (finder.find_key(), finder.project_paths)
+        except NoValidFilesFound:
+            return (None, finder.project_paths)
 
-            threading.Thread(target=_show_dialog).start()
-            try:
-                self.gui_key = ProjectKeyFinder(self.src_path, self.callbacks).find_key()
-                self.entry_key.delete(0, tk.END)
-                self.entry_key.insert(0, self.gui_key)
-            except NoValidFilesFound:
-                pass
-            if not decode:
-                self._set_button_state()
-            self._hide_dialog()
-
-        if not decode:
-            threading.Thread(target=_detect_key).start()
-        else:
-            _detect_key()
+    def _set_key(self, key: str):
+        if key:
+            self.gui_key = key
+            self.entry_key.delete(0, tk.END)
+            self.entry_key.insert(0, self.gui_key)
 
-    def _decode(self):
-        if self.gui_key == "":
-            self._detect(True)
+    def _detect(self):
+        self._disable_buttons()
+        self._show_dialog("Key Detection", "Searching for key")
+        self._run_in_background(self._find_key, lambda found: self._set_key(found[0]))
 
-        def _show_dialog_decode():
-            self._show_dialog("Decoding Files", "Decoding all files")
+    def _decode_files(self, key: str, detect_type: bool, overwrite: bool) -> str:
+        """`_decode_files` Decodes the project, finding the key first if there isn't one. Runs\
+        on the background thread
 
-        threading.Thread(target=_show_dialog_decode).start()
+        Args:
+        - `key` (`str`): Key to use, empty to find it
+        - `detect_type` (`bool`): If files should have extensions based on file contents
+        - `overwrite` (`bool`): If files should be overwritten without asking
 
-        def _decode_files():
-            decoder: ProjectDecoder = ProjectDecoder(
-                self.src_path, self.dst_path, self.entry_key.get(), self.callbacks
-            )
-            if self.overwrite.get() == "1":
-                decoder.overwrite = True
-            decoder.decode(self.detect_file_ext.get() == "1")
-            self._hide_dialog()
-            self._set_button_state()
+        Returns:
+        - `str`: The key used, `None` if it wasn't found
+        """
+        source = self.src_path
+        if not key:
+            (key, source) = self._find_key()
+            if not key:
+                return None
+            self._call_in_ui(self._show_dialog, "Decoding Files", "Decoding all files")
+        decoder: ProjectDecoder = ProjectDecoder(source, self.dst_path, key, self.callbacks)
+        decoder.show_progress = False
+        if overwrite:
+            decoder.overwrite = True
+        decoder.decode(detect_type)
+        return key
 
-        threading.Thread(target=_decode_files).start()
+    def _decode(self):
         self._disable_buttons()
+        key: str = self.entry_key.get()
+        if key == "":
+            self._show_dialog("Key Detection", "Searching for key")
+        else:
+            self._show_dialog("Decoding Files", "Decoding all files")
+        self._run_in_background(
+            functools.partial(
+                self._decode_files,
+                key,
+                self.detect_file_ext.get() == "1",
+                self.overwrite.get() == "1",
+            ),
+            self._set_key,
+        )
 
-    def _encode(self):
-        def _show_dialog_encode():
-            self._show_dialog("Encoding Files", "Encoding all files")
-
-        threading.Thread(target=_show_dialog_encode).start()
-
-        def _encode_files():
-            encoder: ProjectEncoder = ProjectEncoder(
-                self.src_path, self.dst_path, self.entry_key.get(), self.callbacks
-            )
-            if self.overwrite.get() == "1":
-                encoder.overwrite = True
-            encoder.encode()
-            self._hide_dialog()
-            self._set_button_state()
+    def _encode_files(self, key: str, overwrite: bool):
+        """`_encode_files` Encodes the project, runs on the background thread
 
-        threading.Thread(target=_encode_files).start()
+        Args:
+        - `key` (`str`): Key to use
+        - `overwrite` (`bool`): If files should be overwritten without asking
+        """
+        encoder: ProjectEncoder = ProjectEncoder(self.src_path, self.dst_path, key, self.callbacks)
+        encoder.show_progress = False
+        if overwrite:
+            encoder.overwrite = True
+        encoder.encode()
+
+    def _encode(self):
         self._disable_buttons()
+        self._show_dialog("Encoding Files", "Encoding all files")
+        self._run_in_background(
+            functools.partial(self._encode_files, self.entry_key.get(), self.overwrite.get() == "1")
+        )
 
 
 if __name__ == "__main__":
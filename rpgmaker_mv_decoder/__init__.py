@@ -1,15 +1,25 @@
 """Package for decoding RPGMaker MV/MZ encoded files"""
 
 __all__ = [
+    "archives",
     "callbacks",
     "cli_help",
+    "conflictpolicy",
     "constants",
+    "copymode",
     "exceptions",
+    "filetypes",
+    "key",
+    "manifest",
+    "progress",
+    "progressreporter",
     "project",
     "projectdecoder",
     "projectencoder",
     "projectkeyfinder",
     "projectpaths",
+    "samplingmethod",
+    "sinks",
     "utils",
 ]
 
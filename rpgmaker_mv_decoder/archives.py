@@ -0,0 +1,302 @@
+"""`archives.py` Reads projects packed into a zip or asar archive
+
+Members are streamed straight out of the archive, nothing is extracted to disk first.
+"""
+import io
+import json
+import os
+import posixpath
+import struct
+import threading
+import zipfile
+from abc import ABC, abstractmethod
+from pathlib import PurePath
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple, TypeVar
+
+from rpgmaker_mv_decoder.constants import ASAR_HEADER_SIZE, ASAR_PICKLE_SIZE
+
+_T = TypeVar("_T", bound="Archive")
+_A = TypeVar("_A", bound="AsarArchive")
+_M = TypeVar("_M", bound="_MemberReader")
+
+
+def _is_safe_name(name: str) -> bool:
+    """`_is_safe_name` Checks that a member stays inside the output directory when written
+
+    Args:
+    - `name` (`str`): Member name, using `/` as the separator
+
+    Returns:
+    - `bool`: `False` for absolute names and names containing `..`
+    """
+    return not posixpath.isabs(name) and ".." not in name.split("/") and ":" not in name
+
+
+class Archive(ABC):
+    """`Archive` Files packed into a single archive file
+
+    Notes:
+    - This is an Abstract Base Class, use `open_archive` to get an archive
+    """
+
+    def __init__(self: _T, filename: PurePath) -> _T:
+        """`Archive` constructor
+
+        Args:
+        - `filename` (`PurePath`): Archive file
+        """
+        self.filename: PurePath = filename
+
+    @abstractmethod
+    def _member_names(self: _T) -> Iterator[str]:
+        """`_member_names` Lists every file in the archive
+
+        Returns:
+        - `Iterator[str]`: Member names, using `/` as the separator
+        """
+
+    def names(self: _T) -> List[str]:
+        """`names` Lists the files in the archive
+
+        Members that would be written outside the output directory are left out.
+
+        Returns:
+        - `List[str]`: Member names, using `/` as the separator
+        """
+        return [name for name in self._member_names() if _is_safe_name(name)]
+
+    @abstractmethod
+    def open(self: _T, name: str) -> BinaryIO:
+        """`open` Opens a member for reading
+
+        Args:
+        - `name` (`str`): Member name
+
+        Raises:
+        - `FileNotFoundError`: If there is no member with that name
+
+        Returns:
+        - `BinaryIO`: Readable file, safe to use from any thread
+        """
+
+    @abstractmethod
+    def size(self: _T, name: str) -> int:
+        """`size` Size of a member once extracted
+
+        Args:
+        - `name` (`str`): Member name
+
+        Raises:
+        - `FileNotFoundError`: If there is no member with that name
+
+        Returns:
+        - `int`: Size in bytes
+        """
+
+    def read_header(self: _T, name: str, size: int) -> bytes:
+        """`read_header` Reads the start of a member
+
+        Args:
+        - `name` (`str`): Member name
+        - `size` (`int`): Number of bytes to read
+
+        Returns:
+        - `bytes`: Up to `size` bytes from the start of the member
+        """
+        with self.open(name) as file:
+            return file.read(size)
+
+    def close(self: _T) -> None:
+        """`close` Closes the archive file"""
+
+
+class ZipArchive(Archive):
+    """`ZipArchive` Zip files, including NW.js `package.nw` files and executables with a zip
+    appended"""
+
+    def __init__(self: _T, filename: PurePath) -> _T:
+        """`ZipArchive` constructor
+
+        Args:
+        - `filename` (`PurePath`): Archive file
+        """
+        Archive.__init__(self, filename)
+        self._zip: zipfile.ZipFile = zipfile.ZipFile(  # pylint: disable=consider-using-with
+            filename
+        )
+
+    def _member_names(self: _T) -> Iterator[str]:
+        info: zipfile.ZipInfo
+        for info in self._zip.infolist():
+            if not info.is_dir():
+                yield info.filename
+
+    def open(self: _T, name: str) -> BinaryIO:
+        try:
+            return self._zip.open(name)
+        except KeyError as error:
+            raise FileNotFoundError(f"'{name}' not found in '{self.filename}'") from error
+
+    def size(self: _T, name: str) -> int:
+        try:
+            return self._zip.getinfo(name).file_size
+        except KeyError as error:
+            raise FileNotFoundError(f"'{name}' not found in '{self.filename}'") from error
+
+    def close(self: _T) -> None:
+        self._zip.close()
+
+
+class _MemberReader(io.RawIOBase):
+    """`_MemberReader` Reads part of a file using positional reads, so the same file
+    descriptor can be shared between threads"""
+
+    def __init__(self: _M, reader: "AsarArchive", offset: int, size: int) -> _M:
+        io.RawIOBase.__init__(self)
+        self._reader: AsarArchive = reader
+        self._offset: int = offset
+        self._size: int = size
+        self._position: int = 0
+
+    def readable(self: _M) -> bool:
+        return True
+
+    def seekable(self: _M) -> bool:
+        return True
+
+    def readinto(self: _M, buffer: Any) -> int:
+        size: int = max(min(len(buffer), self._size - self._position), 0)
+        data: bytes = self._reader.pread(size, self._offset + self._position)
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self: _M, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self: _M) -> int:
+        return self._position
+
+
+class AsarArchive(Archive):
+    """`AsarArchive` Electron asar archives
+
+    The archive starts with a JSON index of every file, stored with Chromium's pickle format.
+    Files too large or marked as unpacked are stored next to the archive in a `.unpacked`
+    directory.
+    """
+
+    def __init__(self: _A, filename: PurePath) -> _A:
+        """`AsarArchive` constructor
+
+        Args:
+        - `filename` (`PurePath`): Archive file
+
+        Raises:
+        - `ValueError`: If the file isn't an asar archive
+        """
+        Archive.__init__(self, filename)
+        self._lock: threading.Lock = threading.Lock()
+        self._file: int = os.open(filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        self._members: Dict[str, Tuple[int, int]] = {}
+        try:
+            self._read_index()
+        except (ValueError, struct.error, KeyError, TypeError):
+            os.close(self._file)
+            raise ValueError(f"'{filename}' is not an asar archive") from None
+
+    def _read_index(self: _A) -> None:
+        pickle_size: int
+        header_size: int
+        index_size: int
+        (pickle_size, header_size, _, index_size) = struct.unpack(
+            "<4I", self.pread(ASAR_HEADER_SIZE, 0)
+        )
+        if pickle_size != ASAR_PICKLE_SIZE or index_size > header_size:
+            raise ValueError("Invalid asar header")
+        # The sizes come from the file, don't read more than it holds
+        if index_size > os.fstat(self._file).st_size - ASAR_HEADER_SIZE:
+            raise ValueError("Invalid asar header")
+        index: Dict[str, Any] = json.loads(self.pread(index_size, ASAR_HEADER_SIZE))
+        # File data starts after the first pickle (size and value, 8 bytes) and the index pickle
+        self._add_members(index["files"], "", 8 + header_size)
+
+    def _add_members(self: _A, files: Dict[str, Any], prefix: str, base: int) -> None:
+        name: str
+        entry: Dict[str, Any]
+        for (name, entry) in files.items():
+            if "files" in entry:
+                self._add_members(entry["files"], f"{prefix}{name}/", base)
+            elif "link" in entry:
+                continue
+            elif entry.get("unpacked"):
+                self._members[prefix + name] = (None, int(entry["size"]))
+            else:
+                self._members[prefix + name] = (base + int(entry["offset"]), int(entry["size"]))
+
+    def pread(self: _A, size: int, offset: int) -> bytes:
+        """`pread` Reads from the archive without moving a shared file position
+
+        Args:
+        - `size` (`int`): Number of bytes to read
+        - `offset` (`int`): Where to start reading
+
+        Returns:
+        - `bytes`: Up to `size` bytes
+        """
+        if hasattr(os, "pread"):
+            return os.pread(self._file, size, offset)
+        with self._lock:
+            os.lseek(self._file, offset, os.SEEK_SET)
+            return os.read(self._file, size)
+
+    def _member_names(self: _A) -> Iterator[str]:
+        return iter(self._members)
+
+    def open(self: _A, name: str) -> BinaryIO:
+        try:
+            (offset, size) = self._members[name]
+        except KeyError as error:
+            raise FileNotFoundError(f"'{name}' not found in '{self.filename}'") from error
+        if offset is None:
+            return open(f"{self.filename}.unpacked/{name}", "rb", buffering=0)
+        return _MemberReader(self, offset, size)
+
+    def size(self: _A, name: str) -> int:
+        try:
+            return self._members[name][1]
+        except KeyError as error:
+            raise FileNotFoundError(f"'{name}' not found in '{self.filename}'") from error
+
+    def read_header(self: _A, name: str, size: int) -> bytes:
+        (offset, member_size) = self._members.get(name, (None, 0))
+        if offset is None:
+            return Archive.read_header(self, name, size)
+        return self.pread(min(size, member_size), offset)
+
+    def close(self: _A) -> None:
+        if self._file is not None:
+            os.close(self._file)
+            self._file = None
+
+
+def open_archive(filename: PurePath) -> Archive:
+    """`open_archive` Opens a zip or asar archive
+
+    Args:
+    - `filename` (`PurePath`): File to open
+
+    Returns:
+    - `Archive`: The archive, `None` if the file isn't a supported archive
+    """
+    if zipfile.is_zipfile(filename):
+        return ZipArchive(filename)
+    try:
+        return AsarArchive(filename)
+    except ValueError:
+        return None
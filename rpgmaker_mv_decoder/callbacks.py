@@ -2,12 +2,14 @@
 
 Used to handle callbacks in a single object rather than multiple parameters
 """
+from pathlib import Path
 from typing import Callable, List, TypeVar
 
 import click
 from click._termui_impl import ProgressBar
 
 from rpgmaker_mv_decoder import __version__ as VERSION
+from rpgmaker_mv_decoder.archives import Archive, open_archive
 from rpgmaker_mv_decoder.messagetypes import MessageType
 from rpgmaker_mv_decoder.promptresponse import PromptResponse
 
@@ -28,6 +30,29 @@ def show_version(ctx: click.Context, _, value: bool):
     ctx.exit()
 
 
+def check_archive_source(_ctx: click.Context, _, value: str) -> str:
+    """`check_archive_source` Click callback that only accepts a directory or an archive
+
+    Args:
+    - `_ctx` (`click.Context`): ignored
+    - `_` (`_type_`): ignored
+    - `value` (`str`): Source path, already checked to exist
+
+    Raises:
+    - `click.BadParameter`: If `value` is a file that isn't a zip or asar archive
+
+    Returns:
+    - `str`: `value`
+    """
+    if value is None or Path(value).is_dir():
+        return value
+    archive: Archive = open_archive(value)
+    if archive is None:
+        raise click.BadParameter(f"'{value}' is not a directory or a zip or asar archive")
+    archive.close()
+    return value
+
+
 def _default_progressbar_callback(_: ProgressBar) -> bool:
     return False
 
@@ -7,6 +7,7 @@ import click
 
 from rpgmaker_mv_decoder.constants import (
     CLI_DECODE_KEY_STR,
+    CLI_DECODE_SOURCE_STR,
     CLI_DESTINATION_STR,
     CLI_ENCODE_KEY_STR,
     CLI_SOURCE_STR,
@@ -32,7 +33,7 @@ class DecodeHelp(click.Command):
         with formatter.section(_("Arguments")):
             formatter.write_dl(
                 [
-                    ("<Source>", CLI_SOURCE_STR),
+                    ("<Source>", CLI_DECODE_SOURCE_STR),
                     ("<Destination>", CLI_DESTINATION_STR),
                     ("<Key>", CLI_DECODE_KEY_STR),
                 ]
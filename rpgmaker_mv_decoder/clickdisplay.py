@@ -15,17 +15,22 @@ class ClickDisplay:
         Args:
         - `items` (`Iterable[Path]`): Items being passed to the click progress bar
         """
-        self._max_filename_len: int = 0
+        self._items: Iterable[Path] = items
+        self._max_filename_len: int = None
         self.setup(items)
 
     def setup(self, items: Iterable[Path]) -> None:
-        """`setup` figures out the width of the display needed for filenames
+        """`setup` Sets the items the display is for
+
+        The width needed for filenames is only worked out the first time an item is shown, so
+        a progress bar that is never drawn never looks at the names.
 
         Args:
-        - `items` (`Iterable[Path]`): Items being passed to the click progress bar
+        - `items` (`Iterable[Path]`): Items being passed to the click progress bar, read again\
+          when the first item is shown
         """
-        for item in items:
-            self._max_filename_len = max(self._max_filename_len, len(item.name))
+        self._items = items
+        self._max_filename_len = None
 
     def show_item(self: _T, item: Path) -> str:
         """`show_item` Pads the item name so it is shown correctly
@@ -38,4 +43,8 @@ class ClickDisplay:
         Returns:
         - `str`: String to append to progress info. Trailing spaces will be removed.
         """
-        return "[" + item.name.center(self._max_filename_len) + "]" if item else None
+        if not item:
+            return None
+        if self._max_filename_len is None:
+            self._max_filename_len = max((len(name.name) for name in self._items), default=0)
+        return "[" + item.name.center(self._max_filename_len) + "]"
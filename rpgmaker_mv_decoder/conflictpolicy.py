@@ -0,0 +1,59 @@
+"""`conflictpolicy.py` What to do when an output file already exists"""
+from enum import Enum
+from typing import List, TypeVar
+
+_T = TypeVar("_T", bound="ConflictPolicy")
+
+
+class ConflictPolicy(Enum):
+    """`ConflictPolicy` How existing output files are handled
+
+    - `PROMPT`: Leave existing files alone while running, then ask once about all of them
+    - `OVERWRITE`: Replace existing files
+    - `SKIP`: Keep existing files
+    - `SKIP_IF_IDENTICAL`: Keep existing files that already hold the same data, replace the rest
+    - `NEWER_WINS`: Replace existing files that are older than the file they are made from
+    - `RENAME`: Keep existing files and write to a new name, like `Actor1 (1).png`
+    """
+
+    PROMPT = "prompt"
+    OVERWRITE = "overwrite"
+    SKIP = "skip"
+    SKIP_IF_IDENTICAL = "skip-if-identical"
+    NEWER_WINS = "newer-wins"
+    RENAME = "rename"
+
+    @classmethod
+    def names(cls) -> List[str]:
+        """`names` Lists the policies as they are written on the command line
+
+        Returns:
+        - `List[str]`: Policy names
+        """
+        return [policy.value for policy in cls]
+
+    @classmethod
+    def from_overwrite(cls, overwrite: bool) -> _T:
+        """`from_overwrite` Converts the older `overwrite` setting to a policy
+
+        Args:
+        - `overwrite` (`bool`): `True` to overwrite, `False` to skip and `None` to prompt
+
+        Returns:
+        - `ConflictPolicy`: `OVERWRITE`, `SKIP` or `PROMPT`
+        """
+        if overwrite is None:
+            return cls.PROMPT
+        return cls.OVERWRITE if overwrite else cls.SKIP
+
+    def to_overwrite(self: _T) -> bool:
+        """`to_overwrite` Converts the policy to the older `overwrite` setting
+
+        Returns:
+        - `bool`: `True` for `OVERWRITE`, `False` for `SKIP` and `None` for the others
+        """
+        if self == ConflictPolicy.OVERWRITE:
+            return True
+        if self == ConflictPolicy.SKIP:
+            return False
+        return None
@@ -1,16 +1,76 @@
 """`constants.py` Constants for use by modules"""
 
+import re
+
 import click
 
 # File Sanity Check
 RPG_MAKER_MV_MAGIC = b"RPGMV\x00\x00\x00\x00\x03\x01\x00\x00\x00\x00\x00"
 
+# Size of the buffer used when the body of a file can't be copied by the OS
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Progress is passed on at most this often, in seconds
+PROGRESS_INTERVAL = 0.1
+
+# Incremental decoding
+MANIFEST_FILENAME = ".rpgmaker_mv_decoder.json"
+MANIFEST_VERSION = 1
+
+# Existing files named in the prompt shown once a run is done, the rest are counted
+MAX_LISTED_CONFLICTS = 20
+
 # Lib Magic constants
 OCT_STREAM = "application/octet-stream"
 
+# File type detection constants
+DETECT_TYPE_SIZE = 8 * 1024
+JPEG_MAGIC = b"\xff\xd8\xff"
+OGG_MAGIC = b"OggS"
+THEORA_HEADER = b"\x80theora"
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+WEBM_DOCTYPE = b"webm"
+FTYP_BOX = b"ftyp"
+M4A_BRAND = b"M4A "
+# Extensions RPGMaker uses for encoded audio, images all use ".rpgmvp"
+ENCODED_AUDIO_EXTENSIONS = {"audio/ogg": ".rpgmvo", "audio/x-m4a": ".rpgmvm"}
+# Extensions for decoded file types whose mime subtype isn't the usual extension
+DECODED_EXTENSIONS = {"audio/x-m4a": ".m4a"}
+
+# Key finding, stop sampling once the most common key reaches this confidence
+KEY_CONFIDENCE = 0.999
+# Number of file headers read at the same time when finding a key
+KEY_FINDER_WORKERS = 8
+# RPGMaker header, encoded PNG header and the rest of the PNG IHDR section
+KEY_FINDER_HEADER_SIZE = 49
+
+# Files checked with the key before decoding, a wrong key is caught before anything is written
+KEY_CHECK_SAMPLES = 8
+# Decoding stops once this many files in a row don't decode to the type their extension promises
+MAX_CONSECUTIVE_INVALID = 20
+
+# Keys are 16 bytes written as hex
+KEY_PATTERN = re.compile(r"^[0-9a-fA-F]{32}$")
+
+# Places RPGMaker stores the key, relative to the project directory
+SYSTEM_JSON_FILES = ("www/data/System.json", "data/System.json")
+SYSTEM_JSON_KEY = "encryptionKey"
+
+# OGG Constants, the first page of a stream starts with the capture pattern, version 0,
+# the "beginning of stream" flag and a granule position of 0
+OGG_FIRST_PAGE_HEADER = b"OggS\x00\x02" + bytes(8)
+OGG_PAGE_HEADER_SIZE = 27
+OGG_CRC_POLYNOMIAL = 0x04C11DB7
+
+# asar archives start with 4 little endian integers: the size of the first pickle (always 4),
+# the size of the index pickle, the size of its payload and the length of the JSON index
+ASAR_HEADER_SIZE = 16
+ASAR_PICKLE_SIZE = 4
+
 # PNG Constants
 IHDR_SECTION = b"IHDR"
-PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\r" + IHDR_SECTION
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+PNG_HEADER = PNG_MAGIC + b"\x00\x00\x00\r" + IHDR_SECTION
 NOT_A_PNG = "Invalid checksum"
 
 # HELP Constants
@@ -19,6 +79,12 @@ CLI_SOURCE_STR = (
     "directory."
 )
 
+CLI_DECODE_SOURCE_STR = (
+    "The source directory or archive. For best results this should be the parent of the 'www' "
+    "or 'img' directory. Zip files (including NW.js package.nw files) and Electron asar "
+    "archives are read without extracting them."
+)
+
 CLI_DESTINATION_STR = (
     "The parent destination directory. This script will create a project directory under this "
     "path if it doesn't already exist."
@@ -31,10 +97,27 @@ CLI_DECODE_KEY_STR = (
 
 CLI_ENCODE_KEY_STR = "The encoding key to use."
 
-CLI_OVERWRITE_HELP = "Overwrite files without prompting"
+CLI_OVERWRITE_HELP = "Overwrite files without prompting, the same as --on-conflict overwrite"
+CLI_ON_CONFLICT_HELP = (
+    "What to do with files that already exist: prompt once after the run (the default), "
+    "overwrite, skip, skip-if-identical, newer-wins (replace files older than their source) or "
+    "rename (write to a new name)."
+)
+CLI_JOBS_HELP = "Number of files to decode at the same time. Defaults to 1."
+CLI_INCREMENTAL_HELP = (
+    "Skip files that haven't changed since the last time they were decoded to <Destination>."
+)
+CLI_OUTPUT_FORMAT_HELP = (
+    "Write the decoded files to a directory (the default) or straight into a zip, tar or "
+    "tar.zst archive next to where the directory would be. tar.zst needs zstandard installed. "
+    "An existing archive is replaced as a whole, or kept with --on-conflict rename which writes "
+    "to a new name. Archives can't be used with --on-conflict skip-if-identical or newer-wins."
+)
 CLI_VERSION_HELP = "Prints the version number"
 
-CMD_HELP_DECODE = "Decodes RPGMaker files under <Source> directory to <Destination> directory."
+CMD_HELP_DECODE = (
+    "Decodes RPGMaker files under <Source> directory or archive to <Destination> directory."
+)
 
 CMD_HELP_ENCODE = "Encodes image and audio files under <Source> directory."
 
@@ -45,4 +128,5 @@ TYPE_HELP = (
 
 # Click constants
 CLICK_SRC_PATH = click.Path(exists=True, file_okay=False, resolve_path=True)
+CLICK_ARCHIVE_SRC_PATH = click.Path(exists=True, resolve_path=True)
 CLICK_DST_PATH = click.Path(exists=False, writable=True, file_okay=False, resolve_path=True)
@@ -0,0 +1,45 @@
+"""`copymode.py` How the body of a file is copied after the header"""
+from enum import Enum, auto
+from typing import TypeVar
+
+from rpgmaker_mv_decoder.constants import COPY_CHUNK_SIZE
+
+_T = TypeVar("_T", bound="CopyMode")
+
+
+class CopyMode(Enum):
+    """`CopyMode` How the rest of a file is copied once the header has been handled
+
+    - `AUTO`: Picks one of the other modes for each file, based on its size
+    - `BUFFERED`: Reads into a reusable buffer and writes it out, works for every file
+    - `KERNEL`: `os.copy_file_range` or `os.sendfile`, the data never leaves the kernel
+    - `MMAP`: Maps the source file and writes straight from the mapping
+    """
+
+    AUTO = auto()
+    BUFFERED = auto()
+    KERNEL = auto()
+    MMAP = auto()
+
+    def resolve(self: _T, size: int, hashing: bool) -> _T:
+        """`resolve` Picks the mode to use for a file
+
+        Small files fit in a single buffer, so the extra system calls the other modes need cost
+        more than they save. Kernel copies can't be hashed, larger files that are hashed are
+        mapped instead so the hash is updated in one call.
+
+        Args:
+        - `size` (`int`): Bytes left to copy, `None` if the source isn't backed by a file\
+          descriptor, like archive members
+        - `hashing` (`bool`): If the data has to be hashed while it is copied
+
+        Returns:
+        - `CopyMode`: `BUFFERED`, `KERNEL` or `MMAP`
+        """
+        if size is None or (self == CopyMode.KERNEL and hashing):
+            return CopyMode.BUFFERED
+        if self != CopyMode.AUTO:
+            return self
+        if size < COPY_CHUNK_SIZE:
+            return CopyMode.BUFFERED
+        return CopyMode.MMAP if hashing else CopyMode.KERNEL
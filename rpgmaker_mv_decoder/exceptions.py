@@ -26,6 +26,14 @@ class NoValidFilesFound(Error):
     """
 
 
+class InvalidKeyError(Error):
+    """Exception raised when a key doesn't decode the files of a project. Based on `Error` class
+
+    Attributes:
+    - `message`: Explanation of the error
+    """
+
+
 class FileFormatError(Error):
     """Exception raised for errors in the input. Based on `Error` class
 
@@ -64,3 +72,12 @@ class RPGMakerHeaderError(FileFormatError):
     - `expression` -- Input expression in which the error occurred
     - `message` -- Explanation of the error
     """
+
+
+class OutputFormatError(FileFormatError):
+    """Exception raised for output formats that are unknown or can't be used.
+
+    Attributes:
+    - `expression` -- Output format that was asked for
+    - `message` -- Explanation of the error
+    """
@@ -0,0 +1,121 @@
+"""`filetypes.py` File type detection for decoded and encoded files
+
+Checks the start of a file against the formats RPGMaker ships (PNG, JPEG, OGG, M4A, MP4 and
+WebM) and only asks libmagic when none of them match.
+"""
+import struct
+from binascii import crc32
+from typing import Dict, List, Tuple
+
+import magic
+
+from rpgmaker_mv_decoder.constants import (
+    EBML_MAGIC,
+    FTYP_BOX,
+    IHDR_SECTION,
+    JPEG_MAGIC,
+    M4A_BRAND,
+    OGG_MAGIC,
+    PNG_MAGIC,
+    THEORA_HEADER,
+    WEBM_DOCTYPE,
+)
+
+# (offset, signature, mime type), checked in order
+_SIGNATURES: List[Tuple[int, bytes, str]] = [
+    (0, PNG_MAGIC, "image/png"),
+    (0, JPEG_MAGIC, "image/jpeg"),
+    (4, FTYP_BOX + M4A_BRAND, "audio/x-m4a"),
+    (4, FTYP_BOX, "video/mp4"),
+]
+# Encoded file extension: (offset, signature) of the file type the extension promises
+_ENCODED_SIGNATURES: Dict[str, Tuple[int, bytes]] = {
+    ".rpgmvp": (0, PNG_MAGIC),
+    ".rpgmvo": (0, OGG_MAGIC),
+    ".rpgmvm": (4, FTYP_BOX),
+}
+
+
+def _detect_ogg(data: bytes) -> str:
+    return "video/ogg" if THEORA_HEADER in data else "audio/ogg"
+
+
+def _detect_ebml(data: bytes) -> str:
+    return "video/webm" if WEBM_DOCTYPE in data else "video/x-matroska"
+
+
+def detect_signature(data: bytes) -> str:
+    """`detect_signature` Checks the start of a file against the known file signatures
+
+    Args:
+    - `data` (`bytes`): Start of the file
+
+    Returns:
+    - `str`: Mime type of the file, `None` if it isn't one of the known formats
+    """
+    if data.startswith(OGG_MAGIC):
+        return _detect_ogg(data)
+    if data.startswith(EBML_MAGIC):
+        return _detect_ebml(data)
+    offset: int
+    signature: bytes
+    mime_type: str
+    for (offset, signature, mime_type) in _SIGNATURES:
+        if data[offset : offset + len(signature)] == signature:
+            return mime_type
+    return None
+
+
+def is_promised_type(extension: str, data: bytes) -> bool:
+    """`is_promised_type` Checks the start of a decoded file against the file type its encoded
+    extension promises
+
+    Args:
+    - `extension` (`str`): Extension of the encoded file, like `".rpgmvp"`
+    - `data` (`bytes`): Start of the decoded file
+
+    Returns:
+    - `bool`: `True` if the file starts like the promised type. Extensions that promise no type\
+      fall back to the known file signatures.
+    """
+    if extension not in _ENCODED_SIGNATURES:
+        return detect_signature(data) is not None
+    (offset, signature) = _ENCODED_SIGNATURES[extension]
+    return data[offset : offset + len(signature)] == signature
+
+
+def is_png_ihdr(png_ihdr_data: bytes) -> bool:
+    """`is_png_ihdr` Checks the IHDR section of a PNG image against its checksum
+
+    The section isn't encoded by RPGMaker, so this tells if a file is a PNG image without a key.
+
+    Args:
+    - `png_ihdr_data` (`bytes`): The 17 bytes after the IHDR section name, the image header\
+      followed by its CRC
+
+    Returns:
+    - `bool`: `True` if the checksum matches
+    """
+    if len(png_ihdr_data) != 17:
+        return False
+    ihdr_data: bytes
+    crc: bytes
+    (ihdr_data, crc) = struct.unpack("!13s4s", png_ihdr_data)
+    return crc32(IHDR_SECTION + ihdr_data).to_bytes(4, "big") == crc
+
+
+def detect_mime_type(data: bytes) -> str:
+    """`detect_mime_type` Gets the mime type of a file from the start of the file
+
+    Uses the known file signatures first and falls back to libmagic.
+
+    Args:
+    - `data` (`bytes`): Start of the file, a few KB is enough
+
+    Returns:
+    - `str`: Mime type of the file
+    """
+    mime_type: str = detect_signature(data)
+    if mime_type is None:
+        mime_type = magic.from_buffer(data, mime=True)
+    return mime_type
@@ -0,0 +1,100 @@
+"""`key.py` Encryption key for a project
+
+The key is parsed once, every file after that only needs an integer XOR.
+"""
+from typing import Any, TypeVar, Union
+
+from rpgmaker_mv_decoder.constants import KEY_PATTERN
+from rpgmaker_mv_decoder.utils import xor_headers
+
+_T = TypeVar("_T", bound="Key")
+
+
+class Key:
+    """`Key` Immutable 16 byte key, stored as hex, bytes and an integer"""
+
+    __slots__ = ("_hex", "_bytes", "_int")
+    _hex: str
+    _bytes: bytes
+    _int: int
+
+    def __init__(self: _T, value: Union[str, bytes]) -> _T:
+        """`Key` Constructor
+
+        Args:
+        - `value` (`Union[str, bytes]`): 32 character hex string or 16 bytes
+
+        Raises:
+        - `ValueError`: If `value` isn't a valid key
+
+        Returns:
+        - `Key`: Object
+        """
+        if isinstance(value, str):
+            if not KEY_PATTERN.match(value):
+                raise ValueError(f"'{value}' is not a 32 character hex string")
+            raw: bytes = bytes.fromhex(value)
+        else:
+            raw = bytes(value)
+            if len(raw) != 16:
+                raise ValueError(f"Keys are 16 bytes, got {len(raw)}")
+        object.__setattr__(self, "_bytes", raw)
+        object.__setattr__(self, "_hex", raw.hex())
+        object.__setattr__(self, "_int", int.from_bytes(raw, "little"))
+
+    def __setattr__(self: _T, name: str, value: Any) -> None:
+        raise AttributeError(f"'{type(self).__name__}' is immutable")
+
+    def __str__(self: _T) -> str:
+        return self._hex
+
+    def __repr__(self: _T) -> str:
+        return f"{type(self).__name__}('{self._hex}')"
+
+    def __bytes__(self: _T) -> bytes:
+        return self._bytes
+
+    def __eq__(self: _T, other: Any) -> bool:
+        if isinstance(other, Key):
+            return self._bytes == other._bytes
+        return NotImplemented
+
+    def __hash__(self: _T) -> int:
+        return hash(self._bytes)
+
+    @property
+    def hex(self: _T) -> str:
+        """Key as a lower case hex string"""
+        return self._hex
+
+    def xor_header(self: _T, header: bytes) -> bytes:
+        """`xor_header` XORs a file header with the key
+
+        Args:
+        - `header` (`bytes`): Up to 16 bytes, shorter headers use the start of the key
+
+        Returns:
+        - `bytes`: Encoded or decoded header, the same length as `header`
+        """
+        size: int = len(header)
+        value: int = int.from_bytes(header, "little") ^ self._int
+        return (value & ((1 << (size * 8)) - 1)).to_bytes(size, "little")
+
+    def xor_into(self: _T, buffer: Union[bytearray, memoryview], offset: int = 0) -> None:
+        """`xor_into` XORs the 16 bytes at `offset` with the key, in place
+
+        Args:
+        - `buffer` (`Union[bytearray, memoryview]`): Writable buffer holding the header
+        - `offset` (`int`, optional): Where the header starts in `buffer`. Defaults to `0`.
+        """
+        end: int = min(offset + 16, len(buffer))
+        buffer[offset:end] = self.xor_header(buffer[offset:end])
+
+    def xor_headers(self: _T, headers: Union[bytearray, memoryview, Any]) -> None:
+        """`xor_headers` XORs many headers with the key in one call, in place
+
+        Args:
+        - `headers` (`Union[bytearray, memoryview, numpy.ndarray]`): Writable buffer holding\
+          16 byte headers back to back, or a `uint8` array shaped `[N, 16]`
+        """
+        xor_headers(headers, self._bytes)
@@ -0,0 +1,158 @@
+"""`manifest.py` Keeps track of files written by earlier runs
+
+Used for incremental decoding, files whose source and output haven't changed since they were
+recorded can be skipped with a couple of `stat` calls. Outputs that were touched without
+changing size are hashed to find out if their contents changed.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path, PurePath
+from typing import Any, Dict, TypeVar
+
+from rpgmaker_mv_decoder.constants import COPY_CHUNK_SIZE, MANIFEST_VERSION
+
+_T = TypeVar("_T", bound="Manifest")
+
+
+def _hash_file(filename: PurePath) -> str:
+    """`_hash_file` Hashes a file the way outputs are hashed while they are written
+
+    Args:
+    - `filename` (`PurePath`): File to hash
+
+    Returns:
+    - `str`: Hex digest, `None` if the file can't be read
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(filename, "rb") as file:
+            for chunk in iter(lambda: file.read(COPY_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class Manifest:
+    """`Manifest` Source and output details for every file written"""
+
+    def __init__(
+        self: _T,
+        filename: PurePath,
+        source: PurePath,
+        output_directory: PurePath,
+        options: Dict[str, Any] = None,
+    ) -> _T:
+        """`Manifest` Constructor, loads the manifest if it already exists
+
+        Args:
+        - `filename` (`PurePath`): Where the manifest is stored
+        - `source` (`PurePath`): Source directory, entries are stored relative to this
+        - `output_directory` (`PurePath`): Output directory, outputs are stored relative to this
+        - `options` (`Dict[str, Any]`, optional): Options that change the output. Entries\
+          recorded with different options are discarded. Defaults to `None`.
+        """
+        self.filename: PurePath = filename
+        self._source: PurePath = source
+        self._output_directory: PurePath = output_directory
+        self._options: Dict[str, Any] = options if options else {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._modified: bool = False
+        self._load()
+
+    def _load(self: _T) -> None:
+        try:
+            with open(self.filename, encoding="UTF-8") as file:
+                data: Dict[str, Any] = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != MANIFEST_VERSION or data.get("options") != self._options:
+            self._modified = True
+            return
+        self._entries = data.get("files", {})
+
+    def _source_name(self: _T, source: PurePath) -> str:
+        return PurePath(source).relative_to(self._source).as_posix()
+
+    def is_current(self: _T, source: PurePath, key: str) -> bool:
+        """`is_current` Checks if a file was already written and hasn't changed since
+
+        When only the modification time of the output changed, its contents are hashed and
+        compared with the recorded hash. A match updates the recorded time, so the output isn't
+        hashed again next run.
+
+        Args:
+        - `source` (`PurePath`): Source file
+        - `key` (`str`): Key used for this run
+
+        Returns:
+        - `bool`: `True` if the source and the output match what was recorded
+        """
+        name: str = self._source_name(source)
+        entry: Dict[str, Any] = self._entries.get(name)
+        if entry is None or entry["key"] != key:
+            return False
+        output: PurePath = self._output_directory.joinpath(entry["output"])
+        try:
+            source_stat: os.stat_result = os.stat(source)
+            output_stat: os.stat_result = os.stat(output)
+        except OSError:
+            return False
+        if (
+            source_stat.st_size != entry["size"]
+            or source_stat.st_mtime_ns != entry["mtime_ns"]
+            or output_stat.st_size != entry["output_size"]
+        ):
+            return False
+        if output_stat.st_mtime_ns == entry["output_mtime_ns"]:
+            return True
+        if _hash_file(output) != entry["output_hash"]:
+            return False
+        with self._lock:
+            self._entries[name] = dict(entry, output_mtime_ns=output_stat.st_mtime_ns)
+            self._modified = True
+        return True
+
+    def record(self: _T, source: PurePath, key: str, output: PurePath, output_hash: str) -> None:
+        """`record` Adds or replaces the entry for a file that was just written
+
+        Args:
+        - `source` (`PurePath`): Source file
+        - `key` (`str`): Key used to write the output
+        - `output` (`PurePath`): File that was written
+        - `output_hash` (`str`): Hash of the output file contents
+        """
+        source_stat: os.stat_result = os.stat(source)
+        output_stat: os.stat_result = os.stat(output)
+        entry: Dict[str, Any] = {
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+            "key": key,
+            "output": PurePath(output).relative_to(self._output_directory).as_posix(),
+            "output_size": output_stat.st_size,
+            "output_mtime_ns": output_stat.st_mtime_ns,
+            "output_hash": output_hash,
+        }
+        with self._lock:
+            self._entries[self._source_name(source)] = entry
+            self._modified = True
+
+    def save(self: _T) -> None:
+        """`save` Writes the manifest to disk if anything changed"""
+        with self._lock:
+            if not self._modified:
+                return
+            data: Dict[str, Any] = {
+                "version": MANIFEST_VERSION,
+                "options": self._options,
+                "files": self._entries,
+            }
+            os.makedirs(PurePath(self.filename).parent, exist_ok=True)
+            temp_file: Path = Path(f"{self.filename}.tmp")
+            with open(temp_file, "w", encoding="UTF-8") as file:
+                json.dump(data, file, indent=1, sort_keys=True)
+            os.replace(temp_file, self.filename)
+            self._modified = False
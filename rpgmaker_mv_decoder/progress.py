@@ -0,0 +1,21 @@
+"""`progress.py` Progress reported by the async API"""
+from pathlib import PurePath
+from typing import Any, NamedTuple
+
+
+class ProgressEvent(NamedTuple):
+    """`ProgressEvent` Sent each time a file has been handled
+
+    - `operation`: What is running, `"decode"`, `"encode"` or `"find_key"`
+    - `item`: File that was handled, `None` for the event sent once `find_key_async` is done
+    - `completed`: Number of files handled so far
+    - `total`: Number of files that will be handled if the operation runs to the end
+    - `result`: What handling the file returned. For `find_key_async` this is the confidence so
+      far, and the key for the last event.
+    """
+
+    operation: str
+    item: PurePath
+    completed: int
+    total: int
+    result: Any = None
@@ -0,0 +1,164 @@
+"""`progressreporter.py` Rate limited progress for the click progress bar and `Callbacks`"""
+import io
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List, TypeVar
+
+from click._termui_impl import ProgressBar
+
+from rpgmaker_mv_decoder.callbacks import Callbacks
+from rpgmaker_mv_decoder.clickdisplay import ClickDisplay
+from rpgmaker_mv_decoder.constants import PROGRESS_INTERVAL
+from rpgmaker_mv_decoder.utils import format_size
+
+_T = TypeVar("_T", bound="ProgressReporter")
+_B = TypeVar("_B", bound="WeightedProgressBar")
+
+
+class WeightedProgressBar(ProgressBar):
+    """`WeightedProgressBar` Click progress bar that can measure progress in bytes
+
+    When the size of the files is known, `pos`, `length`, `pct` and `eta` are in bytes, so a
+    few large audio files count for as long as they take to handle. The number of files is
+    kept in `files` and `files_total`.
+    """
+
+    def __init__(self: _B, files_total: int, bytes_total: int = None, **options: Any) -> _B:
+        """`WeightedProgressBar` constructor
+
+        Args:
+        - `files_total` (`int`): Number of files that will be handled
+        - `bytes_total` (`int`, optional): Size of those files, `None` measures progress in\
+          files. Defaults to `None`.
+        - `options` (`Any`): Passed on to `ProgressBar`
+        """
+        ProgressBar.__init__(
+            self, None, length=files_total if bytes_total is None else bytes_total, **options
+        )
+        self.files: int = 0
+        self.files_total: int = files_total
+        self.bytes_total: int = bytes_total
+
+    @property
+    def rate(self: _B) -> float:
+        """Bytes handled per second, `0.0` until it is known or when progress is in files"""
+        if self.bytes_total is None or not self.time_per_iteration:
+            return 0.0
+        return 1.0 / self.time_per_iteration
+
+
+class ProgressReporter:
+    """`ProgressReporter` Counts handled files and passes the progress on at a fixed rate
+
+    Counting a file only adds to a total. The progress bar is redrawn and
+    `Callbacks.progressbar` is called at most once every `interval` seconds, with everything
+    counted since the last update, so projects with many small files don't spend their time
+    drawing progress.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self: _T,
+        callbacks: Callbacks,
+        items: List[Path],
+        label: str,
+        render: bool = True,
+        interval: float = PROGRESS_INTERVAL,
+        sizes: Callable[[Path], int] = None,
+    ) -> _T:
+        """`ProgressReporter` constructor
+
+        Args:
+        - `callbacks` (`Callbacks`): Callbacks to pass the progress to
+        - `items` (`List[Path]`): Files that will be handled
+        - `label` (`str`): Label shown before the progress bar
+        - `render` (`bool`, optional): Draw the progress bar on the terminal. `Callbacks` are\
+          still called when it is off. Defaults to `True`.
+        - `interval` (`float`, optional): Seconds between updates. Defaults to\
+          `PROGRESS_INTERVAL`.
+        - `sizes` (`Callable[[Path], int]`, optional): Gets the size of a file, progress is\
+          measured in bytes when set. Defaults to `None`.
+        """
+        self._callbacks: Callbacks = callbacks
+        self._interval: float = interval
+        self._sizes: Callable[[Path], int] = sizes
+        self._lock: threading.Lock = threading.Lock()
+        self._pending_files: int = 0
+        self._pending_steps: int = 0
+        self._item: Path = None
+        self._next_update: float = 0.0
+        self._canceled: bool = False
+        self._display: ClickDisplay = ClickDisplay(items)
+        # `ProjectPaths.source_size` asks the directory entries found while listing the files,
+        # each file is stat'ed once and only when progress is measured in bytes
+        # A bar writing to a stream that isn't a terminal only writes its label, once
+        self.progressbar: WeightedProgressBar = WeightedProgressBar(
+            len(items),
+            None if sizes is None else sum(sizes(item) for item in items),
+            label=label,
+            width=0,
+            item_show_func=self._show_item,
+            file=None if render else io.StringIO(),
+            # The look of `click.progressbar`
+            bar_template="%(label)s  [%(bar)s]  %(info)s",
+            empty_char="-",
+        )
+
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
+
+    def __enter__(self: _T) -> _T:
+        self.progressbar.__enter__()
+        return self
+
+    def __exit__(self: _T, *args: Any) -> None:
+        with self._lock:
+            if self._pending_files:
+                self._flush()
+        self.progressbar.__exit__(*args)
+
+    def _show_item(self: _T, item: Path) -> str:
+        text: str = self._display.show_item(item)
+        if not self.progressbar.rate:
+            return text
+        rate: str = f"{format_size(self.progressbar.rate)}/s"
+        return rate if text is None else f"{rate} {text}"
+
+    def _flush(self: _T) -> None:
+        """`_flush` Passes on the progress counted so far, called with the lock held"""
+        self.progressbar.files += self._pending_files
+        # Set on its own, `update` only takes the item from Click 8.0
+        self.progressbar.current_item = self._item
+        self.progressbar.update(self._pending_steps)
+        self._pending_files = 0
+        self._pending_steps = 0
+        self._next_update = time.monotonic() + self._interval
+        if self._callbacks.progressbar(self.progressbar):
+            self._canceled = True
+
+    def update(self: _T, item: Path, count: int = 1) -> bool:
+        """`update` Counts handled files, safe to call from any thread
+
+        Args:
+        - `item` (`Path`): Last file handled, shown next to the progress bar
+        - `count` (`int`, optional): Number of files handled. Defaults to `1`.
+
+        Returns:
+        - `bool`: `True` if the user has canceled the operation
+        """
+        with self._lock:
+            self._pending_files += count
+            self._pending_steps += count if self._sizes is None else self._sizes(item)
+            self._item = item
+            if time.monotonic() >= self._next_update:
+                self._flush()
+            return self._canceled
+
+    def complete(self: _T) -> None:
+        """`complete` Counts every file left as handled, for operations that finish early"""
+        with self._lock:
+            self._pending_files = self.progressbar.files_total - self.progressbar.files
+            self._pending_steps = self.progressbar.length - self.progressbar.pos
+            self._flush()
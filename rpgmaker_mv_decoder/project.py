@@ -2,40 +2,98 @@
 
 Module for dealing with RPGMaker projects
 """
+
 # pylint: disable=duplicate-code
 
-import os
-import re
+import asyncio
+import hashlib
+import threading
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path, PurePath
-from typing import TypeVar
-
-import click
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from rpgmaker_mv_decoder.callbacks import Callbacks
+from rpgmaker_mv_decoder.conflictpolicy import ConflictPolicy
+from rpgmaker_mv_decoder.constants import (
+    COPY_CHUNK_SIZE,
+    DETECT_TYPE_SIZE,
+    KEY_FINDER_HEADER_SIZE,
+    KEY_PATTERN,
+    MANIFEST_FILENAME,
+    MAX_LISTED_CONFLICTS,
+    OGG_MAGIC,
+    PNG_HEADER,
+    RPG_MAKER_MV_MAGIC,
+)
+from rpgmaker_mv_decoder.copymode import CopyMode
+from rpgmaker_mv_decoder.exceptions import OutputFormatError
+from rpgmaker_mv_decoder.filetypes import is_png_ihdr
+from rpgmaker_mv_decoder.key import Key
+from rpgmaker_mv_decoder.manifest import Manifest
 from rpgmaker_mv_decoder.messagetypes import MessageType
+from rpgmaker_mv_decoder.progress import ProgressEvent
+from rpgmaker_mv_decoder.progressreporter import ProgressReporter
 from rpgmaker_mv_decoder.projectpaths import ProjectPaths
 from rpgmaker_mv_decoder.promptresponse import PromptResponse
+from rpgmaker_mv_decoder.sinks import (
+    OUTPUT_FORMATS,
+    DirectorySink,
+    Sink,
+    archive_filename,
+    open_sink,
+)
 
 _T = TypeVar("_T", bound="Project")
 
 
+def _numbered_name(filename: PurePath, count: int, suffix: str = None) -> PurePath:
+    """`_numbered_name` Adds a number to a file name, like `Actor1 (1).png`
+
+    Args:
+    - `filename` (`PurePath`): File name to number
+    - `count` (`int`): Number to add
+    - `suffix` (`str`, optional): Suffix kept after the number, for suffixes with more than one\
+      part like `.tar.zst`. Defaults to the last suffix of `filename`.
+
+    Returns:
+    - `PurePath`: Numbered file name
+    """
+    suffix = PurePath(filename).suffix if suffix is None else suffix
+    stem: str = filename.name[: len(filename.name) - len(suffix)]
+    return filename.with_name(f"{stem} ({count}){suffix}")
+
+
 class Project(ABC):
     """Handles a project and runs operations"""
 
+    # pylint: disable=too-many-instance-attributes
+
     def __init__(
         self: _T,
-        source_path: PurePath = None,
+        source_path: Union[PurePath, ProjectPaths] = None,
         destination_path: PurePath = None,
-        key: str = None,
+        key: Union[str, Key] = None,
         callbacks: Callbacks = Callbacks(),
     ) -> _T:
         """`Project` constructor
 
         Args:
-        - `source` (`PurePath`): Where to find the files
+        - `source` (`Union[PurePath, ProjectPaths]`): Where to find the files, or the paths of\
+          another project to share its file listing and the headers it has read
         - `destination` (`PurePath`): Where to save the files
-        - `key` (`str`): Key to use
+        - `key` (`Union[str, Key]`): Key to use
         - `callbacks` (`Callback`, optional): Callbacks to run on events.\
           Defaults to `Callback()`.
         - `overwrite` (`bool`, optional): if files should be overwritten. `None` will cause the\
@@ -47,13 +105,70 @@ class Project(ABC):
         Notes:
         - This is an Abstract Base Class, do not use this directly
         """
-        self.project_paths: ProjectPaths = ProjectPaths(source_path, destination_path)
-        self.key: str = key
+        self.project_paths: ProjectPaths
+        if isinstance(source_path, ProjectPaths):
+            # Shared with another project, the file listing and headers read are reused
+            self.project_paths = source_path
+            if destination_path is not None:
+                self.project_paths.destination = destination_path
+        else:
+            self.project_paths = ProjectPaths(source_path, destination_path)
+        self._key: Key = None
+        self.key = key
         self._callbacks: Callbacks = callbacks
-        self._overwrite: bool = None
+        self._conflict_policy: ConflictPolicy = ConflictPolicy.PROMPT
+        self._conflicts: List[Tuple[PurePath, PurePath]] = []
+        self._workers: int = 1
+        self._prompt_lock: threading.Lock = threading.Lock()
+        self._canceled: bool = False
+        self._chunk_size: int = COPY_CHUNK_SIZE
+        self._detect_type_size: int = DETECT_TYPE_SIZE
+        self._incremental: bool = False
+        self._manifest: Manifest = None
+        self._output_format: str = "directory"
+        self._copy_mode: CopyMode = CopyMode.AUTO
+        self._sink: Sink = DirectorySink(None)
+        self._buffers: threading.local = threading.local()
+        self._show_progress: bool = True
+
+    def _get_buffer(self: _T) -> memoryview:
+        """`_get_buffer` Returns the copy buffer for the calling thread
+
+        The buffer is allocated once per thread and reused for every file.
+
+        Returns:
+        - `memoryview`: Buffer of `chunk_size` bytes
+        """
+        buffer: memoryview = getattr(self._buffers, "buffer", None)
+        if buffer is None or len(buffer) != self.chunk_size:
+            buffer = memoryview(bytearray(self.chunk_size))
+            self._buffers.buffer = buffer
+        return buffer
+
+    def _progress(
+        self: _T, files: List[Path], label: str, by_size: bool = False
+    ) -> ProgressReporter:
+        """`_progress` Creates the progress reporter for an operation
+
+        Args:
+        - `files` (`List[Path]`): Files that will be handled
+        - `label` (`str`): Label shown before the progress bar
+        - `by_size` (`bool`, optional): Measure progress in bytes, for operations that read\
+          whole files. Defaults to `False`.
+
+        Returns:
+        - `ProgressReporter`: Reporter to use as a context manager
+        """
+        return ProgressReporter(
+            self._callbacks,
+            files,
+            label,
+            self.show_progress,
+            sizes=self.project_paths.source_size if by_size else None,
+        )
 
     def _save_file(self: _T, filename: PurePath, data: bytes) -> bool:
-        """`_save_file` Saves the file to disk, calling the overwrite callback
+        """`_save_file` Saves the file to disk, applying `conflict_policy`
         if the file exists already.
 
         Args:
@@ -63,50 +178,515 @@ class Project(ABC):
         Returns:
         - `bool`: True if the current operation should continue
         """
-        overwrite: bool = True
+        return self._save_stream(filename, data, None)
 
-        if Path(filename).exists():
-            if self.overwrite is None:
-                response = self._callbacks.prompt(
-                    MessageType.WARNING,
-                    f"""The file:
-  {filename}
-Is about to be overwritten.""",
-                    PromptResponse.YES_NO_CANCEL,
-                )
-                if response is None:
-                    return False
-            else:
-                overwrite = self.overwrite
-        if overwrite:
+    def _save_stream(
+        self: _T,
+        filename: PurePath,
+        header: bytes,
+        source: BinaryIO,
+        source_path: PurePath = None,
+    ) -> bool:
+        """`_save_stream` Saves `header` followed by the rest of `source` to disk, applying
+        `conflict_policy` if the file exists already.
+
+        The body is never read into memory as a whole, it is either copied by the OS or in
+        `chunk_size` pieces.
+
+        Args:
+        - `filename` (`PurePath`): File to save
+        - `header` (`bytes`): What to write at the start of the file
+        - `source` (`BinaryIO`): Open file, everything after the current position is written\
+          after `header`. `None` writes only `header`.
+        - `source_path` (`PurePath`, optional): Where `source` was read from. When set and\
+          `incremental` is on, the file is recorded in the manifest. Files that conflict are\
+          handled again from here by `_resolve_conflicts`. Defaults to `None`.
+
+        Returns:
+        - `bool`: True if the current operation should continue
+        """
+        # Only an existing file needs a decision, the failed open replaces a separate check
+        try:
+            self._write_stream(
+                filename,
+                header,
+                source,
+                source_path,
+                self.conflict_policy == ConflictPolicy.OVERWRITE,
+            )
+        except FileExistsError:
+            self._handle_conflict(filename, header, source, source_path)
+        return not self._canceled
+
+    def _handle_conflict(
+        self: _T,
+        filename: PurePath,
+        header: bytes,
+        source: BinaryIO,
+        source_path: PurePath = None,
+    ) -> None:
+        """`_handle_conflict` Applies `conflict_policy` to a file that already exists
+
+        With `ConflictPolicy.PROMPT` the file is left alone and remembered, so the user can be\
+        asked about every conflict at once by `_resolve_conflicts`.
+
+        Args:
+        - `filename` (`PurePath`): File that already exists
+        - `header` (`bytes`): What to write at the start of the file
+        - `source` (`BinaryIO`): Open file to copy the rest from, `None` writes only `header`
+        - `source_path` (`PurePath`, optional): Where `source` was read from. Defaults to\
+          `None`.
+        """
+        policy: ConflictPolicy = self.conflict_policy
+        if policy == ConflictPolicy.PROMPT and source_path is not None:
+            with self._prompt_lock:
+                self._conflicts.append((source_path, filename))
+            return
+        if policy == ConflictPolicy.PROMPT:
+            # Nothing to handle the file again with later, ask now
+            policy = ConflictPolicy.from_overwrite(self._should_replace(filename))
+        if policy == ConflictPolicy.RENAME:
+            self._write_renamed(filename, header, source, source_path)
+            return
+        if policy == ConflictPolicy.SKIP_IF_IDENTICAL and not self._sink.is_identical(
+            filename, header, source, self._get_buffer()
+        ):
+            policy = ConflictPolicy.OVERWRITE
+        if policy == ConflictPolicy.NEWER_WINS and source_path is not None:
+            if self.project_paths.source_modified(source_path) > self._sink.modified(filename):
+                policy = ConflictPolicy.OVERWRITE
+        if policy == ConflictPolicy.OVERWRITE:
+            self._write_stream(filename, header, source, source_path)
+
+    def _write_renamed(
+        self: _T,
+        filename: PurePath,
+        header: bytes,
+        source: BinaryIO,
+        source_path: PurePath = None,
+    ) -> None:
+        """`_write_renamed` Writes to the first free name like `Actor1 (1).png`
+
+        Args:
+        - `filename` (`PurePath`): File that already exists
+        - `header` (`bytes`): What to write at the start of the file
+        - `source` (`BinaryIO`): Open file to copy the rest from, `None` writes only `header`
+        - `source_path` (`PurePath`, optional): Where `source` was read from. Defaults to\
+          `None`.
+        """
+        count: int = 1
+        while True:
+            renamed: PurePath = _numbered_name(filename, count)
             try:
-                os.makedirs(filename.parent)
+                self._write_stream(renamed, header, source, source_path, False)
+                return
             except FileExistsError:
-                pass
-            with click.open_file(filename, mode="wb") as file:
-                file.write(data)
+                count += 1
+
+    def _should_replace(self: _T, filename: PurePath) -> bool:
+        """`_should_replace` Asks the user if an existing file should be replaced
+
+        Args:
+        - `filename` (`PurePath`): File about to be written
+
+        Returns:
+        - `bool`: `True` to write the file, `False` to skip it and `None` to cancel
+        """
+        # Only one prompt may be shown at a time when running with multiple workers
+        with self._prompt_lock:
+            if self._canceled:
+                return None
+            response = self._callbacks.prompt(
+                MessageType.WARNING,
+                f"""The file:
+  {filename}
+Is about to be overwritten.""",
+                PromptResponse.YES_NO_CANCEL,
+            )
+            if response is None:
+                self._canceled = True
+            return response
+
+    def _resolve_conflicts(self: _T, function: Callable[[PurePath], Any]) -> None:
+        """`_resolve_conflicts` Asks once about every file left alone by `ConflictPolicy.PROMPT`
+
+        If the user agrees, the files are handled again with `ConflictPolicy.OVERWRITE`.
+
+        Args:
+        - `function` (`Callable[[PurePath], Any]`): Handles one source file, the same function\
+          that ran when the conflict was found
+        """
+        conflicts: List[Tuple[PurePath, PurePath]] = sorted(self._conflicts)
+        self._conflicts = []
+        if not conflicts or self._canceled:
+            return
+        listed: List[str] = [f"  {filename}" for (_, filename) in conflicts[:MAX_LISTED_CONFLICTS]]
+        if len(conflicts) > len(listed):
+            listed.append(f"  ... and {len(conflicts) - len(listed)} more")
+        listing: str = "\n".join(listed)
+        if not self._callbacks.prompt(
+            MessageType.WARNING,
+            f"""{len(conflicts)} files already exist:
+{listing}
+Are about to be overwritten.""",
+            PromptResponse.YES_NO,
+        ):
+            return
+        policy: ConflictPolicy = self.conflict_policy
+        self._conflict_policy = ConflictPolicy.OVERWRITE
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for _ in executor.map(function, [source for (source, _) in conflicts]):
+                    pass
+        finally:
+            self._conflict_policy = policy
+
+    def _check_sample(self: _T, filename: PurePath) -> bool:
+        """`_check_sample` Checks if the key decodes a file to the type its extension promises
+
+        Args:
+        - `filename` (`PurePath`): Encoded image or audio file
+
+        Returns:
+        - `bool`: `True` if it does, `None` if the file can't tell, like an image that isn't a\
+          PNG image
+        """
+        header: bytes = self.project_paths.read_source_header(filename, KEY_FINDER_HEADER_SIZE)
+        if len(header) < 32 or header[:16] != RPG_MAKER_MV_MAGIC:
+            return None
+        decoded: bytes = self._key.xor_header(header[16:32])
+        if PurePath(filename).suffix == ".rpgmvo":
+            return decoded.startswith(OGG_MAGIC)
+        # The IHDR section isn't encoded, when it checks out the file is a PNG image whatever the
+        # key is, so a wrong decoded header can only be a wrong key
+        if not is_png_ihdr(header[32:KEY_FINDER_HEADER_SIZE]):
+            return None
+        return decoded == PNG_HEADER
+
+    def _start(self: _T) -> None:
+        """`_start` Clears what a previous run left behind"""
+        self._canceled = False
+        self._conflicts = []
+        # The output may have been removed since, so directories made last run are made again
+        self._reset_sink()
+
+    def _write_stream(
+        self: _T,
+        filename: PurePath,
+        header: bytes,
+        source: BinaryIO,
+        source_path: PurePath = None,
+        replace: bool = True,
+    ) -> None:
+        """`_write_stream` Writes `header` followed by the rest of `source` to disk
+
+        Args:
+        - `filename` (`PurePath`): File to write
+        - `header` (`bytes`): What to write at the start of the file
+        - `source` (`BinaryIO`): Open file to copy the rest from, `None` writes only `header`
+        - `source_path` (`PurePath`, optional): Where `source` was read from, used for the\
+          manifest. Defaults to `None`.
+        - `replace` (`bool`, optional): Replace an existing file. Defaults to `True`.
+
+        Raises:
+        - `FileExistsError`: If `replace` is `False` and the file exists
+        """
+        digest = None
+        if self._manifest is not None and source_path is not None:
+            digest = hashlib.blake2b(header, digest_size=16)
+        size: int = None
+        if source is not None and source_path is not None:
+            # The size is known from the listing, archive members can't tell without reading
+            size = self.project_paths.source_size(source_path) - source.tell()
+        self._sink.write(filename, header, source, self._get_buffer(), digest, replace, size)
+        if digest is not None:
+            self._manifest.record(source_path, self.key, filename, digest.hexdigest())
+
+    def _open_manifest(self: _T, options: Dict[str, Any] = None) -> None:
+        """`_open_manifest` Loads the manifest from the output directory if `incremental` is on
+
+        Args:
+        - `options` (`Dict[str, Any]`, optional): Options that change the output files.\
+          Defaults to `None`.
+        """
+        self._manifest = None
+        if self.incremental and self.project_paths.archive is not None:
+            self._callbacks.warning("Incremental decoding is not supported for archives")
+        elif self.incremental and self._sink.filename is not None:
+            self._callbacks.warning("Incremental decoding is not supported for archive output")
+        elif self.incremental:
+            self._manifest = Manifest(
+                self.project_paths.output_directory.joinpath(MANIFEST_FILENAME),
+                self.project_paths.source,
+                self.project_paths.output_directory,
+                options,
+            )
+
+    def _close_manifest(self: _T) -> None:
+        """`_close_manifest` Saves the manifest if `incremental` is on"""
+        if self._manifest is not None:
+            self._manifest.save()
+            self._manifest = None
+
+    def _open_sink(self: _T) -> bool:
+        """`_open_sink` Starts writing to `output_format`
+
+        For archive formats, `conflict_policy` decides what happens to an archive that already\
+        exists.
+
+        Raises:
+        - `OutputFormatError`: If `conflict_policy` can't be used with `output_format`
+
+        Returns:
+        - `bool`: `False` if the archive shouldn't be replaced
+        """
+        filename: PurePath = archive_filename(
+            self.output_format, self.project_paths.output_directory
+        )
+        # Members of an archive being streamed can't be read back to compare, and the archive is
+        # written as a whole so there is nothing older to keep
+        if filename is not None and self.conflict_policy in (
+            ConflictPolicy.SKIP_IF_IDENTICAL,
+            ConflictPolicy.NEWER_WINS,
+        ):
+            raise OutputFormatError(
+                self.output_format,
+                f"'{self.conflict_policy.value}' can't be used with {self.output_format} output",
+            )
+        if filename is not None and Path(filename).exists():
+            filename = self._archive_to_write(filename)
+            if filename is None:
+                return False
+        self._sink = open_sink(
+            self.output_format, self.project_paths.output_directory, self.copy_mode, filename
+        )
         return True
 
+    def _archive_to_write(self: _T, filename: PurePath) -> PurePath:
+        """`_archive_to_write` Decides what to do with an output archive that already exists
+
+        Args:
+        - `filename` (`PurePath`): Archive about to be written
+
+        Returns:
+        - `PurePath`: Archive to write, a new name with `ConflictPolicy.RENAME`. `None` to stop.
+        """
+        if self.conflict_policy == ConflictPolicy.RENAME:
+            count: int = 1
+            while True:
+                renamed: PurePath = _numbered_name(
+                    filename, count, OUTPUT_FORMATS[self.output_format]
+                )
+                if not Path(renamed).exists():
+                    return renamed
+                count += 1
+        if self.conflict_policy == ConflictPolicy.PROMPT:
+            replace: bool = self._should_replace(filename)
+        else:
+            # The archive is rebuilt from scratch, so only skipping keeps the old one
+            replace = self.conflict_policy != ConflictPolicy.SKIP
+        return filename if replace else None
+
+    def _close_outputs(self: _T) -> None:
+        """`_close_outputs` Saves the manifest and finishes the output archive"""
+        self._close_manifest()
+        self._sink.close()
+        self._reset_sink()
+
+    def _reset_sink(self: _T) -> None:
+        """`_reset_sink` Goes back to writing files to the output directory"""
+        self._sink = DirectorySink(None)
+        self._sink.copy_mode = self.copy_mode
+
+    @property
+    def output_location(self: _T) -> PurePath:
+        """Where files are being written, the archive file or the output directory"""
+        return self._sink.filename or self.project_paths.output_directory
+
+    def _is_unchanged(self: _T, source_path: PurePath) -> bool:
+        """`_is_unchanged` Checks the manifest to see if a file can be skipped
+
+        Args:
+        - `source_path` (`PurePath`): File to check
+
+        Returns:
+        - `bool`: `True` if the file and its output haven't changed since they were recorded
+        """
+        return self._manifest is not None and self._manifest.is_current(source_path, self.key)
+
+    def cancel(self: _T) -> None:
+        """`cancel` Asks a running operation to stop
+
+        Files that are already being handled are finished, no new files are started. Safe to
+        call from any thread.
+        """
+        self._canceled = True
+
+    async def _run_async(
+        self: _T,
+        operation: str,
+        list_files: Callable[[], List[Path]],
+        function: Callable[[Path], Any],
+        finish: Callable[[], None] = None,
+    ) -> AsyncIterator[ProgressEvent]:
+        """`_run_async` Runs `function` on every file from the event loop
+
+        The files are handled by `workers` threads, with at most `2 * workers` files queued.
+        Stops early if `cancel` is called, or when the task running it is cancelled or closes\
+        the iterator. Files already being handled are allowed to finish either way.
+
+        Args:
+        - `operation` (`str`): Name of the operation, copied into every event
+        - `list_files` (`Callable[[], List[Path]]`): Returns the files to handle, runs on the\
+          default executor so scanning the project doesn't block the event loop
+        - `function` (`Callable[[Path], Any]`): Handles one file, runs on a worker thread
+        - `finish` (`Callable[[], None]`, optional): Called once every file being handled has\
+          finished. Defaults to `None`.
+
+        Returns:
+        - `AsyncIterator[ProgressEvent]`: An event for each file, in the order they finish
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        files: List[Path] = await loop.run_in_executor(None, list_files)
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=self.workers)
+        remaining: Iterator[Path] = iter(files)
+        pending: Dict[asyncio.Future, Path] = {}
+        completed: int = 0
+        try:
+            while not self._canceled:
+                while len(pending) < self.workers * 2:
+                    filename: Path = next(remaining, None)
+                    if filename is None:
+                        break
+                    pending[loop.run_in_executor(executor, function, filename)] = filename
+                if not pending:
+                    break
+                (done, _) = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    completed += 1
+                    yield ProgressEvent(
+                        operation, pending.pop(future), completed, len(files), future.result()
+                    )
+            await loop.run_in_executor(None, self._resolve_conflicts, function)
+        finally:
+            for future in pending:
+                future.cancel()
+            # Wait for the files being written without blocking the event loop
+            await loop.run_in_executor(None, executor.shutdown)
+            if finish is not None:
+                finish()
+
+    @property
+    def incremental(self: _T) -> bool:
+        """if files that haven't changed since the last run should be skipped"""
+        return self._incremental
+
+    @incremental.setter
+    def incremental(self: _T, value: bool):
+        """if files that haven't changed since the last run should be skipped"""
+        self._incremental = bool(value)
+
+    @property
+    def show_progress(self: _T) -> bool:
+        """if a progress bar is drawn on the terminal. `Callbacks` are still called when it is\
+        off."""
+        return self._show_progress
+
+    @show_progress.setter
+    def show_progress(self: _T, value: bool):
+        """if a progress bar is drawn on the terminal"""
+        self._show_progress = bool(value)
+
+    @property
+    def output_format(self: _T) -> str:
+        """How files are written, one of `sinks.OUTPUT_FORMATS`. Defaults to `"directory"`."""
+        return self._output_format
+
+    @output_format.setter
+    def output_format(self: _T, value: str):
+        """How files are written, one of `sinks.OUTPUT_FORMATS`. `None` uses `"directory"`."""
+        self._output_format = value if value else "directory"
+
     @property
     def overwrite(self: _T) -> bool:
-        """if files should be overwritten. `None` will cause the system to prompt the user."""
-        return self._overwrite
+        """if files should be overwritten. `None` will cause the system to prompt the user.
+
+        Kept for compatibility, `None` is also returned for the policies other than overwrite and\
+        skip, see `conflict_policy`."""
+        return self._conflict_policy.to_overwrite()
 
     @overwrite.setter
     def overwrite(self: _T, value: bool) -> bool:
         """if files should be overwritten. `None` will cause the system to prompt the user."""
-        self._overwrite = value
+        self._conflict_policy = ConflictPolicy.from_overwrite(value)
+
+    @property
+    def conflict_policy(self: _T) -> ConflictPolicy:
+        """What to do when an output file already exists. Defaults to `ConflictPolicy.PROMPT`."""
+        return self._conflict_policy
+
+    @conflict_policy.setter
+    def conflict_policy(self: _T, value: Union[ConflictPolicy, str]):
+        """What to do when an output file already exists, a `ConflictPolicy` or its name. `None`\
+        uses `ConflictPolicy.PROMPT`."""
+        self._conflict_policy = ConflictPolicy(value) if value else ConflictPolicy.PROMPT
+
+    @property
+    def copy_mode(self: _T) -> CopyMode:
+        """How file bodies are copied after the header. Defaults to `CopyMode.AUTO`."""
+        return self._copy_mode
+
+    @copy_mode.setter
+    def copy_mode(self: _T, value: CopyMode):
+        """How file bodies are copied after the header. `None` uses `CopyMode.AUTO`."""
+        self._copy_mode = value if value else CopyMode.AUTO
+        self._sink.copy_mode = self._copy_mode
+
+    @property
+    def chunk_size(self: _T) -> int:
+        """Size in bytes of the buffer used to copy file contents"""
+        return self._chunk_size
+
+    @chunk_size.setter
+    def chunk_size(self: _T, value: int):
+        """Size in bytes of the buffer used to copy file contents. Values less than `1` use the
+        default `COPY_CHUNK_SIZE`"""
+        self._chunk_size = int(value) if value and value > 0 else COPY_CHUNK_SIZE
+
+    @property
+    def detect_type_size(self: _T) -> int:
+        """Number of bytes at the start of each file used to detect the file type"""
+        return self._detect_type_size
+
+    @detect_type_size.setter
+    def detect_type_size(self: _T, value: int):
+        """Number of bytes at the start of each file used to detect the file type. Values less
+        than `1` use the default `DETECT_TYPE_SIZE`"""
+        self._detect_type_size = int(value) if value and value > 0 else DETECT_TYPE_SIZE
+
+    @property
+    def workers(self: _T) -> int:
+        """Number of files to process at the same time. `1` processes files one at a time."""
+        return self._workers
+
+    @workers.setter
+    def workers(self: _T, value: int):
+        """Number of files to process at the same time. Values less than `1` are treated as
+        `1`"""
+        self._workers = max(1, int(value)) if value else 1
 
     @property
     def key(self: _T) -> str:
         """Gets the `key` or returns `None` if the key is not valid"""
-        return self._key if self._key else None
+        return self._key.hex if self._key else None
 
     @key.setter
-    def key(self: _T, value: str):
-        """Sets the `key`. Must be a 32 charcater hex string or the key will be set to `None`"""
-        if value:
-            if re.compile(r"^[0-9a-fA-F]{32}$").match(value):
-                self._key = value
-                return
-        self._key = None
+    def key(self: _T, value: Union[str, Key]):
+        """Sets the `key`. Must be a `Key` or a 32 charcater hex string or the key will be set to\
+        `None`"""
+        if isinstance(value, Key):
+            self._key = value
+        elif value and KEY_PATTERN.match(value):
+            self._key = Key(value)
+        else:
+            self._key = None
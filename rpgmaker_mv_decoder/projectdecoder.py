@@ -1,19 +1,40 @@
 """Class for decoding a project"""
 
 
+import asyncio
+import contextlib
+import functools
+import io
 import struct
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path, PurePath
-from typing import List, TypeVar
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Set, Tuple, TypeVar, Union
 
 import click
-import magic
 
 from rpgmaker_mv_decoder.callbacks import Callbacks
-from rpgmaker_mv_decoder.clickdisplay import ClickDisplay
-from rpgmaker_mv_decoder.constants import OCT_STREAM, RPG_MAKER_MV_MAGIC
-from rpgmaker_mv_decoder.exceptions import FileFormatError, RPGMakerHeaderError
+from rpgmaker_mv_decoder.constants import (
+    DECODED_EXTENSIONS,
+    ENCODED_AUDIO_EXTENSIONS,
+    KEY_CHECK_SAMPLES,
+    MAX_CONSECUTIVE_INVALID,
+    OCT_STREAM,
+    RPG_MAKER_MV_MAGIC,
+)
+from rpgmaker_mv_decoder.exceptions import (
+    FileFormatError,
+    InvalidKeyError,
+    NoValidFilesFound,
+    RPGMakerHeaderError,
+)
+from rpgmaker_mv_decoder.filetypes import detect_mime_type, is_promised_type
+from rpgmaker_mv_decoder.key import Key
+from rpgmaker_mv_decoder.progress import ProgressEvent
+from rpgmaker_mv_decoder.progressreporter import ProgressReporter
 from rpgmaker_mv_decoder.project import Project
-from rpgmaker_mv_decoder.utils import int_xor
+from rpgmaker_mv_decoder.projectpaths import ProjectPaths
+from rpgmaker_mv_decoder.utils import PrefixedReader
 
 _T = TypeVar("_T", bound="ProjectDecoder")
 
@@ -23,17 +44,18 @@ class ProjectDecoder(Project):
 
     def __init__(
         self: _T,
-        source: PurePath,
+        source: Union[PurePath, ProjectPaths],
         destination: PurePath,
-        key: str,
+        key: Union[str, Key],
         callbacks: Callbacks = Callbacks(),
     ) -> _T:
         """`ProjectDecoder` constructor
 
         Args:
-        - `source` (`PurePath`): Where to find the files to decode
+        - `source` (`Union[PurePath, ProjectPaths]`): Where to find the files to decode, or the\
+          paths of the `ProjectKeyFinder` that found the key so its work is reused
         - `destination` (`PurePath`): Where to save the files to decode
-        - `key` (`str`): Key to use when decoding
+        - `key` (`Union[str, Key]`): Key to use when decoding
         - `callbacks` (`Callback`, optional): Callbacks to run on events.\
           Defaults to `Callback()`.
 
@@ -41,17 +63,90 @@ class ProjectDecoder(Project):
         - `ProjectDecoder`: object to run actions on
         """
         Project.__init__(self, source, destination, key, callbacks)
+        self._verify_key: bool = True
+        self._max_invalid: int = MAX_CONSECUTIVE_INVALID
+        self._invalid_lock: threading.Lock = threading.Lock()
+        self._invalid_count: int = 0
 
-    def _get_output_filename(self: _T, filename: Path, data: bytes = None) -> str:
-        """`_get_output_filename` Returns a file name for the specified file
+    def _start(self: _T) -> None:
+        Project._start(self)
+        self._invalid_count = 0
 
-        If data is not `None`, uses libmagic to figure out the actual file type
-        and place a proper extension on the file. Otherwise it uses the
-        original name to generate the extension.
+    def validate_key(self: _T, samples: int = KEY_CHECK_SAMPLES) -> None:
+        """`validate_key` Checks the key against a few files spread over the project
+
+        Only the start of each file is read, so a wrong key is found before anything is written\
+        instead of after decoding the whole project. Images are checked first, audio is used when\
+        there aren't enough of them.
 
         Args:
-        - `filename` (`Path`): Original file path.
-        - `data` (`bytes`, optional): File data (decoded) for libmagic. \
+        - `samples` (`int`, optional): Number of files to check. Defaults to `KEY_CHECK_SAMPLES`.
+
+        Raises:
+        - `InvalidKeyError`: If there is no key, or none of the files checked decode correctly
+        - `NoValidFilesFound`: If the source path is not valid
+        """
+        if self._key is None:
+            raise InvalidKeyError("No valid key was given")
+        if not self.project_paths.source:
+            raise NoValidFilesFound("Invalid source path")
+        files: List[Path] = self.project_paths.encoded_images
+        if len(files) < samples:
+            files = files + self.project_paths.encoded_audio
+        count: int = min(samples, len(files))
+        results: List[bool] = [
+            self._check_sample(files[i * len(files) // count]) for i in range(count)
+        ]
+        if False in results and True not in results:
+            raise InvalidKeyError(
+                f"The key '{self.key}' doesn't decode the files in '{self.project_paths.source}'"
+            )
+
+    def _key_is_valid(self: _T) -> bool:
+        """`_key_is_valid` Runs `validate_key` if `verify_key` is on, reporting a wrong key
+
+        Returns:
+        - `bool`: `False` if the key is wrong and nothing should be decoded
+        """
+        if not self.verify_key:
+            return True
+        try:
+            self.validate_key()
+        except InvalidKeyError as error:
+            self._callbacks.error(f"{error.message}, nothing was decoded.")
+            return False
+        return True
+
+    def _count_output(self: _T, valid: bool) -> None:
+        """`_count_output` Stops the run once `max_invalid` files in a row didn't decode
+
+        A wrong key turns every file into noise, there is no point decoding the rest.
+
+        Args:
+        - `valid` (`bool`): If the file decoded to the type its extension promises
+        """
+        with self._invalid_lock:
+            if valid:
+                self._invalid_count = 0
+                return
+            self._invalid_count += 1
+            if self.max_invalid == 0 or self._invalid_count != self.max_invalid or self._canceled:
+                return
+            self._canceled = True
+        self._callbacks.error(
+            f"{self.max_invalid} files in a row didn't decode, the key is probably wrong. "
+            "Stopping."
+        )
+
+    def _get_mime_type(self: _T, filename: PurePath, data: bytes = None) -> str:
+        """`_get_mime_type` Returns the mime type of a decoded file
+
+        If data is not `None`, uses the file signature (or libmagic) to figure out the
+        actual file type. Otherwise it uses the original extension.
+
+        Args:
+        - `filename` (`PurePath`): Original file path.
+        - `data` (`bytes`, optional): Start of the file data (decoded) for type detection. \
         Defaults to `None`.
 
         Raises:
@@ -59,30 +154,67 @@ class ProjectDecoder(Project):
         or the existing file extension is unknown.
 
         Returns:
-        - `str`: The decoded file extension
+        - `str`: The mime type of the decoded file
         """
-        output_file: PurePath = self.project_paths.output_directory.joinpath(
-            PurePath(filename).relative_to(self.project_paths.source)
-        )
         if data:
-            filetype: str = magic.from_buffer(data, mime=True)
+            filetype: str = detect_mime_type(data)
             if filetype == OCT_STREAM:
                 raise FileFormatError(
                     f'"{filetype}" == "{OCT_STREAM}"',
                     "Found octlet stream, key is probably incorrect.",
                 )
-            return output_file.with_suffix("." + filetype.split("/")[-1])
+            return filetype
         if not filename:
             raise ValueError("data and filename are both None")
         if filename.suffix == ".rpgmvp":
-            return output_file.with_suffix(".png")
-        if filename.suffix == ".rpgmvo":
-            return output_file.with_suffix(".ogg")
+            return "image/png"
+        for (mime_type, extension) in ENCODED_AUDIO_EXTENSIONS.items():
+            if filename.suffix == extension:
+                return mime_type
         raise FileFormatError(
             f'"{filename.suffix}"',
             f'Unknown extension "{filename.suffix}"',
         )
 
+    def _get_relative_name(self: _T, filename: PurePath, mime_type: str) -> PurePath:
+        """`_get_relative_name` Returns the decoded file name, relative to the output directory
+
+        Args:
+        - `filename` (`PurePath`): Original file path.
+        - `mime_type` (`str`): Mime type of the decoded file, used for the extension
+
+        Returns:
+        - `PurePath`: Decoded file name
+        """
+        return (
+            PurePath(filename)
+            .relative_to(self.project_paths.source)
+            .with_suffix(DECODED_EXTENSIONS.get(mime_type, "." + mime_type.split("/")[-1]))
+        )
+
+    def _get_output_filename(self: _T, filename: Path, data: bytes = None) -> PurePath:
+        """`_get_output_filename` Returns a file name for the specified file
+
+        If data is not `None`, uses the file signature (or libmagic) to figure out the
+        actual file type and place a proper extension on the file. Otherwise it uses the
+        original name to generate the extension.
+
+        Args:
+        - `filename` (`Path`): Original file path.
+        - `data` (`bytes`, optional): Start of the file data (decoded) for type detection. \
+        Defaults to `None`.
+
+        Raises:
+        - `FileFormatError`: If libmagic can't determine the file type\
+        or the existing file extension is unknown.
+
+        Returns:
+        - `PurePath`: The decoded file name
+        """
+        return self.project_paths.output_directory.joinpath(
+            self._get_relative_name(filename, self._get_mime_type(filename, data))
+        )
+
     def decode_header(self: _T, file_header: bytes) -> bytes:
         """`decode_header` take a RPGMaker header and return the key or the actual file header
 
@@ -110,7 +242,25 @@ class ProjectDecoder(Project):
                 "First 16 bytes of this file do not match the RPGMaker header, "
                 "is this a RPGMaker file?",
             )
-        return int_xor(bytes.fromhex(self.key), header)
+        return self._key.xor_header(header)
+
+    def _read_start(self: _T, input_file: PurePath, file: BinaryIO) -> bytes:
+        """`_read_start` Reads the RPGMaker header and the encoded file header
+
+        Uses the header read while finding the key when there is one.
+
+        Args:
+        - `input_file` (`PurePath`): File being decoded
+        - `file` (`BinaryIO`): `input_file` opened for reading, left just after the headers
+
+        Returns:
+        - `bytes`: Up to 32 bytes from the start of the file
+        """
+        start: bytes = self.project_paths.cached_header(input_file, 32)
+        if start is None:
+            return file.read(32)
+        file.seek(len(start))
+        return start
 
     def decode_file(self: _T, input_file: PurePath, detect_type: bool) -> bool:
         """`decode_file` Takes a path and decodes a file
@@ -124,14 +274,161 @@ class ProjectDecoder(Project):
         - `bool`: True if the operation should continue
         """
 
+        if self._is_unchanged(input_file):
+            return True
         output_file = self._get_output_filename(input_file)
-        data: bytes
-        with click.open_file(input_file, "rb") as file:
-            data: bytes = self.decode_header(file.read(32))
-            data += file.read()
-        if detect_type:
-            output_file = self._get_output_filename(input_file, data)
-        return self._save_file(output_file, data)
+        with self.project_paths.open_source(input_file) as file:
+            header: bytes = self.decode_header(self._read_start(input_file, file))
+            if detect_type:
+                header += file.read(self.detect_type_size - len(header))
+                output_file = self._get_output_filename(input_file, header)
+            self._count_output(is_promised_type(PurePath(input_file).suffix, header))
+            return self._save_stream(output_file, header, file, input_file)
+
+    def open_decoded(
+        self: _T, input_file: PurePath, detect_type: bool = True
+    ) -> Tuple[PurePath, str, BinaryIO]:
+        """`open_decoded` Decodes a file in memory, nothing is written
+
+        Only the header is decoded up front, the rest of the file is read from the source as the
+        returned file is read.
+
+        Args:
+        - `input_file` (`PurePath`): File to decode
+        - `detect_type` (`bool`, optional): True means generate file extensions based on\
+          file contents. Defaults to `True`.
+
+        Raises:
+        - `RPGMakerHeaderError`: The header doesn't match RPGMaker's header
+        - `FileFormatError`: If the file type can't be determined
+
+        Returns:
+        - `Tuple[PurePath, str, BinaryIO]`: The decoded file name relative to the output\
+          directory, its mime type and the decoded file, which the caller has to close
+        """
+        file: BinaryIO = self.project_paths.open_source(input_file)
+        try:
+            header: bytes = self.decode_header(self._read_start(input_file, file))
+            data: bytes = None
+            if detect_type:
+                header += file.read(self.detect_type_size - len(header))
+                data = header
+            mime_type: str = self._get_mime_type(input_file, data)
+            self._count_output(is_promised_type(PurePath(input_file).suffix, header))
+        except BaseException:
+            file.close()
+            raise
+        return (
+            self._get_relative_name(input_file, mime_type),
+            mime_type,
+            io.BufferedReader(PrefixedReader(header, file), self.chunk_size),
+        )
+
+    def iter_decoded(
+        self: _T, detect_type: bool = True
+    ) -> Iterator[Tuple[PurePath, str, BinaryIO]]:
+        """`iter_decoded` Lazily decodes a project in memory, nothing is written
+
+        Files are opened one at a time as the iterator advances. Each file is closed when the next\
+        one is requested, so read it before moving on. Files that can't be decoded are skipped\
+        with a warning. Call `cancel` or stop iterating to stop early.
+
+        Args:
+        - `detect_type` (`bool`, optional): True means generate file extensions based on\
+          file contents. Defaults to `True`.
+
+        Returns:
+        - `Iterator[Tuple[PurePath, str, BinaryIO]]`: The decoded file name relative to the\
+          output directory, its mime type and the decoded file
+        """
+        self._start()
+        if not self._key_is_valid():
+            return
+        filename: Path
+        for filename in self.project_paths.iter_encoded_files():
+            if self._canceled:
+                return
+            decoded: Tuple[PurePath, str, BinaryIO] = None
+            with self._warn_on_invalid(filename):
+                decoded = self.open_decoded(filename, detect_type)
+            if decoded is not None:
+                with decoded[2]:
+                    yield decoded
+
+    @contextlib.contextmanager
+    def _warn_on_invalid(self: _T, filename: PurePath) -> Iterator[None]:
+        """`_warn_on_invalid` Turns per file errors into warnings
+
+        Args:
+        - `filename` (`PurePath`): File being decoded, used in the warning
+        """
+        try:
+            yield
+        except RPGMakerHeaderError:
+            self._count_output(False)
+            warning_text: str = f'Invalid header found on "{filename}", skipping.'
+            self._callbacks.warning(warning_text)
+        except FileFormatError:
+            self._count_output(False)
+            self._callbacks.warning(
+                "Found octlet stream, key is probably incorrect, "
+                f"skipping {click.format_filename(str(filename))}"
+            )
+
+    def _try_decode_file(self: _T, filename: Path, detect_type: bool) -> bool:
+        """`_try_decode_file` Decodes a file, turning per file errors into warnings
+
+        Args:
+        - `filename` (`Path`): File to decode
+        - `detect_type` (`bool`): True means generate file extensions based on\
+          file contents
+
+        Returns:
+        - `bool`: True if the operation should continue
+        """
+        with self._warn_on_invalid(filename):
+            return self.decode_file(filename, detect_type)
+        return not self._canceled
+
+    def _decode_parallel(
+        self: _T, files: List[Path], progress: ProgressReporter, detect_type: bool
+    ) -> None:
+        """`_decode_parallel` Decodes files using a pool of worker threads
+
+        At most `2 * workers` files are in flight at any time. Progress updates and
+        cancellation are handled on the calling thread as files complete.
+
+        Args:
+        - `files` (`List[Path]`): Files to decode
+        - `progress` (`ProgressReporter`): Progress for the files
+        - `detect_type` (`bool`): True means generate file extensions based on\
+          file contents
+        """
+        max_in_flight: int = self.workers * 2
+        remaining: Iterator[Path] = iter(files)
+        pending: Dict[Future, Path] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                while len(pending) < max_in_flight:
+                    filename: Path = next(remaining, None)
+                    if filename is None:
+                        break
+                    future = executor.submit(self._try_decode_file, filename, detect_type)
+                    pending[future] = filename
+                if not pending:
+                    break
+                done: Set[Future]
+                (done, _) = wait(pending, return_when=FIRST_COMPLETED)
+                stop: bool = False
+                for future in done:
+                    if progress.update(pending.pop(future)) or not future.result():
+                        stop = True
+                if stop:
+                    # Files already being decoded are allowed to finish
+                    self._canceled = True
+                    for future in pending:
+                        future.cancel()
+                    break
 
     def decode(
         self: _T,
@@ -139,33 +436,109 @@ class ProjectDecoder(Project):
     ) -> None:
         """`decode` Decodes a project
 
+        Files are decoded by `workers` threads at the same time, see `Project.workers`. Files are\
+        written to a directory or an archive, see `Project.output_format`.
+
         Args:
         - `detect_type` (`bool`): True means generate file extensions based on\
           file contents
         """
         self._callbacks.info(f"Reading from: '{self.project_paths.source}'")
-        self._callbacks.info(f"Writing to:   '{self.project_paths.output_directory}'")
+        self._start()
+        if not self._key_is_valid() or not self._open_sink():
+            return
+        self._callbacks.info(f"Writing to:   '{self.output_location}'")
+        self._open_manifest({"detect_type": bool(detect_type)})
+        try:
+            self._decode_files(detect_type)
+            self._resolve_conflicts(
+                functools.partial(self._try_decode_file, detect_type=detect_type)
+            )
+        finally:
+            self._close_outputs()
+        self._callbacks.progressbar(None)
+
+    def _open_outputs(self: _T, detect_type: bool) -> bool:
+        """`_open_outputs` Checks the key and opens the sink and manifest for `decode_async`
+
+        Args:
+        - `detect_type` (`bool`): True means generate file extensions based on\
+          file contents
+
+        Returns:
+        - `bool`: `False` if the key is wrong or the output shouldn't be written
+        """
+        if not self._key_is_valid() or not self._open_sink():
+            return False
+        self._open_manifest({"detect_type": bool(detect_type)})
+        return True
+
+    async def decode_async(self: _T, detect_type: bool) -> AsyncIterator[ProgressEvent]:
+        """`decode_async` Decodes a project without blocking the event loop
+
+        Files are decoded by `workers` threads at the same time, see `Project.workers`. Call\
+        `cancel`, cancel the task or stop iterating to stop early. The key is checked and the\
+        output opened on the default executor, as both read from disk and opening the output can\
+        prompt.
+
+        Args:
+        - `detect_type` (`bool`): True means generate file extensions based on\
+          file contents
+
+        Returns:
+        - `AsyncIterator[ProgressEvent]`: An event for each file decoded
+        """
+        self._start()
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        if not await loop.run_in_executor(None, self._open_outputs, detect_type):
+            return
+        events: AsyncIterator[ProgressEvent] = self._run_async(
+            "decode",
+            lambda: self.project_paths.encoded_files,
+            functools.partial(self._try_decode_file, detect_type=detect_type),
+            self._close_outputs,
+        )
+        try:
+            async for event in events:
+                yield event
+        finally:
+            # Closing this iterator has to close the outputs too, not leave them to the GC
+            await events.aclose()
+
+    def _decode_files(self: _T, detect_type: bool) -> None:
+        """`_decode_files` Runs the decoding loop with a progress bar
+
+        Args:
+        - `detect_type` (`bool`): True means generate file extensions based on\
+          file contents
+        """
         files: List[Path] = self.project_paths.encoded_files
-        click_display = ClickDisplay(files)
-        with click.progressbar(
-            files,
-            label="Decoding files",
-            width=0,
-            item_show_func=click_display.show_item,
-        ) as files_to_decode:
+        with self._progress(files, "Decoding files", True) as progress:
+            if self.workers > 1:
+                self._decode_parallel(files, progress, detect_type)
+                return
             filename: Path
-            for filename in files_to_decode:
-                if self._callbacks.progressbar(files_to_decode):
+            for filename in files:
+                if not self._try_decode_file(filename, detect_type) or progress.update(filename):
                     break
-                try:
-                    if not self.decode_file(filename, detect_type):
-                        break
-                except RPGMakerHeaderError:
-                    warning_text: str = f'Invalid header found on "{filename}", skipping.'
-                    self._callbacks.warning(warning_text)
-                except FileFormatError:
-                    self._callbacks.warning(
-                        "Found octlet stream, key is probably incorrect, "
-                        f"skipping {click.format_filename(str(filename))}"
-                    )
-        self._callbacks.progressbar(None)
+
+    @property
+    def verify_key(self: _T) -> bool:
+        """if the key is checked against a few files before decoding, see `validate_key`"""
+        return self._verify_key
+
+    @verify_key.setter
+    def verify_key(self: _T, value: bool):
+        """if the key is checked against a few files before decoding, see `validate_key`"""
+        self._verify_key = bool(value)
+
+    @property
+    def max_invalid(self: _T) -> int:
+        """Number of files in a row that can fail to decode before decoding stops"""
+        return self._max_invalid
+
+    @max_invalid.setter
+    def max_invalid(self: _T, value: int):
+        """Number of files in a row that can fail to decode before decoding stops. `0` never\
+        stops, `None` uses the default `MAX_CONSECUTIVE_INVALID`"""
+        self._max_invalid = MAX_CONSECUTIVE_INVALID if value is None else max(0, int(value))
@@ -2,16 +2,14 @@
 
 
 from pathlib import Path, PurePath
-from typing import List, TypeVar
-
-import click
-import magic
+from typing import AsyncIterator, List, TypeVar, Union
 
 from rpgmaker_mv_decoder.callbacks import Callbacks
-from rpgmaker_mv_decoder.clickdisplay import ClickDisplay
-from rpgmaker_mv_decoder.constants import RPG_MAKER_MV_MAGIC
+from rpgmaker_mv_decoder.constants import ENCODED_AUDIO_EXTENSIONS, RPG_MAKER_MV_MAGIC
+from rpgmaker_mv_decoder.filetypes import detect_mime_type
+from rpgmaker_mv_decoder.key import Key
+from rpgmaker_mv_decoder.progress import ProgressEvent
 from rpgmaker_mv_decoder.project import Project
-from rpgmaker_mv_decoder.utils import int_xor
 
 _T = TypeVar("_T", bound="ProjectEncoder")
 
@@ -23,7 +21,7 @@ class ProjectEncoder(Project):
         self: _T,
         encoding_source: PurePath,
         destination: PurePath,
-        key: str,
+        key: Union[str, Key],
         encoding_callbacks: Callbacks = Callbacks(),
     ) -> _T:
         """`ProjectEncoder` constructor
@@ -31,7 +29,7 @@ class ProjectEncoder(Project):
         Args:
         - `source` (`PurePath`): Where to find the files to encode
         - `destination` (`PurePath`): Where to save the files to encode
-        - `key` (`str`): Key to use when encoding
+        - `key` (`Union[str, Key]`): Key to use when encoding
         - `callbacks` (`Callback`, optional): Callbacks to run on events.\
           Defaults to `Callback()`.
 
@@ -47,12 +45,11 @@ class ProjectEncoder(Project):
 
         Args:
         - `file_header` (`bytes`): 16 bytes
-        - `key` (`str`): Key to encode with
 
         Returns:
         - `bytes`: First 32 bytes of the encoded file
         """
-        return RPG_MAKER_MV_MAGIC + int_xor(bytes.fromhex(self.key), file_header)
+        return RPG_MAKER_MV_MAGIC + self._key.xor_header(file_header)
 
     def encode_file(self: _T, input_file: PurePath) -> bool:
         """`encode_file` Takes a path and encodes a file
@@ -66,34 +63,40 @@ class ProjectEncoder(Project):
         output_file: PurePath = self.project_paths.output_directory.joinpath(
             PurePath(input_file).relative_to(self.project_paths.source)
         )
-        filetype: str
-        with click.open_file(input_file, "rb") as file:
-            file_header: bytes = file.read(16)
-            data: bytes = file.read()
-            filetype = magic.from_buffer(file_header + data, mime=True)
-            data = self.encode_header(file_header) + data
-        if filetype.startswith("image"):
-            output_file = output_file.with_suffix(".rpgmvp")
-        elif filetype.startswith("audio"):
-            output_file = output_file.with_suffix(".rpgmvp")
-        return self._save_file(output_file, data)
+        with self.project_paths.open_source(input_file) as file:
+            file_header: bytes = file.read(self.detect_type_size)
+            filetype: str = detect_mime_type(file_header)
+            if filetype.startswith("image"):
+                output_file = output_file.with_suffix(".rpgmvp")
+            elif filetype in ENCODED_AUDIO_EXTENSIONS:
+                output_file = output_file.with_suffix(ENCODED_AUDIO_EXTENSIONS[filetype])
+            header: bytearray = bytearray(RPG_MAKER_MV_MAGIC)
+            header += file_header
+            self._key.xor_into(header, len(RPG_MAKER_MV_MAGIC))
+            return self._save_stream(output_file, header, file, input_file)
 
     def encode(self: _T):
         """`encode` Encodes the project"""
         files: List[Path] = self.project_paths.all_files
+        self._start()
         self._callbacks.info(f"Reading from: '{self.project_paths.source}'")
         self._callbacks.info(f"Writing to:   '{self.project_paths.output_directory}'")
-        click_display = ClickDisplay(files)
-        with click.progressbar(
-            files,
-            label="Encoding files",
-            width=0,
-            item_show_func=click_display.show_item,
-        ) as files_to_encode:
+        with self._progress(files, "Encoding files", True) as progress:
             filename: Path
-            for filename in files_to_encode:
-                if self._callbacks.progressbar(files_to_encode):
-                    break
-                if not self.encode_file(filename):
+            for filename in files:
+                if not self.encode_file(filename) or progress.update(filename):
                     break
+        self._resolve_conflicts(self.encode_file)
         self._callbacks.progressbar(None)
+
+    def encode_async(self: _T) -> AsyncIterator[ProgressEvent]:
+        """`encode_async` Encodes the project without blocking the event loop
+
+        Files are encoded by `workers` threads at the same time, see `Project.workers`. Call\
+        `cancel`, cancel the task or stop iterating to stop early.
+
+        Returns:
+        - `AsyncIterator[ProgressEvent]`: An event for each file encoded
+        """
+        self._start()
+        return self._run_async("encode", lambda: self.project_paths.all_files, self.encode_file)
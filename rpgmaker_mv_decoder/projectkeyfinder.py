@@ -1,46 +1,149 @@
 """Class for decoding a project"""
 
 
-import struct
-from binascii import crc32
+import asyncio
+import itertools
+import json
+import random
 from pathlib import Path, PurePath
-from typing import Dict, List, TypeVar
-
-import click
-from click._termui_impl import ProgressBar
+from typing import AsyncIterator, Dict, Iterator, List, Tuple, TypeVar, Union
 
 from rpgmaker_mv_decoder.callbacks import Callbacks
-from rpgmaker_mv_decoder.clickdisplay import ClickDisplay
-from rpgmaker_mv_decoder.constants import IHDR_SECTION, PNG_HEADER, RPG_MAKER_MV_MAGIC
+from rpgmaker_mv_decoder.constants import (
+    KEY_CHECK_SAMPLES,
+    KEY_CONFIDENCE,
+    KEY_FINDER_HEADER_SIZE,
+    KEY_FINDER_WORKERS,
+    KEY_PATTERN,
+    OGG_CRC_POLYNOMIAL,
+    OGG_FIRST_PAGE_HEADER,
+    OGG_PAGE_HEADER_SIZE,
+    PNG_HEADER,
+    RPG_MAKER_MV_MAGIC,
+    SYSTEM_JSON_FILES,
+    SYSTEM_JSON_KEY,
+)
 from rpgmaker_mv_decoder.exceptions import NoValidFilesFound
+from rpgmaker_mv_decoder.filetypes import is_png_ihdr
+from rpgmaker_mv_decoder.key import Key
+from rpgmaker_mv_decoder.progress import ProgressEvent
+from rpgmaker_mv_decoder.progressreporter import ProgressReporter
 from rpgmaker_mv_decoder.project import Project
-from rpgmaker_mv_decoder.utils import int_xor
+from rpgmaker_mv_decoder.projectpaths import ProjectPaths
+from rpgmaker_mv_decoder.samplingmethod import SamplingMethod
+from rpgmaker_mv_decoder.utils import prefetch
 
 _T = TypeVar("_T", bound="ProjectKeyFinder")
 
-
-def _is_png_image(png_ihdr_data: bytes) -> bool:
-    ihdr_data: bytes
-    crc: bytes
-    (ihdr_data, crc) = struct.unpack("!13s4s", png_ihdr_data)
-    checksum = crc32(IHDR_SECTION + ihdr_data).to_bytes(4, "big")
-    if checksum != crc:
-        return False
-    return True
+# XOR is symmetric, so an encoded PNG header XOR the plain header gives the key
+_PNG_HEADER_KEY: Key = Key(PNG_HEADER)
+
+
+def _sign_test(successes: int, trials: int) -> float:
+    """`_sign_test` Chance of at least `successes` heads in `trials` fair coin flips
+
+    Args:
+    - `successes` (`int`): Number of successes seen
+    - `trials` (`int`): Number of trials
+
+    Returns:
+    - `float`: One sided p-value
+    """
+    if successes * 2 <= trials:
+        return 1.0
+    combinations: int = 1
+    tail: int = 1
+    for i in range(trials, successes, -1):
+        combinations = combinations * i // (trials - i + 1)
+        tail += combinations
+    return tail / (1 << trials)
+
+
+def _make_ogg_crc_table() -> List[int]:
+    table: List[int] = []
+    for i in range(256):
+        value: int = i << 24
+        for _ in range(8):
+            value = (value << 1) ^ OGG_CRC_POLYNOMIAL if value & 0x80000000 else value << 1
+        table.append(value & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC_TABLE: List[int] = _make_ogg_crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    crc: int = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _OGG_CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+def _ogg_key(encoded_header: bytes, page: bytes) -> str:
+    """`_ogg_key` Recovers the key from the first page of an OGG file
+
+    The first 14 bytes of the page are always the same. The next 2 bytes are the start of the
+    random stream serial number, they are found by checking which value makes the page CRC
+    match. The CRC is linear, so each bit of the serial number flips a fixed set of CRC bits.
+
+    Args:
+    - `encoded_header` (`bytes`): The 16 encoded bytes that follow the RPGMaker header
+    - `page` (`bytes`): The complete first page, only the first 16 bytes are still encoded
+
+    Returns:
+    - `str`: The key, `None` if the page isn't the first page of an OGG stream
+    """
+    crc_field: slice = slice(22, 26)
+    stored_crc: int = int.from_bytes(page[crc_field], "little")
+    base: bytearray = bytearray(len(page))
+    base[:14] = OGG_FIRST_PAGE_HEADER
+    base[16:] = page[16:]
+    base[crc_field] = bytes(4)
+    target: int = stored_crc ^ _ogg_crc(base)
+    bits: List[int] = []
+    for bit in range(16):
+        delta: bytearray = bytearray(len(page))
+        delta[14:16] = (1 << bit).to_bytes(2, "big")
+        bits.append(_ogg_crc(delta))
+    crc_to_serial: Dict[int, int] = {0: 0}
+    crc: int = 0
+    for serial in range(1, 1 << 16):
+        crc ^= bits[(serial & -serial).bit_length() - 1]
+        crc_to_serial[crc] = serial ^ (serial >> 1)
+    if target not in crc_to_serial:
+        return None
+    plain_header: bytes = OGG_FIRST_PAGE_HEADER + crc_to_serial[target].to_bytes(2, "big")
+    return Key(plain_header).xor_header(encoded_header).hex()
+
+
+def _png_keys(headers: List[bytes]) -> List[str]:
+    """`_png_keys` Works out the key for a batch of files, assuming they are PNG images
+
+    Args:
+    - `headers` (`List[bytes]`): Start of each file, including the RPGMaker header
+
+    Returns:
+    - `List[str]`: Key for each file, in the same order
+    """
+    buffer: bytearray = bytearray(b"".join(header[16:32].ljust(16, b"\0") for header in headers))
+    _PNG_HEADER_KEY.xor_headers(buffer)
+    return [buffer[i : i + 16].hex() for i in range(0, len(buffer), 16)]
 
 
 class ProjectKeyFinder(Project):
     """Handles finding a project key"""
 
+    # pylint: disable=too-many-instance-attributes
+
     def __init__(
         self: _T,
-        source: PurePath,
+        source: Union[PurePath, ProjectPaths],
         callbacks: Callbacks = Callbacks(),
     ) -> _T:
         """`ProjectKeyFinder` Constructor
 
         Args:
-        - `source` (`PurePath`): Files to use to find a key
+        - `source` (`Union[PurePath, ProjectPaths]`): Files to use to find a key
         - `callbacks` (`Callback`, optional): Callbacks for specific events. Defaults to \
           `Callback()`.
 
@@ -48,11 +151,17 @@ class ProjectKeyFinder(Project):
         - `ProjectKeyFinder`: Object to find key for files
         """
         Project.__init__(self, source, None, None, callbacks)
+        self.workers = KEY_FINDER_WORKERS
         self._keys: Dict[str, int] = {}
         self._count: int = 0
         self._keys_modified: bool = False
         self._skipped: int = 0
-        self._total: int = 0
+        self.confidence: float = 0.0
+
+    @property
+    def samples(self: _T) -> int:
+        """`samples` number of encoded images read by the last `find_key`"""
+        return self._count + self._skipped
 
     @property
     def keys(self: _T) -> Dict[str, int]:
@@ -110,55 +219,109 @@ class ProjectKeyFinder(Project):
             self.__print_possible_keys()
 
     def _report_results(self: _T, item: str):
-        percentage: float = (self._count * 100.0) / self._total
+        agreeing: int = self.keys[item]
+        percentage: float = (agreeing * 100.0) / self._count
         self._callbacks.info("")
         if self._skipped > 0:
             self._callbacks.info(
                 f"Found {self._skipped} files ending with .rpgmvp that were not PNG images"
             )
         self._callbacks.info(
-            f"Found the same key for {self._count}/{self._total} ({percentage:0.02f}%) files"
+            f"Found the same key for {agreeing}/{self._count} ({percentage:0.02f}%) "
+            f"sampled files, {self.confidence * 100:0.02f}% confidence"
         )
         self._callbacks.info(f"Using '{item}' as the key")
 
-    def _handle_files(self: _T, all_files: ProgressBar) -> int:
-        self._total = all_files.length
-        min_found: int = max(9, all_files.length // 20) + 1
-        filename: Path
+    def _update_confidence(self: _T) -> None:
+        """`_update_confidence` Updates `confidence` for the most common key
+
+        Uses a sign test, the confidence is one minus the chance of seeing the most common key
+        this often if it were used by half of the images or less.
+        """
+        agreeing: int = list(self.keys.values())[0]
+        self.confidence = 1.0 - _sign_test(agreeing, self._count)
+
+    def _reset_counts(self: _T) -> None:
+        """`_reset_counts` Forgets the keys found by an earlier search"""
+        self._keys = {}
         self._count = 0
         self._skipped = 0
-        for filename in all_files:
-            item: str = None
-            if self._callbacks.progressbar(all_files):
-                break
-
-            rpgmaker_header: bytes
-            file_header: bytes
-            png_ihdr: bytes
-            with click.open_file(filename, "rb") as file:
-                rpgmaker_header = file.read(16)
-                file_header = file.read(16)
-                png_ihdr = file.read(17)
-            if rpgmaker_header == RPG_MAKER_MV_MAGIC and _is_png_image(png_ihdr):
-                item = int_xor(file_header, PNG_HEADER).hex()
-                self._count += 1
-                self.keys = item
-                if len(self.keys) == 1 and self._count >= min_found:
-                    all_files.update(self._total - self._count)
-                    self._report_results(item)
-                    break
-            else:
-                self._skipped += 1
-                self._total -= 1
-                min_found = max(10, ((self._total // 20) + 1))
+        self.confidence = 0.0
+
+    def _handle_files(self: _T, files: List[Path], progress: ProgressReporter, confidence: float):
+        filename: Path
+        header: bytes
+        self._reset_counts()
+        headers: Iterator[Tuple[Path, bytes]] = prefetch(self._read_header, files, self.workers)
+        try:
+            # Files are read ahead in batches anyway, so the keys for a batch are worked out
+            # with one XOR
+            while True:
+                batch: List[Tuple[Path, bytes]] = list(itertools.islice(headers, self.workers * 2))
+                if not batch:
+                    return
+                keys: List[str] = _png_keys([header for (_, header) in batch])
+                for ((filename, header), key) in zip(batch, keys):
+                    if progress.update(filename):
+                        return
+                    if self._check_header(header, key, confidence):
+                        progress.complete()
+                        self._report_results(list(self.keys.keys())[0])
+                        return
+        finally:
+            headers.close()
+            self._callbacks.progressbar(None)
+
+    def _read_header(self: _T, filename: Path) -> bytes:
+        return self.project_paths.read_source_header(filename, KEY_FINDER_HEADER_SIZE)
+
+    def _check_header(self: _T, header: bytes, key: str, confidence: float) -> bool:
+        """`_check_header` Counts the key for a file header
 
-        self._callbacks.progressbar(None)
+        Args:
+        - `header` (`bytes`): First `KEY_FINDER_HEADER_SIZE` bytes of the file
+        - `key` (`str`): Key the file would have if it is a PNG image
+        - `confidence` (`float`): Confidence needed to stop
 
-    def find_key(self: _T) -> str:
+        Returns:
+        - `bool`: `True` if the most common key has reached `confidence`
+        """
+        rpgmaker_header: bytes = header[:16]
+        png_ihdr: bytes = header[32:]
+        if (
+            len(header) != KEY_FINDER_HEADER_SIZE
+            or rpgmaker_header != RPG_MAKER_MV_MAGIC
+            or not is_png_ihdr(png_ihdr)
+        ):
+            self._skipped += 1
+            return False
+        self._count += 1
+        self.keys = key
+        self._update_confidence()
+        return self.confidence >= confidence
+
+    def find_key(
+        self: _T,
+        sampling: SamplingMethod = SamplingMethod.STRATIFIED,
+        confidence: float = KEY_CONFIDENCE,
+        max_samples: int = None,
+        seed: int = None,
+    ) -> str:
         """`find_key` Check the path for PNG images and return the decoding key
 
-        Finds image files under the specified path and looks for a key to decode all the files.
-        This can fail if only a small number (less than 3) of the .rpgmvp files are .png images.
+        Samples image files under the specified path and looks for a key to decode all the
+        files. Sampling stops once the most common key reaches the requested `confidence`, so
+        only a small number of files are read even for very large projects. The confidence
+        reached is available as `confidence` afterwards.
+
+        Args:
+        - `sampling` (`SamplingMethod`, optional): Order to sample the images in. Defaults\
+          to `SamplingMethod.STRATIFIED`.
+        - `confidence` (`float`, optional): Stop once the most common key reaches this\
+          confidence. Defaults to `KEY_CONFIDENCE`.
+        - `max_samples` (`int`, optional): Maximum number of files to read. Defaults to\
+          `None` which allows every image to be read.
+        - `seed` (`int`, optional): Seed for the random sampling. Defaults to `None`.
 
         Raises:
         - `NoValidFilesFound`: If no valid PNG images are found
@@ -169,14 +332,186 @@ class ProjectKeyFinder(Project):
         """
         if not self.project_paths.source:
             raise NoValidFilesFound("Invalid source path")
-        files: List[Path] = sorted(Path(self.project_paths.source).glob("**/*.rpgmvp"))
-        click_display = ClickDisplay(files)
-        with click.progressbar(
-            files, label="Finding key", item_show_func=click_display.show_item
-        ) as all_files:
-            self._handle_files(all_files)
+        if self._find_checked_system_json_key():
+            return self.key
+        rng: random.Random = random.Random(seed)
+        files: List[Path] = self._sample_files(sampling, max_samples, rng)
+        with self._progress(files, "Finding key") as progress:
+            self._handle_files(files, progress, confidence)
+        return self._choose_key(sampling, rng)
+
+    async def find_key_async(
+        self: _T,
+        sampling: SamplingMethod = SamplingMethod.STRATIFIED,
+        confidence: float = KEY_CONFIDENCE,
+        max_samples: int = None,
+        seed: int = None,
+    ) -> AsyncIterator[ProgressEvent]:
+        """`find_key_async` Finds the decoding key without blocking the event loop
+
+        Works like `find_key`. Headers are read by `workers` threads at the same time. Call\
+        `cancel`, cancel the task or stop iterating to stop sampling early.
+
+        Args:
+        - `sampling` (`SamplingMethod`, optional): Order to sample the images in. Defaults\
+          to `SamplingMethod.STRATIFIED`.
+        - `confidence` (`float`, optional): Stop once the most common key reaches this\
+          confidence. Defaults to `KEY_CONFIDENCE`.
+        - `max_samples` (`int`, optional): Maximum number of files to read. Defaults to\
+          `None` which allows every image to be read.
+        - `seed` (`int`, optional): Seed for the random sampling. Defaults to `None`.
+
+        Raises:
+        - `NoValidFilesFound`: If no valid PNG images are found
+
+        Returns:
+        - `AsyncIterator[ProgressEvent]`: An event for each file read, with the confidence so\
+          far as the `result`. The last event has no `item` and the key as the `result`.
+        """
+        if not self.project_paths.source:
+            raise NoValidFilesFound("Invalid source path")
+        self._start()
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        if await loop.run_in_executor(None, self._find_checked_system_json_key):
+            yield ProgressEvent("find_key", None, 0, 0, self.key)
+            return
+        rng: random.Random = random.Random(seed)
+        events: AsyncIterator[ProgressEvent] = self._run_async(
+            "find_key",
+            lambda: self._sample_files(sampling, max_samples, rng),
+            self._read_header,
+        )
+        self._reset_counts()
+        try:
+            async for event in events:
+                found: bool = self._check_header(
+                    event.result, _png_keys([event.result])[0], confidence
+                )
+                yield event._replace(result=self.confidence)
+                if found:
+                    self._report_results(list(self.keys.keys())[0])
+                    break
+        finally:
+            await events.aclose()
+        key: str = await loop.run_in_executor(None, self._choose_key, sampling, rng)
+        yield ProgressEvent("find_key", None, self.samples, self.samples, key)
+
+    def _sample_files(
+        self: _T, sampling: SamplingMethod, max_samples: int, rng: random.Random
+    ) -> List[Path]:
+        """`_sample_files` Lists the images to sample, in sampling order
+
+        Args:
+        - `sampling` (`SamplingMethod`): Order to sample the images in
+        - `max_samples` (`int`): Maximum number of files, `None` for no limit
+        - `rng` (`random.Random`): Random number generator for the sampling order
+
+        Returns:
+        - `List[Path]`: Images to read
+        """
+        files: List[Path] = sampling.order(self.project_paths.encoded_images, rng)
+        if max_samples:
+            files = files[:max_samples]
+        return files
+
+    def _choose_key(self: _T, sampling: SamplingMethod, rng: random.Random) -> str:
+        """`_choose_key` Picks the key once sampling is done
+
+        Uses the most common key from the images, or the OGG files if no images were found.
 
+        Args:
+        - `sampling` (`SamplingMethod`): Order to try the audio files in
+        - `rng` (`random.Random`): Random number generator for the sampling order
+
+        Raises:
+        - `NoValidFilesFound`: If no valid PNG images or OGG files are found
+
+        Returns:
+        - `str`: Decoding key
+        """
         if self._count == 0:
-            raise NoValidFilesFound(f"No png files found under: '{Path}'")
+            self.key = self._find_ogg_key(sampling.order(self.project_paths.encoded_audio, rng))
+            if self.key:
+                return self.key
+            raise NoValidFilesFound(f"No png files found under: '{self.project_paths.source}'")
         self.__get_likely_key()
         return self.key
+
+    def _find_checked_system_json_key(self: _T) -> str:
+        """`_find_checked_system_json_key` Uses the key from `System.json` if it decodes the files
+
+        Repacked games often keep a `System.json` with a key that no longer matches, so the key\
+        is checked against the first encoded file that can tell. `confidence` is only set to\
+        `1.0` once a file confirms it.
+
+        Returns:
+        - `str`: The key, set as `key` too. `None` if there is none or it doesn't decode the\
+          files, the headers have to be sampled instead.
+        """
+        self.confidence = 0.0
+        self.key = self._find_system_json_key()
+        if not self.key:
+            return None
+        files: List[Path] = self.project_paths.encoded_images + self.project_paths.encoded_audio
+        filename: Path
+        for filename in files[:KEY_CHECK_SAMPLES]:
+            valid: bool = self._check_sample(filename)
+            if valid:
+                self.confidence = 1.0
+                return self.key
+            if valid is not None:
+                self._callbacks.warning(
+                    f"The key from 'System.json' doesn't decode '{filename}', "
+                    "looking for the key in the files instead"
+                )
+                self.key = None
+                return None
+        # None of the files can tell, the key is all there is to go on
+        return self.key
+
+    def _find_system_json_key(self: _T) -> str:
+        """`_find_system_json_key` Reads the key from the project's `System.json`
+
+        Returns:
+        - `str`: The key stored in `System.json`, `None` if there isn't a valid one
+        """
+        filename: str
+        for filename in SYSTEM_JSON_FILES:
+            system_json: Path = Path(self.project_paths.source).joinpath(filename)
+            try:
+                with self.project_paths.open_source(system_json) as file:
+                    key = json.loads(file.read().decode("utf-8-sig")).get(SYSTEM_JSON_KEY)
+            except (OSError, ValueError, AttributeError):
+                continue
+            if isinstance(key, str) and KEY_PATTERN.match(key):
+                self._callbacks.info(f"Using '{key}' from '{system_json}' as the key")
+                return key.lower()
+        return None
+
+    def _find_ogg_key(self: _T, files: List[Path]) -> str:
+        """`_find_ogg_key` Recovers the key from encoded OGG files
+
+        Used when there are no PNG images. Stops at the first file that gives a key, later
+        files are only read if a file isn't an OGG file.
+
+        Args:
+        - `files` (`List[Path]`): Encoded audio files, in the order they should be tried
+
+        Returns:
+        - `str`: The key, `None` if no OGG file was found
+        """
+        filename: Path
+        for filename in files:
+            with self.project_paths.open_source(filename) as file:
+                rpgmaker_header: bytes = file.read(16)
+                encoded_header: bytes = file.read(16)
+                page: bytearray = bytearray(encoded_header + file.read(OGG_PAGE_HEADER_SIZE - 16))
+                if rpgmaker_header != RPG_MAKER_MV_MAGIC or len(page) < OGG_PAGE_HEADER_SIZE:
+                    continue
+                page += file.read(page[OGG_PAGE_HEADER_SIZE - 1])
+                page += file.read(sum(page[OGG_PAGE_HEADER_SIZE:]))
+            key: str = _ogg_key(encoded_header, bytes(page))
+            if key:
+                self._callbacks.info(f"Using '{key}' from '{filename}' as the key")
+                return key
+        return None
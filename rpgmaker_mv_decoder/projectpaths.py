@@ -2,18 +2,26 @@
 
 Module for dealing with RPGMaker projects
 """
+import itertools
+import os
 from pathlib import Path, PurePath
-from typing import List, TypeVar
+from typing import BinaryIO, Dict, Iterator, List, Tuple, TypeVar
 from uuid import UUID, uuid4
 
 import click
 
+from rpgmaker_mv_decoder.archives import Archive, open_archive
+from rpgmaker_mv_decoder.constants import MANIFEST_FILENAME
+from rpgmaker_mv_decoder.utils import read_header
+
 _T = TypeVar("_T", bound="ProjectPaths")
 
 
 class ProjectPaths:
     """Object that holds/validates project paths"""
 
+    # pylint: disable=too-many-instance-attributes
+
     def __init__(
         self: _T,
         source: PurePath = None,
@@ -22,12 +30,18 @@ class ProjectPaths:
         """`ProjectPaths` Constructor
 
         Args:
-        - `source` (`PurePath`, optional): Files to operate on. Defaults to `None`.
+        - `source` (`PurePath`, optional): Files to operate on, a directory or an archive.\
+          Defaults to `None`.
         - `destination` (`PurePath`, optional): Where to save the files. Defaults to `None`.
         """
+        self._archive: Archive = None
+        self._scanned_files: Dict[str, List[Path]] = None
+        self._sorted_files: Dict[str, List[Path]] = {}
+        self._headers: Dict[PurePath, bytes] = {}
+        self._dir_entries: Dict[PurePath, os.DirEntry] = {}
+        self._cached_output_directory: PurePath = None
         self.source: PurePath = source
         self.destination: PurePath = destination
-        self._cached_output_directory: PurePath = None
 
     @property
     def destination(self: _T) -> PurePath:
@@ -39,6 +53,7 @@ class ProjectPaths:
     def destination(self: _T, value: PurePath):
         """Sets the `destination` path. Value must exist on disk and be a directory. Passing an
         invalid path sets `destination` to `None`"""
+        self._cached_output_directory = None
         if value:
             destination_directory: Path = Path(value).resolve(strict=False)
             if not destination_directory.exists() or destination_directory.is_dir():
@@ -54,8 +69,12 @@ class ProjectPaths:
 
     @source.setter
     def source(self: _T, value: PurePath):
-        """Sets the `source` path. Value must exist on disk and be a directory. Passing an
-        invalid path sets `source` to `None`"""
+        """Sets the `source` path. Value must exist on disk and be a directory or a zip or asar\
+        archive. Passing an invalid path sets `source` to `None`"""
+        self.invalidate()
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
         if value:
             try:
                 source_directory: Path = Path(value).resolve(strict=True)
@@ -68,18 +87,118 @@ class ProjectPaths:
                         source_directory = source_directory.parent
                     self._source = PurePath(source_directory)
                     return
+                self._archive = open_archive(source_directory)
+                if self._archive is not None:
+                    self._source = PurePath(source_directory)
+                    return
             except FileNotFoundError:
                 pass
         self._source = None
         return
 
+    @property
+    def archive(self: _T) -> Archive:
+        """Gets the archive the files are read from, or `None` if `source` is a directory"""
+        return self._archive
+
+    def open_source(self: _T, filename: PurePath) -> BinaryIO:
+        """`open_source` Opens a file under the source path for reading
+
+        Args:
+        - `filename` (`PurePath`): File to open, from one of the file listings
+
+        Raises:
+        - `FileNotFoundError`: If the file doesn't exist
+
+        Returns:
+        - `BinaryIO`: Unbuffered file, or the archive member
+        """
+        if self._archive is not None:
+            return self._archive.open(self._member_name(filename))
+        return open(filename, "rb", buffering=0)
+
+    def read_source_header(self: _T, filename: PurePath, size: int) -> bytes:
+        """`read_source_header` Reads the start of a file under the source path
+
+        Headers are kept until `invalidate` is called, so each file is only read once when the\
+        same `ProjectPaths` is used to find the key and then to decode.
+
+        Args:
+        - `filename` (`PurePath`): File to read, from one of the file listings
+        - `size` (`int`): Number of bytes to read
+
+        Returns:
+        - `bytes`: Up to `size` bytes from the start of the file
+        """
+        header: bytes = self.cached_header(filename, size)
+        if header is not None:
+            return header
+        if self._archive is not None:
+            header = self._archive.read_header(self._member_name(filename), size)
+        else:
+            header = read_header(filename, size)
+        self._headers[filename] = header
+        return header
+
+    def cached_header(self: _T, filename: PurePath, size: int) -> bytes:
+        """`cached_header` Gets the start of a file if it was already read
+
+        Args:
+        - `filename` (`PurePath`): File to check, from one of the file listings
+        - `size` (`int`): Number of bytes needed
+
+        Returns:
+        - `bytes`: `size` bytes from the start of the file, `None` if fewer bytes were read
+        """
+        header: bytes = self._headers.get(filename)
+        if header is None or len(header) < size:
+            return None
+        return header[:size]
+
+    def source_size(self: _T, filename: PurePath) -> int:
+        """`source_size` Size of a file under the source path
+
+        Files found while listing keep their `os.DirEntry`, which is only asked for its size here
+        and caches it until `invalidate` is called, so listing files never stats them.
+
+        Args:
+        - `filename` (`PurePath`): File to check, from one of the file listings
+
+        Returns:
+        - `int`: Size in bytes
+        """
+        if self._archive is not None:
+            return self._archive.size(self._member_name(filename))
+        entry: os.DirEntry = self._dir_entries.get(filename)
+        if entry is None:
+            return os.stat(filename).st_size
+        return entry.stat().st_size
+
+    def source_modified(self: _T, filename: PurePath) -> float:
+        """`source_modified` When a file under the source path was last changed
+
+        Args:
+        - `filename` (`PurePath`): File to check, from one of the file listings
+
+        Returns:
+        - `float`: Seconds since the epoch, members of an archive use the time of the archive
+        """
+        if self._archive is not None:
+            return os.stat(self._archive.filename).st_mtime
+        return os.stat(filename).st_mtime
+
+    def _member_name(self: _T, filename: PurePath) -> str:
+        return PurePath(filename).relative_to(self.source).as_posix()
+
     @property
     def output_directory(self: _T) -> PurePath:
         """`output_directory` returns the name of the output directory including the project
         name"""
         if self._cached_output_directory:
             return self._cached_output_directory
-        if Path(self.source.joinpath("www")).exists():
+        if self._archive is not None:
+            self._cached_output_directory = self.destination.joinpath(self.source.stem)
+        elif Path(self.source.joinpath("www")).exists():
             self._cached_output_directory = self.destination.joinpath(self.source.name)
         elif Path(self.source.joinpath("img")).exists():
             self._cached_output_directory = self.destination.joinpath(self.source.name)
@@ -92,30 +211,152 @@ class ProjectPaths:
             )
         return self._cached_output_directory
 
+    def invalidate(self: _T) -> None:
+        """`invalidate` Forgets the files found under the source path
+
+        The next file listing walks the source path again, and headers and sizes are read again"""
+        self._scanned_files = None
+        self._sorted_files = {}
+        self._headers = {}
+        self._dir_entries = {}
+
+    def _walk(self: _T) -> Iterator[os.DirEntry]:
+        """`_walk` Walks the source path once, yielding every file
+
+        Symbolic links to directories are not followed, matching `Path.glob("**/*")`.
+
+        Returns:
+        - `Iterator[os.DirEntry]`: Files under the source path
+        """
+        directories: List[str] = [str(self.source)]
+        while directories:
+            with os.scandir(directories.pop()) as entries:
+                entry: os.DirEntry
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+
+    def _entries(self: _T) -> Iterator[Tuple[Path, str, os.DirEntry]]:
+        """`_entries` Lists every file under the source path or in the source archive
+
+        Returns:
+        - `Iterator[Tuple[Path, str, os.DirEntry]]`: Path, file name and directory entry for\
+          each file. Archive members are given paths under the archive file and no entry.
+        """
+        if self._archive is not None:
+            name: str
+            for name in self._archive.names():
+                path: Path = Path(self.source).joinpath(name)
+                yield (path, path.name, None)
+            return
+        entry: os.DirEntry
+        for entry in self._walk():
+            yield (Path(entry.path), entry.name, entry)
+
+    def _iter_files(self: _T, kind: str) -> Iterator[Path]:
+        """`_iter_files` Lazily lists files of one kind under the source path
+
+        The first full iteration walks the source path and caches every kind of file, later
+        calls use the cache until `invalidate` is called. The directory entry of each file is kept
+        for `source_size`, so measuring progress in bytes needs no second walk.
+
+        Args:
+        - `kind` (`str`): `".rpgmvp"`, `".rpgmvo"`, `".rpgmvm"` or `""` for all files
+
+        Returns:
+        - `Iterator[Path]`: Files of that kind, in directory order
+        """
+        if self._scanned_files is not None:
+            yield from self._scanned_files[kind]
+            return
+        found: Dict[str, List[Path]] = {".rpgmvp": [], ".rpgmvo": [], ".rpgmvm": [], "": []}
+        path: Path
+        name: str
+        entry: os.DirEntry
+        for (path, name, entry) in self._entries():
+            if entry is not None:
+                self._dir_entries[path] = entry
+            kinds: List[str] = [os.path.splitext(name)[1]]
+            if name != MANIFEST_FILENAME:
+                kinds.append("")
+            for item in kinds:
+                if item in found:
+                    found[item].append(path)
+            if kind in kinds:
+                yield path
+        self._scanned_files = found
+
+    def _sorted(self: _T, kind: str) -> List[Path]:
+        if kind not in self._sorted_files:
+            self._sorted_files[kind] = sorted(self._iter_files(kind))
+        return self._sorted_files[kind]
+
+    def iter_encoded_images(self: _T) -> Iterator[Path]:
+        """`iter_encoded_images` Lazily lists the files ending with ".rpgmvp" under the
+        source path
+
+        Returns:
+        - `Iterator[Path]`: Encoded images, in directory order
+        """
+        return self._iter_files(".rpgmvp") if self.source else iter([])
+
+    def iter_encoded_files(self: _T) -> Iterator[Path]:
+        """`iter_encoded_files` Lazily lists the files ending with ".rpgmvp", ".rpgmvo" or
+        ".rpgmvm" under the source path
+
+        Returns:
+        - `Iterator[Path]`: Encoded files, in directory order
+        """
+        if not self.source:
+            return iter([])
+        return itertools.chain(
+            self._iter_files(".rpgmvp"), self._iter_files(".rpgmvo"), self._iter_files(".rpgmvm")
+        )
+
+    def iter_all_files(self: _T) -> Iterator[Path]:
+        """`iter_all_files` Lazily lists all files under the source path. Manifests from
+        incremental decoding are left out.
+
+        Returns:
+        - `Iterator[Path]`: Files, in directory order
+        """
+        return self._iter_files("") if self.source else iter([])
+
     @property
     def encoded_images(self: _T) -> List[Path]:
         """`encoded_images` list of encoded images under the source path
 
         Creates a sorted list of `Path` objects ending with ".rpgmvp" under the source path, or
         `None` if the source path is unset"""
-        return sorted(Path(self.source).glob("**/*.rpgmvp")) if self.source else None
+        return self._sorted(".rpgmvp") if self.source else None
+
+    @property
+    def encoded_audio(self: _T) -> List[Path]:
+        """`encoded_audio` list of encoded audio files under the source path
+
+        Creates a sorted list of `Path` objects ending with ".rpgmvo" under the source path, or
+        `None` if the source path is unset"""
+        return self._sorted(".rpgmvo") if self.source else None
 
     @property
     def encoded_files(self: _T) -> List[Path]:
         """`encoded_files` list of encoded files under the source path
 
-        Creates a sorted list of `Path` objects ending with ".rpgmvp" or ".rpgmvo under the
-        source path, or `None` if the source path is unset"""
-        return sorted(Path(self.source).glob("**/*.rpgmv[op]")) if self.source else None
+        Creates a sorted list of `Path` objects ending with ".rpgmvp", ".rpgmvo" or ".rpgmvm"
+        under the source path, or `None` if the source path is unset"""
+        if self.source is None:
+            return None
+        if "encoded" not in self._sorted_files:
+            self._sorted_files["encoded"] = sorted(self.iter_encoded_files())
+        return self._sorted_files["encoded"]
 
     @property
     def all_files(self: _T) -> List[Path]:
         """`all_files` list of all files under the source path
 
         Creates a sorted list of `Path` objects that are files under the source path, or `None`
-        if the source path is unset
+        if the source path is unset. Manifests from incremental decoding are left out.
         """
-        if self.source is None:
-            return None
-        paths: List[Path] = sorted(Path(self.source).glob("**/*"))
-        return [e for e in paths if e.is_file()]
+        return self._sorted("") if self.source else None
@@ -0,0 +1,55 @@
+"""`samplingmethod.py` Order in which files are sampled when looking for a key"""
+import random
+from enum import Enum, auto
+from pathlib import Path
+from typing import Dict, List, TypeVar
+
+_T = TypeVar("_T", bound="SamplingMethod")
+
+
+class SamplingMethod(Enum):
+    """`SamplingMethod` How files are picked when looking for a key
+
+    - `SORTED`: Files in sorted order
+    - `RANDOM`: Files in random order
+    - `STRATIFIED`: Files in random order, taking turns between directories so no single\
+      directory dominates the first samples
+    """
+
+    SORTED = auto()
+    RANDOM = auto()
+    STRATIFIED = auto()
+
+    def order(self: _T, files: List[Path], rng: random.Random = None) -> List[Path]:
+        """`order` Puts the files in the order they should be sampled
+
+        Args:
+        - `files` (`List[Path]`): Files to sample from
+        - `rng` (`random.Random`, optional): Random number generator to use. Defaults to\
+          `None` which uses a new unseeded generator.
+
+        Returns:
+        - `List[Path]`: Files in sampling order
+        """
+        if self == SamplingMethod.SORTED:
+            return list(files)
+        if rng is None:
+            rng = random.Random()
+        if self == SamplingMethod.RANDOM:
+            shuffled: List[Path] = list(files)
+            rng.shuffle(shuffled)
+            return shuffled
+        directories: Dict[Path, List[Path]] = {}
+        for file in files:
+            directories.setdefault(file.parent, []).append(file)
+        groups: List[List[Path]] = list(directories.values())
+        rng.shuffle(groups)
+        for group in groups:
+            rng.shuffle(group)
+        ordered: List[Path] = []
+        index: int = 0
+        while groups:
+            groups = [group for group in groups if len(group) > index]
+            ordered.extend(group[index] for group in groups)
+            index += 1
+        return ordered
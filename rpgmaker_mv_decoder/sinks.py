@@ -0,0 +1,378 @@
+"""`sinks.py` Where decoded files are written
+
+Files can be written to a directory, or streamed one after the other into a zip, tar or
+zstandard compressed tar archive so there is no separate archiving step afterwards.
+"""
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from pathlib import Path, PurePath
+from typing import Any, BinaryIO, Dict, List, Set, TypeVar
+
+from rpgmaker_mv_decoder.copymode import CopyMode
+from rpgmaker_mv_decoder.exceptions import OutputFormatError
+from rpgmaker_mv_decoder.utils import (
+    PrefixedReader,
+    copy_file_body,
+    remaining_size,
+    same_contents,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_T = TypeVar("_T", bound="Sink")
+
+
+class Sink(ABC):
+    """`Sink` Destination for the files written by a project
+
+    Notes:
+    - This is an Abstract Base Class, use `open_sink` to get a sink
+    """
+
+    def __init__(self: _T, root: PurePath) -> _T:
+        """`Sink` constructor
+
+        Args:
+        - `root` (`PurePath`): Files are stored relative to this directory
+        """
+        self.root: PurePath = root
+        self.copy_mode: CopyMode = CopyMode.AUTO
+
+    @property
+    def filename(self: _T) -> PurePath:
+        """Archive file being written, `None` when writing to a directory"""
+        return None
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    @abstractmethod
+    def write(
+        self: _T,
+        filename: PurePath,
+        header: bytes,
+        source: BinaryIO,
+        buffer: memoryview,
+        digest: Any = None,
+        replace: bool = True,
+        size: int = None,
+    ) -> None:
+        """`write` Writes `header` followed by the rest of `source`
+
+        Args:
+        - `filename` (`PurePath`): File to write
+        - `header` (`bytes`): What to write at the start of the file
+        - `source` (`BinaryIO`): Open file to copy the rest from, `None` writes only `header`
+        - `buffer` (`memoryview`): Buffer for the copy
+        - `digest` (`Any`, optional): `hashlib` object updated with the body. Defaults to\
+          `None`.
+        - `replace` (`bool`, optional): Replace a file that was already written. Defaults to\
+          `True`.
+        - `size` (`int`, optional): Bytes left in `source`, when the caller already knows.\
+          Defaults to `None`.
+
+        Raises:
+        - `FileExistsError`: If `replace` is `False` and the file was already written. Nothing\
+          is read from `source` in that case.
+        """
+
+    @abstractmethod
+    def modified(self: _T, filename: PurePath) -> float:
+        """`modified` When a file was written
+
+        Args:
+        - `filename` (`PurePath`): File that was written
+
+        Returns:
+        - `float`: Seconds since the epoch
+        """
+
+    # pylint: disable=unused-argument
+    def is_identical(
+        self: _T, filename: PurePath, header: bytes, source: BinaryIO, buffer: memoryview
+    ) -> bool:
+        """`is_identical` Checks if a file already holds `header` followed by the rest of `source`
+
+        Args:
+        - `filename` (`PurePath`): File that was written
+        - `header` (`bytes`): What the file should start with
+        - `source` (`BinaryIO`): Open file the rest should match, the position is left\
+          unchanged. `None` if the file should hold only `header`.
+        - `buffer` (`memoryview`): Buffer for reading `source`
+
+        Returns:
+        - `bool`: `True` if writing the file wouldn't change it
+        """
+        return False
+
+    # pylint: enable=unused-argument
+
+    def close(self: _T) -> None:
+        """`close` Finishes writing"""
+
+
+class DirectorySink(Sink):
+    """`DirectorySink` Writes each file to its own file on disk"""
+
+    def __init__(self: _T, root: PurePath) -> _T:
+        """`DirectorySink` constructor
+
+        Args:
+        - `root` (`PurePath`): Files are stored relative to this directory
+        """
+        Sink.__init__(self, root)
+        # Directories already created, so each one costs a single `makedirs` call
+        self._directories: Set[PurePath] = set()
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def write(
+        self: _T,
+        filename: PurePath,
+        header: bytes,
+        source: BinaryIO,
+        buffer: memoryview,
+        digest: Any = None,
+        replace: bool = True,
+        size: int = None,
+    ) -> None:
+        parent: PurePath = PurePath(filename).parent
+        if parent not in self._directories:
+            os.makedirs(parent, exist_ok=True)
+            self._directories.add(parent)
+        # Exclusive creation replaces a separate check for an existing file
+        mode: str = "wb" if replace else "xb"
+        try:
+            file: BinaryIO = open(filename, mode=mode)  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            # The directory was removed after it was made
+            os.makedirs(parent, exist_ok=True)
+            file = open(filename, mode=mode)  # pylint: disable=consider-using-with
+        with file:
+            file.write(header)
+            if source is not None:
+                copy_file_body(source, file, buffer, digest, self.copy_mode)
+
+    def modified(self: _T, filename: PurePath) -> float:
+        return os.stat(filename).st_mtime
+
+    def is_identical(
+        self: _T, filename: PurePath, header: bytes, source: BinaryIO, buffer: memoryview
+    ) -> bool:
+        # Most changed files have a different size, which only needs a stat to find out
+        expected: int = len(header) + (remaining_size(source) if source is not None else 0)
+        try:
+            if os.stat(filename).st_size != expected:
+                return False
+        except FileNotFoundError:
+            return False
+        with open(filename, "rb") as existing:
+            if existing.read(len(header)) != header:
+                return False
+            if source is None:
+                return True
+            position: int = source.tell()
+            try:
+                return same_contents(source, existing, buffer)
+            finally:
+                source.seek(position)
+
+
+class _ArchiveSink(Sink):
+    """`_ArchiveSink` Streams files into a single archive, one file at a time"""
+
+    def __init__(self: _T, root: PurePath, filename: PurePath) -> _T:
+        """`_ArchiveSink` constructor
+
+        Args:
+        - `root` (`PurePath`): Member names are relative to this directory
+        - `filename` (`PurePath`): Archive to create
+        """
+        Sink.__init__(self, root)
+        self._filename: PurePath = filename
+        self._lock: threading.Lock = threading.Lock()
+        self._written: Set[str] = set()
+        self._mtime: float = time.time()
+        os.makedirs(Path(filename).parent, exist_ok=True)
+
+    @property
+    def filename(self: _T) -> PurePath:
+        return self._filename
+
+    def _member_name(self: _T, filename: PurePath) -> str:
+        return PurePath(filename).relative_to(self.root).as_posix()
+
+    def modified(self: _T, filename: PurePath) -> float:
+        return self._mtime
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def write(
+        self: _T,
+        filename: PurePath,
+        header: bytes,
+        source: BinaryIO,
+        buffer: memoryview,
+        digest: Any = None,
+        replace: bool = True,
+        size: int = None,
+    ) -> None:
+        name: str = self._member_name(filename)
+        # Archives are written sequentially, workers take turns
+        with self._lock:
+            if not replace and name in self._written:
+                raise FileExistsError(f"'{name}' was already written to '{self.filename}'")
+            self._write_member(name, header, source, buffer, size)
+            self._written.add(name)
+
+    @abstractmethod
+    def _write_member(
+        self: _T, name: str, header: bytes, source: BinaryIO, buffer: memoryview, size: int
+    ) -> None:
+        """`_write_member` Appends one file to the archive, called with the lock held"""
+
+
+class ZipSink(_ArchiveSink):
+    """`ZipSink` Writes a zip file. Images and audio are already compressed, so files are
+    stored without compression"""
+
+    def __init__(self: _T, root: PurePath, filename: PurePath) -> _T:
+        _ArchiveSink.__init__(self, root, filename)
+        self._zip: zipfile.ZipFile = zipfile.ZipFile(  # pylint: disable=consider-using-with
+            filename, "w", zipfile.ZIP_STORED
+        )
+
+    def _write_member(
+        self: _T, name: str, header: bytes, source: BinaryIO, buffer: memoryview, size: int
+    ) -> None:
+        info: zipfile.ZipInfo = zipfile.ZipInfo(name, time.localtime(self._mtime)[:6])
+        with self._zip.open(info, "w", force_zip64=True) as file:
+            file.write(header)
+            if source is not None:
+                copy_file_body(source, file, buffer, mode=self.copy_mode)
+
+    def close(self: _T) -> None:
+        self._zip.close()
+
+
+class TarSink(_ArchiveSink):
+    """`TarSink` Writes a tar file, optionally compressed with zstandard"""
+
+    def __init__(self: _T, root: PurePath, filename: PurePath, compress: bool = False) -> _T:
+        """`TarSink` constructor
+
+        Args:
+        - `root` (`PurePath`): Member names are relative to this directory
+        - `filename` (`PurePath`): Archive to create
+        - `compress` (`bool`, optional): Compress with zstandard. Defaults to `False`.
+
+        Raises:
+        - `OutputFormatError`: If `compress` is set and zstandard isn't installed
+        """
+        if compress and zstandard is None:
+            raise OutputFormatError("tar.zst", "Writing tar.zst files needs zstandard installed")
+        _ArchiveSink.__init__(self, root, filename)
+        self._file: BinaryIO = open(filename, "wb")  # pylint: disable=consider-using-with
+        if compress:
+            self._file = zstandard.ZstdCompressor().stream_writer(self._file)
+        self._tar: tarfile.TarFile = tarfile.open(  # pylint: disable=consider-using-with
+            fileobj=self._file, mode="w|", format=tarfile.PAX_FORMAT
+        )
+
+    def _write_member(
+        self: _T, name: str, header: bytes, source: BinaryIO, buffer: memoryview, size: int
+    ) -> None:
+        info: tarfile.TarInfo = tarfile.TarInfo(name)
+        info.mtime = self._mtime
+        info.mode = 0o644
+        if source is None:
+            info.size = len(header)
+            self._tar.addfile(info, io.BytesIO(header))
+            return
+        # Tar headers hold the size, so it is needed before the data is streamed. Finding it out
+        # from a compressed zip member means decompressing it, use the size given when there is
+        info.size = len(header) + (remaining_size(source) if size is None else size)
+        # tarfile expects full reads, which the buffered reader provides
+        self._tar.addfile(info, io.BufferedReader(PrefixedReader(header, source), len(buffer)))
+
+    def close(self: _T) -> None:
+        self._tar.close()
+        self._file.close()
+
+
+# Output format name and file extension
+OUTPUT_FORMATS: Dict[str, str] = {
+    "directory": "",
+    "zip": ".zip",
+    "tar": ".tar",
+    "tar.zst": ".tar.zst",
+}
+
+
+def available_output_formats() -> List[str]:
+    """`available_output_formats` Lists the output formats that can be used
+
+    Returns:
+    - `List[str]`: Output format names, `tar.zst` is only listed if zstandard is installed
+    """
+    return [name for name in OUTPUT_FORMATS if name != "tar.zst" or zstandard is not None]
+
+
+def archive_filename(output_format: str, output_directory: PurePath) -> PurePath:
+    """`archive_filename` Name of the archive written for an output format
+
+    Archives are named after the output directory and are stored next to it.
+
+    Args:
+    - `output_format` (`str`): One of `OUTPUT_FORMATS`
+    - `output_directory` (`PurePath`): Project output directory
+
+    Returns:
+    - `PurePath`: Archive file, `None` for the `directory` format
+    """
+    if not OUTPUT_FORMATS.get(output_format):
+        return None
+    return output_directory.with_name(output_directory.name + OUTPUT_FORMATS[output_format])
+
+
+def open_sink(
+    output_format: str,
+    output_directory: PurePath,
+    copy_mode: CopyMode = CopyMode.AUTO,
+    filename: PurePath = None,
+) -> Sink:
+    """`open_sink` Creates the sink for an output format
+
+    Archives hold the same tree the directory would, including the project directory.
+
+    Args:
+    - `output_format` (`str`): One of `OUTPUT_FORMATS`
+    - `output_directory` (`PurePath`): Project output directory
+    - `copy_mode` (`CopyMode`, optional): How file bodies are copied. Defaults to\
+      `CopyMode.AUTO`.
+    - `filename` (`PurePath`, optional): Archive to write. Defaults to `None`, which uses\
+      `archive_filename`.
+
+    Raises:
+    - `OutputFormatError`: If the format is unknown or can't be used
+
+    Returns:
+    - `Sink`: Open sink, call `close` once every file has been written
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise OutputFormatError(output_format, f"Unknown output format '{output_format}'")
+    if filename is None:
+        filename = archive_filename(output_format, output_directory)
+    sink: Sink
+    if filename is None:
+        sink = DirectorySink(output_directory.parent)
+    elif output_format == "zip":
+        sink = ZipSink(output_directory.parent, filename)
+    else:
+        sink = TarSink(output_directory.parent, filename, output_format == "tar.zst")
+    sink.copy_mode = copy_mode
+    return sink
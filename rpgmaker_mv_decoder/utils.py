@@ -1,7 +1,26 @@
 #!/usr/bin/env python3
 """Utility functions"""
 
+import io
+import itertools
+import mmap
+import os
 import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import PurePath
+from typing import Any, BinaryIO, Callable, Deque, Iterable, Iterator, List, Tuple, TypeVar, Union
+
+from rpgmaker_mv_decoder.constants import COPY_CHUNK_SIZE
+from rpgmaker_mv_decoder.copymode import CopyMode
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_I = TypeVar("_I")
+_R = TypeVar("_R")
 
 
 def int_xor(var: bytes, key: bytes) -> bytes:
@@ -22,3 +41,322 @@ def int_xor(var: bytes, key: bytes) -> bytes:
     int_key: int = int.from_bytes(key, sys.byteorder)
     int_enc: int = int_var ^ int_key
     return int_enc.to_bytes(len(var), sys.byteorder)
+
+
+def xor_headers(headers: Union[bytearray, memoryview, Any], key: bytes) -> None:
+    """`xor_headers` XORs many 16 byte headers with the same key, in place
+
+    Uses a single NumPy operation when NumPy is installed, otherwise a single integer XOR over
+    the whole buffer.
+
+    Args:
+    - `headers` (`Union[bytearray, memoryview, numpy.ndarray]`): Writable buffer holding the\
+      headers back to back, or a `uint8` array shaped `[N, 16]`
+    - `key` (`bytes`): 16 byte key
+
+    Raises:
+    - `ValueError`: If the buffer isn't a whole number of headers
+    """
+    size: int = len(key)
+    if numpy is not None:
+        array = numpy.frombuffer(headers, dtype=numpy.uint8).reshape(-1, size)
+        array ^= numpy.frombuffer(key, dtype=numpy.uint8)
+        return
+    buffer: memoryview = memoryview(headers).cast("B")
+    if len(buffer) % size:
+        raise ValueError(f"Buffer of {len(buffer)} bytes is not a multiple of {size}")
+    count: int = len(buffer) // size
+    value: int = int.from_bytes(buffer, "little") ^ int.from_bytes(key * count, "little")
+    buffer[:] = value.to_bytes(len(buffer), "little")
+
+
+def _copy_file_range(source_fd: int, destination_fd: int, offset: int, count: int) -> int:
+    return os.copy_file_range(source_fd, destination_fd, count, offset)
+
+
+def _sendfile(source_fd: int, destination_fd: int, offset: int, count: int) -> int:
+    return os.sendfile(destination_fd, source_fd, offset, count)
+
+
+_ZERO_COPY_METHODS: List[Callable[[int, int, int, int], int]] = []
+if hasattr(os, "copy_file_range"):
+    _ZERO_COPY_METHODS.append(_copy_file_range)
+if hasattr(os, "sendfile"):
+    _ZERO_COPY_METHODS.append(_sendfile)
+
+
+def _zero_copy(source: BinaryIO, destination: BinaryIO) -> Tuple[int, int]:
+    """`_zero_copy` copies the rest of `source` into `destination` inside the kernel
+
+    Args:
+    - `source` (`BinaryIO`): File to read from
+    - `destination` (`BinaryIO`): File to write to
+
+    Returns:
+    - `Tuple[int, int]`: Bytes copied and bytes left to copy, `None` if the size of `source`\
+      is unknown because it isn't backed by a file descriptor
+    """
+    try:
+        source_fd: int = source.fileno()
+        destination_fd: int = destination.fileno()
+    except (OSError, AttributeError):
+        # Archive members and in memory files
+        return (0, None)
+    offset: int = source.tell()
+    remaining: int = os.fstat(source_fd).st_size - offset
+    copied: int = 0
+    for method in _ZERO_COPY_METHODS:
+        try:
+            while copied < remaining:
+                sent: int = method(source_fd, destination_fd, offset + copied, remaining - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            break
+        except OSError:
+            # Not supported for these files (cross device, not a regular file, etc.)
+            continue
+    source.seek(offset + copied)
+    return (copied, remaining - copied)
+
+
+def _file_size_left(source: BinaryIO) -> int:
+    """`_file_size_left` Bytes left to read in a file backed by a file descriptor
+
+    Args:
+    - `source` (`BinaryIO`): File to check
+
+    Returns:
+    - `int`: Bytes after the current position, `None` for archive members and in memory files
+    """
+    try:
+        return os.fstat(source.fileno()).st_size - source.tell()
+    except (OSError, AttributeError):
+        return None
+
+
+def _mmap_copy(source: BinaryIO, destination: BinaryIO, digest: Any = None) -> int:
+    """`_mmap_copy` copies the rest of `source` into `destination` straight from a mapping
+
+    Args:
+    - `source` (`BinaryIO`): File to read from, must be backed by a file descriptor
+    - `destination` (`BinaryIO`): File to write to
+    - `digest` (`Any`, optional): `hashlib` object updated with the copied data. Defaults to\
+      `None`.
+
+    Raises:
+    - `OSError`: If the file can't be mapped
+    - `ValueError`: If the file is empty
+
+    Returns:
+    - `int`: Number of bytes copied
+    """
+    offset: int = source.tell()
+    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        with memoryview(mapping) as view, view[offset:] as body:
+            destination.write(body)
+            if digest is not None:
+                digest.update(body)
+            copied: int = len(body)
+    source.seek(offset + copied)
+    return copied
+
+
+def copy_file_body(
+    source: BinaryIO,
+    destination: BinaryIO,
+    buffer: memoryview = None,
+    digest: Any = None,
+    mode: CopyMode = CopyMode.AUTO,
+) -> int:
+    """`copy_file_body` copies the rest of `source` into `destination`
+
+    Starts at the current position of `source` and appends to `destination`. How the data is
+    moved depends on `mode`, see `CopyMode`. Kernel copies and mappings fall back to `buffer`
+    when the files don't support them, and kernel copies can't be used when `digest` is passed.
+
+    Args:
+    - `source` (`BinaryIO`): File to read from. Files without a file descriptor, like archive\
+      members, are copied through `buffer`.
+    - `destination` (`BinaryIO`): File to write to
+    - `buffer` (`memoryview`, optional): Reusable buffer for the chunked copy. Defaults to\
+      `None` which allocates a buffer of up to `COPY_CHUNK_SIZE` bytes.
+    - `digest` (`Any`, optional): `hashlib` object updated with the copied data. Defaults to\
+      `None`.
+    - `mode` (`CopyMode`, optional): How to copy the data. Defaults to `CopyMode.AUTO`.
+
+    Returns:
+    - `int`: Number of bytes copied
+    """
+    destination.flush()
+    copied: int = 0
+    remaining: int = _file_size_left(source)
+    mode = mode.resolve(remaining, digest is not None)
+    if mode == CopyMode.MMAP and remaining:
+        try:
+            return _mmap_copy(source, destination, digest)
+        except OSError:
+            # File systems that don't support mapping files
+            pass
+    elif mode == CopyMode.KERNEL:
+        (copied, remaining) = _zero_copy(source, destination)
+        if remaining == 0:
+            return copied
+    if buffer is None:
+        size: int = COPY_CHUNK_SIZE if remaining is None else max(remaining, 1)
+        buffer = memoryview(bytearray(min(COPY_CHUNK_SIZE, size)))
+    while True:
+        size = source.readinto(buffer)
+        if not size:
+            break
+        destination.write(buffer[:size])
+        if digest is not None:
+            digest.update(buffer[:size])
+        copied += size
+    return copied
+
+
+def same_contents(source: BinaryIO, other: BinaryIO, buffer: memoryview) -> bool:
+    """`same_contents` Checks if the rest of two files hold the same data
+
+    Args:
+    - `source` (`BinaryIO`): File read through `buffer`
+    - `other` (`BinaryIO`): File compared against, read in the same sized pieces
+    - `buffer` (`memoryview`): Buffer for reading `source`
+
+    Returns:
+    - `bool`: `True` if both files have the same data up to the end
+    """
+    while True:
+        size: int = source.readinto(buffer)
+        if not size:
+            return not other.read(1)
+        data: bytes = other.read(size)
+        # Comparing a memoryview with `==` goes byte by byte, `startswith` is a single memcmp
+        if len(data) != size or not data.startswith(buffer[:size]):
+            return False
+
+
+def remaining_size(source: BinaryIO) -> int:
+    """`remaining_size` Number of bytes left to read in a seekable file
+
+    Files backed by a file descriptor are checked with `os.fstat`, others by seeking to the end.
+
+    Args:
+    - `source` (`BinaryIO`): Seekable file, the position is left unchanged
+
+    Returns:
+    - `int`: Bytes between the current position and the end of the file
+    """
+    remaining: int = _file_size_left(source)
+    if remaining is not None:
+        return remaining
+    position: int = source.tell()
+    end: int = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return end - position
+
+
+class PrefixedReader(io.RawIOBase):
+    """`PrefixedReader` Reads `header` followed by the rest of `source`
+
+    Used to hand a decoded file to code that wants a single readable file, without copying the
+    body into memory.
+    """
+
+    def __init__(self, header: bytes, source: BinaryIO) -> None:
+        """`PrefixedReader` constructor
+
+        Args:
+        - `header` (`bytes`): Read first
+        - `source` (`BinaryIO`): Read from the current position once `header` is used up.\
+          Closed when the reader is closed.
+        """
+        io.RawIOBase.__init__(self)
+        self._header: memoryview = memoryview(bytes(header))
+        self._source: BinaryIO = source
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self._header:
+            size: int = min(len(buffer), len(self._header))
+            buffer[:size] = self._header[:size]
+            self._header = self._header[size:]
+            return size
+        return self._source.readinto(buffer)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._source.close()
+        io.RawIOBase.close(self)
+
+
+def read_header(filename: PurePath, size: int) -> bytes:
+    """`read_header` Reads the start of a file with a single system call
+
+    Args:
+    - `filename` (`PurePath`): File to read
+    - `size` (`int`): Number of bytes to read
+
+    Returns:
+    - `bytes`: Up to `size` bytes from the start of the file
+    """
+    file: int = os.open(filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if hasattr(os, "pread"):
+            return os.pread(file, size, 0)
+        return os.read(file, size)
+    finally:
+        os.close(file)
+
+
+def prefetch(
+    function: Callable[[_I], _R], items: Iterable[_I], workers: int
+) -> Iterator[Tuple[_I, _R]]:
+    """`prefetch` Runs `function` on `items` in a thread pool, yielding results in order
+
+    At most `workers` items are in flight at any time, so stopping early only wastes a few
+    calls. Closing the iterator cancels the calls that haven't started yet.
+
+    Args:
+    - `function` (`Callable[[_I], _R]`): Function to run on each item
+    - `items` (`Iterable[_I]`): Items to process
+    - `workers` (`int`): Number of threads to use
+
+    Returns:
+    - `Iterator[Tuple[_I, _R]]`: Each item with the result of `function`
+    """
+    remaining: Iterator[_I] = iter(items)
+    pending: Deque[Tuple[_I, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in itertools.islice(remaining, workers):
+                pending.append((item, executor.submit(function, item)))
+            while pending:
+                (item, future) = pending.popleft()
+                result: _R = future.result()
+                for next_item in itertools.islice(remaining, 1):
+                    pending.append((next_item, executor.submit(function, next_item)))
+                yield (item, result)
+        finally:
+            for (_, future) in pending:
+                future.cancel()
+
+
+def format_size(size: float) -> str:
+    """`format_size` Formats a number of bytes for display, like `12.3 MB`
+
+    Args:
+    - `size` (`float`): Number of bytes
+
+    Returns:
+    - `str`: Size with one decimal place, in B, KB, MB, GB or TB
+    """
+    unit: str
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:0.1f} {unit}"
+        size /= 1000
+    return f"{size:0.1f} TB"
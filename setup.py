@@ -41,6 +41,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require={"numpy": ["numpy"], "zstd": ["zstandard"]},
     license="MIT license",
     long_description=readme + "\n\n" + history,
     include_package_data=True,
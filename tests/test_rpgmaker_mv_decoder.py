@@ -3,21 +3,96 @@
 """Tests for `rpgmaker_mv_decoder` package."""
 
 
+import asyncio
+import hashlib
+import json
+import os
+import random
 import shutil
+import struct
+import tarfile
+import tempfile
 import unittest
+import zipfile
 from pathlib import Path, PurePath
-from typing import List
+from typing import Any, Dict, List
+from unittest import mock
 
 from click.testing import CliRunner
 
+from benchmarks.synthetic import file_size
 from decode import decode
 from encode import encode
-from rpgmaker_mv_decoder.exceptions import NoValidFilesFound
+from rpgmaker_mv_decoder import utils
+from rpgmaker_mv_decoder.archives import open_archive
+from rpgmaker_mv_decoder.callbacks import Callbacks
+from rpgmaker_mv_decoder.conflictpolicy import ConflictPolicy
+from rpgmaker_mv_decoder.constants import (
+    COPY_CHUNK_SIZE,
+    KEY_CONFIDENCE,
+    MANIFEST_FILENAME,
+    PNG_HEADER,
+    RPG_MAKER_MV_MAGIC,
+)
+from rpgmaker_mv_decoder.copymode import CopyMode
+from rpgmaker_mv_decoder.exceptions import InvalidKeyError, NoValidFilesFound, OutputFormatError
+from rpgmaker_mv_decoder.filetypes import detect_signature
+from rpgmaker_mv_decoder.key import Key
+from rpgmaker_mv_decoder.messagetypes import MessageType
+from rpgmaker_mv_decoder.progress import ProgressEvent
+from rpgmaker_mv_decoder.progressreporter import ProgressReporter
 from rpgmaker_mv_decoder.projectdecoder import ProjectDecoder
+from rpgmaker_mv_decoder.projectencoder import ProjectEncoder
 from rpgmaker_mv_decoder.projectkeyfinder import ProjectKeyFinder
+from rpgmaker_mv_decoder.projectpaths import ProjectPaths
+from rpgmaker_mv_decoder.samplingmethod import SamplingMethod
+from rpgmaker_mv_decoder.sinks import archive_filename, available_output_formats, zstandard
+from rpgmaker_mv_decoder.utils import int_xor
 
 
-class TestDecode(unittest.TestCase):
+def write_asar(source: Path, files: List[Path], directory: Path) -> Path:
+    """Packs files into an Electron asar archive"""
+    index: Dict[str, Any] = {"files": {}}
+    offset: int = 0
+    for path in files:
+        entry: Dict[str, Any] = index
+        for part in path.relative_to(source).parent.parts:
+            entry = entry["files"].setdefault(part, {"files": {}})
+        entry["files"][path.name] = {"size": path.stat().st_size, "offset": str(offset)}
+        offset += path.stat().st_size
+    data: bytes = json.dumps(index).encode()
+    padding: bytes = bytes(-len(data) % 4)
+    archive: Path = directory.joinpath("project.asar")
+    with open(archive, "wb") as file:
+        file.write(
+            struct.pack(
+                "<4I", 4, len(data) + len(padding) + 8, len(data) + len(padding) + 4, len(data)
+            )
+        )
+        file.write(data + padding)
+        for path in files:
+            file.write(path.read_bytes())
+    return archive
+
+
+def extract_archive(archive: Path, directory: Path) -> None:
+    """Extracts a zip, tar or tar.zst archive"""
+    if archive.suffix == ".zip":
+        with zipfile.ZipFile(archive) as zip_file:
+            zip_file.extractall(directory)
+        return
+    with open(archive, "rb") as file:
+        stream = file
+        if archive.suffix == ".zst":
+            stream = zstandard.ZstdDecompressor().stream_reader(file)
+        with tarfile.open(fileobj=stream, mode="r|") as tar_file:
+            for member in tar_file:
+                target: Path = directory.joinpath(member.name)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(tar_file.extractfile(member).read())
+
+
+class TestDecode(unittest.TestCase):  # pylint: disable=too-many-public-methods
     """Tests for `rpgmaker_mv_decoder` package."""
 
     def __init__(self, methodName: str = ...) -> None:
@@ -43,6 +118,25 @@ class TestDecode(unittest.TestCase):
     def check_source_files(self):
         """TODO: Check md5sums"""
 
+    def check_output_files(self, project_dir: PurePath) -> int:
+        """Checks decoded files against `tests/output_checksums.md5`, returns the number checked"""
+        expected: Dict[str, str] = {}
+        with open("tests/output_checksums.md5", encoding="UTF-8") as checksums:
+            for line in checksums:
+                (checksum, name) = line.split(maxsplit=1)
+                expected[name.strip()] = checksum
+        checked: int = 0
+        for (name, checksum) in expected.items():
+            output_file: Path = Path(project_dir).joinpath(name)
+            if output_file.exists():
+                self.assertEqual(
+                    checksum,
+                    hashlib.md5(output_file.read_bytes()).hexdigest(),
+                    f"Checksum doesn't match for '{output_file}'",
+                )
+                checked += 1
+        return checked
+
     def test_key_finding_invalid(self):
         """Test invalid source directory."""
         with self.assertRaises(
@@ -61,6 +155,434 @@ class TestDecode(unittest.TestCase):
             cnt += 1
         shutil.rmtree(Path(self.dst_dir).resolve())
 
+    def test_decode_files_parallel(self):
+        """Test decoding a project with multiple workers."""
+        decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+        decoder.workers = 4
+        decoder.decode(False)
+        self.assertEqual(
+            len(decoder.project_paths.encoded_files),
+            self.check_output_files(decoder.project_paths.output_directory),
+        )
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_files_small_chunks(self):
+        """Test decoding a project with file type detection and a small copy buffer."""
+        decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+        decoder.chunk_size = 4096
+        decoder.decode(True)
+        self.assertEqual(
+            len(decoder.project_paths.encoded_files),
+            self.check_output_files(decoder.project_paths.output_directory),
+        )
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_files_copy_modes(self):
+        """Test decoding a project with each copy mode, with and without hashing."""
+        self.assertEqual(CopyMode.BUFFERED, CopyMode.AUTO.resolve(1024, False))
+        self.assertEqual(CopyMode.KERNEL, CopyMode.AUTO.resolve(COPY_CHUNK_SIZE, False))
+        self.assertEqual(CopyMode.MMAP, CopyMode.AUTO.resolve(COPY_CHUNK_SIZE, True))
+        self.assertEqual(CopyMode.BUFFERED, CopyMode.MMAP.resolve(None, False))
+        for copy_mode in CopyMode:
+            for incremental in [False, True]:
+                decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+                decoder.copy_mode = copy_mode
+                decoder.incremental = incremental
+                decoder.decode(False)
+                self.assertEqual(
+                    len(decoder.project_paths.encoded_files),
+                    self.check_output_files(decoder.project_paths.output_directory),
+                )
+                shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_files_existing(self):
+        """Test each way of handling files that already exist."""
+        ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key).decode(False)
+        prompt = mock.Mock(return_value=False)
+        decoder = ProjectDecoder(
+            self.valid_src_dir[1], self.dst_dir, self.key, Callbacks(prompt_callback=prompt)
+        )
+        output_dir: Path = Path(decoder.project_paths.output_directory)
+        files: int = len(decoder.project_paths.encoded_files)
+        for (policy, expected_prompts) in [
+            (ConflictPolicy.SKIP, 0),
+            (ConflictPolicy.PROMPT, 1),
+            (ConflictPolicy.SKIP_IF_IDENTICAL, 1),
+            (ConflictPolicy.NEWER_WINS, 1),
+            (ConflictPolicy.OVERWRITE, 1),
+        ]:
+            decoder.conflict_policy = policy
+            decoder.decode(False)
+            self.assertEqual(expected_prompts, prompt.call_count)
+            self.assertEqual(files, self.check_output_files(output_dir))
+        self.assertEqual(files, len(list(output_dir.glob("**/*.*"))))
+        decoder.conflict_policy = ConflictPolicy.RENAME
+        decoder.decode(False)
+        self.assertEqual(files, len(list(output_dir.glob("**/* (1).*"))))
+        # Changed files are replaced once the prompt is accepted, or when they differ
+        changed: Path = next(output_dir.glob("**/*.png"))
+        for policy in [ConflictPolicy.PROMPT, ConflictPolicy.SKIP_IF_IDENTICAL]:
+            changed.write_bytes(b"changed")
+            prompt.return_value = True
+            decoder.conflict_policy = policy
+            decoder.decode(False)
+            self.assertEqual(files, self.check_output_files(output_dir))
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_files_skip_identical(self):
+        """Test that identical files aren't written again and same sized changes are found."""
+        decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+        decoder.decode(True)
+        output_dir: Path = Path(decoder.project_paths.output_directory)
+        outputs: List[Path] = sorted(output_dir.glob("**/*.*"))
+        for output in outputs:
+            os.utime(output, (0, 0))
+        changed: bytearray = bytearray(outputs[0].read_bytes())
+        changed[-1] ^= 0xFF
+        outputs[0].write_bytes(changed)
+        decoder.conflict_policy = ConflictPolicy.SKIP_IF_IDENTICAL
+        decoder.decode(True)
+        self.assertEqual([0] * (len(outputs) - 1), [path.stat().st_mtime for path in outputs[1:]])
+        self.assertEqual(len(outputs), self.check_output_files(output_dir))
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_files_incremental(self):
+        """Test that incremental decoding skips files that haven't changed."""
+        decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+        decoder.overwrite = True
+        decoder.incremental = True
+        decoder.decode(False)
+        output_dir: Path = Path(decoder.project_paths.output_directory)
+        self.assertTrue(output_dir.joinpath(MANIFEST_FILENAME).exists())
+        outputs: Dict[Path, int] = {
+            path: path.stat().st_mtime_ns for path in output_dir.glob("**/*.png")
+        }
+        (changed, corrupted, touched) = sorted(outputs)[:3]
+        changed.write_bytes(b"")
+        # Same size, different contents, only the hash can tell
+        corrupted.write_bytes(bytes(corrupted.stat().st_size))
+        # Same contents, only the time changed
+        outputs[touched] += 10**9
+        os.utime(touched, ns=(outputs[touched], outputs[touched]))
+        decoder.decode(False)
+        for (path, mtime) in outputs.items():
+            # The files that changed are checked against the expected contents below
+            if path not in (changed, corrupted):
+                self.assertEqual(mtime, path.stat().st_mtime_ns, f"'{path}' shouldn't change")
+        self.assertEqual(
+            len(decoder.project_paths.encoded_files), self.check_output_files(output_dir)
+        )
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_files_async(self):
+        """Test decoding from an event loop, with cancellation."""
+
+        async def decode_all(
+            decoder: ProjectDecoder, stop_after: int = None
+        ) -> List[ProgressEvent]:
+            events: List[ProgressEvent] = []
+            async for event in decoder.decode_async(False):
+                events.append(event)
+                if len(events) == stop_after:
+                    decoder.cancel()
+            return events
+
+        decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+        decoder.overwrite = True
+        decoder.workers = 4
+        events: List[ProgressEvent] = asyncio.run(decode_all(decoder))
+        self.assertEqual(len(decoder.project_paths.encoded_files), len(events))
+        self.assertEqual(len(events), events[-1].completed)
+        self.assertTrue(all(event.result for event in events))
+        self.assertEqual(
+            len(events), self.check_output_files(decoder.project_paths.output_directory)
+        )
+        shutil.rmtree(Path(self.dst_dir).resolve())
+        events = asyncio.run(decode_all(decoder, 1))
+        self.assertLess(len(events), len(decoder.project_paths.encoded_files))
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_key_finding_async(self):
+        """Test finding the key from an event loop."""
+
+        async def find_key(finder: ProjectKeyFinder) -> List[ProgressEvent]:
+            return [event async for event in finder.find_key_async(seed=0)]
+
+        events: List[ProgressEvent] = asyncio.run(find_key(ProjectKeyFinder(self.valid_src_dir[0])))
+        self.assertIsNone(events[-1].item)
+        self.assertEqual(self.key, events[-1].result)
+        self.assertGreater(len(events), 1)
+
+    def test_decode_archives(self):
+        """Test finding the key and decoding from zip and asar archives."""
+        source: Path = Path(self.valid_src_dir[1])
+        files: List[Path] = sorted(path for path in source.glob("**/*") if path.is_file())
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive: Path = Path(temp_dir).joinpath("project.zip")
+            with zipfile.ZipFile(archive, "w") as zip_file:
+                for path in files:
+                    zip_file.write(path, path.relative_to(source).as_posix())
+            archives: List[Path] = [archive, write_asar(source, files, Path(temp_dir))]
+            for archive in archives:
+                self.assertEqual(self.key, ProjectKeyFinder(archive).find_key())
+                decoder = ProjectDecoder(archive, self.dst_dir, self.key)
+                decoder.workers = 4
+                decoder.decode(False)
+                self.assertEqual(
+                    len(decoder.project_paths.encoded_files),
+                    self.check_output_files(decoder.project_paths.output_directory),
+                )
+                shutil.rmtree(Path(self.dst_dir).resolve())
+            # The command line takes an archive, but not any other file
+            result = CliRunner().invoke(decode, [str(archive), str(self.dst_dir), self.key])
+            self.assertEqual(0, result.exit_code, result.output)
+            shutil.rmtree(Path(self.dst_dir).resolve())
+            # An index larger than the file is never read
+            archive = Path(temp_dir).joinpath("broken.asar")
+            archive.write_bytes(struct.pack("<4I", 4, 0xFFFFFFF8, 0xFFFFFFF4, 0xFFFFFFF0))
+            with mock.patch("os.pread", wraps=os.pread) as pread:
+                self.assertIsNone(open_archive(archive))
+            self.assertLessEqual(max(call.args[1] for call in pread.call_args_list), 16)
+        result = CliRunner().invoke(decode, [__file__, str(self.dst_dir), self.key])
+        self.assertEqual(2, result.exit_code)
+        self.assertIn("is not a directory or a zip or asar archive", result.output)
+        self.assertFalse(Path(self.dst_dir).exists())
+
+    def test_decode_to_archives(self):
+        """Test decoding straight into zip, tar and tar.zst archives."""
+        for output_format in available_output_formats()[1:]:
+            decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+            decoder.output_format = output_format
+            decoder.workers = 4
+            decoder.decode(False)
+            archive: Path = Path(
+                archive_filename(output_format, decoder.project_paths.output_directory)
+            )
+            self.assertTrue(archive.name.endswith(output_format))
+            self.assertFalse(Path(decoder.project_paths.output_directory).exists())
+            with tempfile.TemporaryDirectory() as temp_dir:
+                extract_archive(archive, Path(temp_dir))
+                self.assertEqual(
+                    len(decoder.project_paths.encoded_files),
+                    self.check_output_files(
+                        Path(temp_dir).joinpath(decoder.project_paths.output_directory.name)
+                    ),
+                )
+            shutil.rmtree(Path(self.dst_dir).resolve())
+        source: Path = Path(self.valid_src_dir[1])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            zip_source: Path = Path(temp_dir).joinpath("project.zip")
+            with zipfile.ZipFile(zip_source, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                for path in sorted(source.glob("**/*.rpgmv[op]")):
+                    zip_file.write(path, path.relative_to(source).as_posix())
+            decoder = ProjectDecoder(zip_source, self.dst_dir, self.key)
+            decoder.output_format = "tar"
+            # Compressed members would have to be read to the end to find their size
+            with mock.patch("rpgmaker_mv_decoder.sinks.remaining_size") as remaining_size:
+                decoder.decode(False)
+            remaining_size.assert_not_called()
+            archive = Path(archive_filename("tar", decoder.project_paths.output_directory))
+            extract_archive(archive, Path(temp_dir))
+            self.assertEqual(
+                len(decoder.project_paths.encoded_files),
+                self.check_output_files(Path(temp_dir).joinpath("project")),
+            )
+            # Archive members can't be compared, the archive is left alone
+            decoder.conflict_policy = ConflictPolicy.SKIP_IF_IDENTICAL
+            mtime: int = archive.stat().st_mtime_ns
+            with self.assertRaises(OutputFormatError):
+                decoder.decode(False)
+            self.assertEqual(mtime, archive.stat().st_mtime_ns)
+            result = CliRunner().invoke(
+                decode,
+                [str(zip_source), str(self.dst_dir), self.key, "--output-format", "zip"]
+                + ["--on-conflict", "skip-if-identical"],
+            )
+            self.assertEqual(2, result.exit_code)
+            self.assertIn("can't be used with zip output", result.output)
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_archive_conflicts(self):
+        """Test what each conflict policy does with an archive that already exists."""
+        decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+        decoder.output_format = "tar"
+        decoder.decode(False)
+        archive = Path(archive_filename("tar", decoder.project_paths.output_directory))
+        original: bytes = archive.read_bytes()
+        # A new archive next to it, the existing one is kept
+        decoder.conflict_policy = ConflictPolicy.RENAME
+        for count in (1, 2):
+            decoder.decode(False)
+            self.assertTrue(archive.with_name(f"decode_project ({count}).tar").exists())
+        self.assertEqual(original, archive.read_bytes())
+        decoder.output_format = "zip"
+        decoder.decode(False)
+        self.assertTrue(archive.with_name("decode_project.zip").exists())
+        decoder.decode(False)
+        self.assertTrue(archive.with_name("decode_project (1).zip").exists())
+        decoder.output_format = "tar"
+        for policy in (ConflictPolicy.SKIP_IF_IDENTICAL, ConflictPolicy.NEWER_WINS):
+            decoder.conflict_policy = policy
+            with self.assertRaises(OutputFormatError):
+                decoder.decode(False)
+        self.assertEqual(original, archive.read_bytes())
+        self.assertEqual(5, len(list(Path(self.dst_dir).iterdir())))
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_in_memory(self):
+        """Test decoding a project without writing any files."""
+        expected: Dict[str, str] = {}
+        with open("tests/output_checksums.md5", encoding="UTF-8") as checksums:
+            for line in checksums:
+                (checksum, name) = line.split(maxsplit=1)
+                expected[name.strip()] = checksum
+        decoder = ProjectDecoder(self.valid_src_dir[1], self.dst_dir, self.key)
+        decoder.chunk_size = 4096
+        count: int = 0
+        for (name, mime_type, file) in decoder.iter_decoded():
+            self.assertIn(mime_type, ["image/png", "audio/ogg"])
+            self.assertEqual(expected[name.as_posix()], hashlib.md5(file.read()).hexdigest())
+            count += 1
+        self.assertEqual(len(decoder.project_paths.encoded_files), count)
+        self.assertFalse(Path(self.dst_dir).exists())
+
+    def test_decode_with_key_finder_paths(self):
+        """Test decoding from the paths used to find the key, without listing the project again."""
+        finder = ProjectKeyFinder(self.valid_src_dir[1])
+        key: str = finder.find_key()
+        cached: List[Path] = [
+            path
+            for path in finder.project_paths.encoded_images
+            if finder.project_paths.cached_header(path, 32) is not None
+        ]
+        self.assertLessEqual(finder.samples, len(cached))
+        decoder = ProjectDecoder(finder.project_paths, self.dst_dir, key)
+        self.assertIs(finder.project_paths, decoder.project_paths)
+        with mock.patch("os.scandir", side_effect=AssertionError("Project listed again")):
+            decoder.decode(False)
+        self.assertEqual(
+            len(decoder.project_paths.encoded_files),
+            self.check_output_files(decoder.project_paths.output_directory),
+        )
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_wrong_key(self):
+        """Test a wrong key is caught before decoding, or stops decoding after a few files."""
+        wrong_key: str = "0" * 32
+        message = mock.Mock()
+        decoder = ProjectDecoder(
+            self.valid_src_dir[1], self.dst_dir, wrong_key, Callbacks(message_callback=message)
+        )
+        output_dir: Path = Path(decoder.project_paths.output_directory)
+        with self.assertRaises(InvalidKeyError):
+            decoder.validate_key()
+        decoder.decode(False)
+        self.assertFalse(output_dir.exists())
+        decoder.verify_key = False
+        decoder.max_invalid = 3
+        decoder.decode(False)
+        self.assertEqual(3, len(list(output_dir.glob("**/*.*"))))
+        errors: List[str] = [
+            call.args[1] for call in message.call_args_list if call.args[0] == MessageType.ERROR
+        ]
+        self.assertEqual(2, len(errors))
+        decoder.verify_key = True
+
+        async def decode_all() -> List[ProgressEvent]:
+            return [event async for event in decoder.decode_async(False)]
+
+        self.assertEqual([], asyncio.run(decode_all()))
+        # `0` never stops, and a file that decodes doesn't count towards it
+        decoder.key = self.key
+        decoder.max_invalid = 0
+        decoder.overwrite = True
+        decoder.decode(False)
+        self.assertEqual(
+            len(decoder.project_paths.encoded_files), self.check_output_files(output_dir)
+        )
+        with self.assertRaises(NoValidFilesFound):
+            ProjectDecoder(__file__, self.dst_dir, self.key).validate_key()
+        # The command line looks for the right key instead
+        result = CliRunner().invoke(
+            decode, [str(self.valid_src_dir[1]), str(self.dst_dir), wrong_key, "--overwrite"]
+        )
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(
+            len(decoder.project_paths.encoded_files), self.check_output_files(output_dir)
+        )
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_decode_promised_types(self):
+        """Test files count as decoded when they start like the type their extension promises,
+        whether or not the file signatures know the type."""
+        message = mock.Mock()
+        decoder = ProjectDecoder(
+            self.valid_src_dir[1], self.dst_dir, self.key, Callbacks(message_callback=message)
+        )
+        decoder.verify_key = False
+        decoder.max_invalid = 1
+        with mock.patch("rpgmaker_mv_decoder.filetypes._SIGNATURES", []):
+            decoder.decode(False)
+        output_dir: Path = Path(decoder.project_paths.output_directory)
+        self.assertEqual(
+            len(decoder.project_paths.encoded_files), self.check_output_files(output_dir)
+        )
+        # A known file type that isn't the promised one doesn't count
+        with tempfile.TemporaryDirectory() as project:
+            Path(project).joinpath("img").mkdir()
+            for image in sorted(Path(self.valid_src_dir[0]).glob("img/**/*.rpgmvp"))[:2]:
+                shutil.copyfile(image, Path(project).joinpath("img", image.stem + ".rpgmvo"))
+            decoder = ProjectDecoder(
+                PurePath(project), self.dst_dir, self.key, Callbacks(message_callback=message)
+            )
+            decoder.verify_key = False
+            decoder.max_invalid = 2
+            decoder.decode(False)
+        errors: List[str] = [
+            call.args[1] for call in message.call_args_list if call.args[0] == MessageType.ERROR
+        ]
+        self.assertEqual(1, len(errors))
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_progress_rate_limited(self):
+        """Test progress is passed on at a fixed rate instead of for every file."""
+        progress = mock.Mock(return_value=False)
+        files: List[Path] = ProjectPaths(self.valid_src_dir[1], None).encoded_files
+        with ProgressReporter(
+            Callbacks(progressbar_callback=progress), files, "Testing", False, 60
+        ) as reporter:
+            for filename in files:
+                self.assertFalse(reporter.update(filename))
+        # The first file and what was left when the reporter closed
+        self.assertEqual(2, progress.call_count)
+        self.assertEqual(len(files), progress.call_args.args[0].pos)
+        decoder = ProjectDecoder(
+            self.valid_src_dir[1], self.dst_dir, self.key, Callbacks(progressbar_callback=progress)
+        )
+        decoder.show_progress = False
+        decoder.decode(False)
+        self.assertIsNone(progress.call_args.args[0])
+        self.assertEqual(
+            len(files), self.check_output_files(decoder.project_paths.output_directory)
+        )
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
+    def test_progress_by_size(self):
+        """Test decoding measures progress in bytes and keeps the number of files."""
+        progress = mock.Mock(return_value=False)
+        decoder = ProjectDecoder(
+            self.valid_src_dir[1], self.dst_dir, self.key, Callbacks(progressbar_callback=progress)
+        )
+        decoder.show_progress = False
+        decoder.decode(False)
+        files: List[Path] = decoder.project_paths.encoded_files
+        total: int = sum(os.path.getsize(filename) for filename in files)
+        progressbar = progress.call_args_list[0].args[0]
+        self.assertEqual((total, total), (progressbar.pos, progressbar.bytes_total))
+        self.assertEqual((len(files), len(files)), (progressbar.files, progressbar.files_total))
+        self.assertEqual("1.5 MB", utils.format_size(1500000))
+        shutil.rmtree(Path(self.dst_dir).resolve())
+
     def test_key_finding_valid(self):
         """Test finding a key."""
         for path in self.valid_src_dir:
@@ -70,6 +592,142 @@ class TestDecode(unittest.TestCase):
                 f"Decoded key doesn't match for '{path}",
             )
 
+    def test_key_finding_sampling(self):
+        """Test finding a key with each sampling method."""
+        for sampling in SamplingMethod:
+            finder = ProjectKeyFinder(self.valid_src_dir[1])
+            self.assertEqual(self.key, finder.find_key(sampling, seed=1), f"Failed for {sampling}")
+            self.assertGreaterEqual(finder.confidence, KEY_CONFIDENCE)
+            self.assertEqual(self.key, finder.find_key(sampling, max_samples=3, seed=1))
+            self.assertLess(finder.confidence, KEY_CONFIDENCE)
+
+    def test_key_finding_system_json(self):
+        """Test reading the key from System.json."""
+        with tempfile.TemporaryDirectory() as project:
+            data_dir: Path = Path(project).joinpath("www", "data")
+            data_dir.mkdir(parents=True)
+            data_dir.joinpath("System.json").write_text(
+                json.dumps({"hasEncryptedImages": True, "encryptionKey": self.key}),
+                encoding="UTF-8",
+            )
+            self.assertEqual(self.key, ProjectKeyFinder(PurePath(project)).find_key())
+            # Checked against the files, a stale key falls back to sampling the headers
+            shutil.copytree(self.valid_src_dir[0].joinpath("img"), data_dir.parent.joinpath("img"))
+            finder = ProjectKeyFinder(PurePath(project))
+            self.assertEqual(self.key, finder.find_key())
+            self.assertEqual(1.0, finder.confidence)
+            self.assertEqual(0, finder.samples)
+            data_dir.joinpath("System.json").write_text(
+                json.dumps({"hasEncryptedImages": True, "encryptionKey": "0" * 32}),
+                encoding="UTF-8",
+            )
+            finder = ProjectKeyFinder(PurePath(project))
+            self.assertEqual(self.key, finder.find_key())
+            self.assertGreater(finder.samples, 0)
+
+    def test_key_finding_audio_only(self):
+        """Test finding a key from OGG files when there are no images."""
+        with tempfile.TemporaryDirectory() as project:
+            shutil.copytree(
+                self.valid_src_dir[0].joinpath("audio"), Path(project).joinpath("www", "audio")
+            )
+            self.assertEqual(self.key, ProjectKeyFinder(PurePath(project)).find_key())
+
+
+class TestProjectPaths(unittest.TestCase):
+    """Tests for `rpgmaker_mv_decoder.projectpaths`."""
+
+    def test_file_listing(self):
+        """Test that the cached listing matches a glob of the source directory."""
+        project_paths = ProjectPaths(PurePath("tests/assets/decode_project"))
+        source: Path = Path(project_paths.source)
+        self.assertEqual(sorted(source.glob("**/*.rpgmvp")), project_paths.encoded_images)
+        self.assertEqual(sorted(source.glob("**/*.rpgmv[op]")), project_paths.encoded_files)
+        self.assertEqual(
+            [path for path in sorted(source.glob("**/*")) if path.is_file()],
+            project_paths.all_files,
+        )
+        self.assertEqual(
+            sorted(project_paths.encoded_files), sorted(project_paths.iter_encoded_files())
+        )
+        project_paths.invalidate()
+        self.assertEqual(len(project_paths.encoded_images), len(list(source.glob("**/*.rpgmvp"))))
+
+    def test_file_sizes(self):
+        """Test that listing files doesn't stat them, sizes come from the kept directory
+        entries."""
+        stats: List[mock.Mock] = []
+        walk = ProjectPaths._walk  # pylint: disable=protected-access
+
+        def counting_walk(project_paths: ProjectPaths):
+            entry: os.DirEntry
+            for entry in walk(project_paths):
+                counted = mock.Mock(path=entry.path, stat=mock.Mock(wraps=entry.stat))
+                counted.name = entry.name
+                stats.append(counted.stat)
+                yield counted
+
+        with mock.patch.object(ProjectPaths, "_walk", counting_walk):
+            key_finder = ProjectKeyFinder(PurePath("tests/assets/decode_project"))
+            self.assertEqual("acbd18db4cc2f85cedef654fccc4a4d8", key_finder.find_key())
+            project_paths = ProjectPaths(PurePath("tests/assets/decode_project"))
+            files: List[Path] = project_paths.all_files
+            self.assertTrue(stats)
+            self.assertFalse(any(stat.called for stat in stats))
+            self.assertEqual(
+                [path.stat().st_size for path in files],
+                [project_paths.source_size(path) for path in files],
+            )
+        self.assertEqual(len(files), sum(stat.call_count for stat in stats))
+
+
+class TestFileTypes(unittest.TestCase):
+    """Tests for `rpgmaker_mv_decoder.filetypes`."""
+
+    def test_detect_signature(self):
+        """Test the built in file signatures."""
+        self.assertEqual("image/png", detect_signature(PNG_HEADER))
+        self.assertEqual("audio/ogg", detect_signature(b"OggS\x00\x02" + bytes(22) + b"\x01vorbis"))
+        self.assertEqual("audio/x-m4a", detect_signature(b"\x00\x00\x00\x20ftypM4A \x00\x00"))
+        self.assertEqual("video/mp4", detect_signature(b"\x00\x00\x00\x20ftypisom\x00\x00"))
+        self.assertEqual("video/webm", detect_signature(b"\x1a\x45\xdf\xa3\x9f\x42\x82\x84webm"))
+        self.assertEqual("image/jpeg", detect_signature(b"\xff\xd8\xff\xe0\x00\x10JFIF"))
+        self.assertIsNone(detect_signature(bytes(16)))
+
+
+class TestKey(unittest.TestCase):
+    """Tests for `rpgmaker_mv_decoder.key`."""
+
+    def test_xor(self):
+        """Test the key matches `int_xor` and is immutable."""
+        key = Key("ACBD18DB4CC2F85CEDEF654FCCC4A4D8")
+        self.assertEqual("acbd18db4cc2f85cedef654fccc4a4d8", str(key))
+        self.assertEqual(key, Key(bytes.fromhex(key.hex)))
+        encoded: bytes = key.xor_header(PNG_HEADER)
+        self.assertEqual(int_xor(PNG_HEADER, bytes(key)), encoded)
+        self.assertEqual(PNG_HEADER, key.xor_header(encoded))
+        self.assertEqual(encoded[:4], key.xor_header(PNG_HEADER[:4]))
+        buffer = bytearray(b"abcd" + PNG_HEADER + b"efgh")
+        key.xor_into(buffer, 4)
+        self.assertEqual(b"abcd" + encoded + b"efgh", buffer)
+        with self.assertRaises(AttributeError):
+            key._int = 0  # pylint: disable=protected-access
+        with self.assertRaises(ValueError):
+            Key("not a key")
+
+    def test_xor_headers(self):
+        """Test batched XOR with and without NumPy."""
+        key = Key("acbd18db4cc2f85cedef654fccc4a4d8")
+        headers: bytes = bytes(range(64))
+        expected: bytes = b"".join(key.xor_header(headers[i : i + 16]) for i in range(0, 64, 16))
+        for numpy in (utils.numpy, None):
+            with mock.patch.object(utils, "numpy", numpy):
+                buffer = bytearray(headers)
+                key.xor_headers(buffer)
+                self.assertEqual(expected, buffer)
+                with self.assertRaises(ValueError):
+                    key.xor_headers(bytearray(20))
+
 
 class TestEncode(unittest.TestCase):
     """TODO: Tests for `rpgmaker_mv_decoder` package."""
@@ -97,6 +755,82 @@ class TestEncode(unittest.TestCase):
     def check_source_files(self):
         """TODO: Check md5sums"""
 
+    def decode_project(self, destination: Path) -> PurePath:
+        """Decodes the test project into `destination`, returns the decoded project"""
+        decoder = ProjectDecoder(self.valid_src_dir[1], destination, self.key)
+        decoder.show_progress = False
+        decoder.decode(True)
+        return decoder.project_paths.output_directory
+
+    def test_encode_round_trip(self):
+        """Test encoding decoded files gives back the original files, with the right extensions."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source: PurePath = self.decode_project(Path(temp_dir).joinpath("decoded"))
+            # Longer than the header, so the rest of the file is copied as is
+            m4a_data: bytes = b"\x00\x00\x00\x20ftypM4A \x00\x00\x00\x00" + bytes(range(256))
+            Path(source).joinpath("www/audio/me/Fanfare.m4a").write_bytes(m4a_data)
+            encoder = ProjectEncoder(source, Path(temp_dir).joinpath("encoded"), self.key)
+            encoder.show_progress = False
+            encoder.encode()
+            output_dir: Path = Path(encoder.project_paths.output_directory)
+            original_dir: Path = Path(self.valid_src_dir[1])
+            originals: List[Path] = sorted(original_dir.glob("**/*.rpgmv[op]"))
+            encoded_files: List[Path] = sorted(output_dir.glob("**/*.rpgmv[op]"))
+            self.assertEqual(
+                [path.relative_to(original_dir) for path in originals],
+                [path.relative_to(output_dir) for path in encoded_files],
+            )
+            for original in originals:
+                self.assertEqual(
+                    original.read_bytes(),
+                    output_dir.joinpath(original.relative_to(original_dir)).read_bytes(),
+                )
+            encoded: bytes = output_dir.joinpath("www/audio/me/Fanfare.rpgmvm").read_bytes()
+            self.assertEqual(RPG_MAKER_MV_MAGIC, encoded[:16])
+            self.assertEqual(m4a_data[:16], Key(self.key).xor_header(encoded[16:32]))
+            self.assertEqual(m4a_data[16:], encoded[32:])
+            # Decoding lists the M4A file too, and gives it back its own extension
+            for detect_type in (False, True):
+                decoder = ProjectDecoder(output_dir, Path(temp_dir).joinpath("again"), self.key)
+                decoder.show_progress = False
+                decoder.overwrite = True
+                decoder.decode(detect_type)
+                self.assertEqual(
+                    m4a_data,
+                    Path(decoder.project_paths.output_directory)
+                    .joinpath("www/audio/me/Fanfare.m4a")
+                    .read_bytes(),
+                )
+
+    def test_encode_again(self):
+        """Test encoding again after the output was removed."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source: PurePath = self.decode_project(Path(temp_dir).joinpath("decoded"))
+            encoder = ProjectEncoder(source, Path(temp_dir).joinpath("encoded"), self.key)
+            encoder.show_progress = False
+            output_dir: Path = Path(encoder.project_paths.output_directory)
+            encoder.encode()
+            files: List[Path] = sorted(output_dir.glob("**/*.*"))
+            shutil.rmtree(output_dir)
+            encoder.encode()
+            self.assertEqual(files, sorted(output_dir.glob("**/*.*")))
+
+
+class TestSynthetic(unittest.TestCase):
+    """Tests for `benchmarks.synthetic`."""
+
+    def test_file_size(self):
+        """Test synthetic file sizes stay between the smallest and largest size asked for."""
+        rng = random.Random(0)
+        sizes: List[int] = [file_size(rng, 1024, 1024 * 1024) for _ in range(10000)]
+        self.assertGreaterEqual(min(sizes), 1024)
+        self.assertLessEqual(max(sizes), 1024 * 1024)
+        # Log-uniform, half the files are below the geometric mean
+        self.assertLess(min(sizes), 1100)
+        self.assertGreater(max(sizes), 1000 * 1024)
+        self.assertAlmostEqual(0.5, sum(size < 32 * 1024 for size in sizes) / len(sizes), 1)
+        self.assertEqual([100] * 10, [file_size(rng, 100, 100) for _ in range(10)])
+
 
 class TestCLI(unittest.TestCase):
     """Tests for `rpgmaker_mv_decoder` package."""
@@ -114,7 +848,7 @@ class TestCLI(unittest.TestCase):
         assert "Usage: decode" in result.output
         help_result = runner.invoke(decode, ["--help"])
         assert help_result.exit_code == 0
-        assert "--help         Show this message and exit." in help_result.output
+        assert "--help                  Show this message and exit." in help_result.output
 
     def test_encoder_command_line_interface(self):
         """Test the CLI."""
@@ -126,4 +860,4 @@ class TestCLI(unittest.TestCase):
         assert "Usage: encode" in result.output
         help_result = runner.invoke(decode, ["--help"])
         assert help_result.exit_code == 0
-        assert "--help         Show this message and exit." in help_result.output
+        assert "--help                  Show this message and exit." in help_result.output